@@ -1,16 +1,14 @@
 import json
 import time
 import os
-import re
-import sqlite3
-from typing import Any, Dict, List, Optional, Callable
+from typing import Dict, List
 from datetime import datetime
-import warnings
 import asyncio
-import inspect
 import logging
 import google.generativeai as genai
 
+from json_extract import ANALYSIS_SCHEMA, OPTIMIZATION_SCHEMA, PREDICTION_SCHEMA, extract_json, extract_json_array
+
 # Configuration Agent Morphius - Nümtema AGENCY
 GLOBAL_CONFIG = {
     "database_path": "logs/agent_memory.db",
@@ -145,24 +143,20 @@ class AgentMorphius:
             # Parser la réponse JSON
             analysis_text = response.text
             # Nettoyer la réponse pour extraire le JSON
-            json_match = re.search(r'\{.*\}', analysis_text, re.DOTALL)
-            if json_match:
-                analysis = json.loads(json_match.group())
-                analysis["processing_time"] = f"{processing_time:.2f}s"
-                analysis["agent"] = "Morphius v2.1"
-                analysis["model_used"] = self.models["analysis"]
-                
-                # Sauvegarder dans la mémoire
-                self.memory["optimizations"].append({
-                    "timestamp": datetime.now().isoformat(),
-                    "funnel_id": funnel_data.get("id", "unknown"),
-                    "analysis": analysis
-                })
-                self._save_memory()
-                
-                return analysis
-            else:
-                raise ValueError("Impossible de parser la réponse JSON")
+            analysis = extract_json(analysis_text, ANALYSIS_SCHEMA)
+            analysis["processing_time"] = f"{processing_time:.2f}s"
+            analysis["agent"] = "Morphius v2.1"
+            analysis["model_used"] = self.models["analysis"]
+            
+            # Sauvegarder dans la mémoire
+            self.memory["optimizations"].append({
+                "timestamp": datetime.now().isoformat(),
+                "funnel_id": funnel_data.get("id", "unknown"),
+                "analysis": analysis
+            })
+            self._save_memory()
+            
+            return analysis
                 
         except Exception as e:
             logging.error(f"Erreur analyse funnel: {e}")
@@ -233,17 +227,12 @@ class AgentMorphius:
         
         try:
             response = await model.generate_content_async(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
+            optimization = extract_json(response.text, OPTIMIZATION_SCHEMA)
+            optimization["agent"] = "Morphius v2.1"
+            optimization["model_used"] = self.models["optimization"]
+            optimization["timestamp"] = datetime.now().isoformat()
             
-            if json_match:
-                optimization = json.loads(json_match.group())
-                optimization["agent"] = "Morphius v2.1"
-                optimization["model_used"] = self.models["optimization"]
-                optimization["timestamp"] = datetime.now().isoformat()
-                
-                return optimization
-            else:
-                raise ValueError("Impossible de parser la réponse JSON")
+            return optimization
                 
         except Exception as e:
             logging.error(f"Erreur optimisation étape: {e}")
@@ -284,17 +273,12 @@ class AgentMorphius:
         
         try:
             response = await model.generate_content_async(prompt)
-            json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
+            insights = [insight for insight in extract_json_array(response.text) if isinstance(insight, dict)]
+            for insight in insights:
+                insight["agent"] = "Morphius v2.1"
+                insight["timestamp"] = datetime.now().isoformat()
             
-            if json_match:
-                insights = json.loads(json_match.group())
-                for insight in insights:
-                    insight["agent"] = "Morphius v2.1"
-                    insight["timestamp"] = datetime.now().isoformat()
-                
-                return insights
-            else:
-                return []
+            return insights
                 
         except Exception as e:
             logging.error(f"Erreur génération insights: {e}")
@@ -351,16 +335,11 @@ class AgentMorphius:
         
         try:
             response = await model.generate_content_async(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
+            prediction = extract_json(response.text, PREDICTION_SCHEMA)
+            prediction["agent"] = "Morphius v2.1"
+            prediction["timestamp"] = datetime.now().isoformat()
             
-            if json_match:
-                prediction = json.loads(json_match.group())
-                prediction["agent"] = "Morphius v2.1"
-                prediction["timestamp"] = datetime.now().isoformat()
-                
-                return prediction
-            else:
-                raise ValueError("Impossible de parser la prédiction")
+            return prediction
                 
         except Exception as e:
             logging.error(f"Erreur prédiction conversion: {e}")
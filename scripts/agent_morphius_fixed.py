@@ -1,35 +1,34 @@
 import json
 import time
 import os
-import re
-import sqlite3
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Callable
 from datetime import datetime
-import warnings
 import asyncio
-import inspect
 import logging
+import atexit
+from contextlib import nullcontext
 
-# Installation automatique des dépendances si nécessaire
-try:
-    import google.generativeai as genai
-except ImportError:
-    print("🔧 Installation de google-generativeai...")
-    import subprocess
-    import sys
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "google-generativeai==0.8.3"])
-    import google.generativeai as genai
+from memory_store import ExperienceStore
+from write_behind import WriteBehindPersister
+from memory_retrieval import MemoryIndex
+from response_cache import ResponseCache, cache_key
+from single_flight import SingleFlight
+from telemetry import METRICS
+from prompt_templates import (
+    ANALYSIS_CHUNK_PROMPT, ANALYSIS_MERGE_PROMPT, ANALYSIS_PROMPT, OPTIMIZE_STEP_PROMPT, OPTIMIZE_STEPS_PROMPT,
+    templates_version,
+)
+from json_extract import (
+    ANALYSIS_SCHEMA, OPTIMIZATION_SCHEMA, STEPS_OPTIMIZATION_SCHEMA, JSONExtractionError, extract_json, validate,
+)
 
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    print("🔧 Installation de python-dotenv...")
-    import subprocess
-    import sys
-    subprocess.check_call([sys.executable, "-m", "pip", "install", "python-dotenv==1.0.0"])
-    from dotenv import load_dotenv
-    load_dotenv()
+# SDK Gemini et .env chargés au premier usage : l'import du module ne fait
+# ni installation pip, ni accès réseau, ni écriture disque
+# (dépendances : python scripts/install_dependencies.py).
+# Les modules propres à une fonctionnalité (file de tâches, cascade, map-reduce,
+# insights, journalisation, limiteurs...) sont importés dans les méthodes qui
+# les utilisent, comme conversion_model.
+genai = None
 
 # Configuration Agent Morphius - Nümtema AGENCY
 GLOBAL_CONFIG = {
@@ -52,18 +51,141 @@ GLOBAL_CONFIG = {
         "general": "gemini-2.5-flash",
         "optimization": "gemini-2.5-pro",
         "analysis": "gemini-2.5-pro"
+    },
+    # Mémoire écrite par lots : au plus tard après flush_interval secondes ou max_pending entrées
+    "memory_write_behind": {
+        "flush_interval": 2.0,
+        "max_pending": 50
+    },
+    # Recherche dans l'index FTS5 de database_path : top_k par type parmi les `window` entrées récentes
+    "memory_retrieval": {
+        "top_k": 5,
+        "token_budget": 1500,
+        "window": 2000
+    },
+    "response_cache": {
+        "max_entries": 512,
+        "ttl_seconds": 3600,
+        "persist_path": "logs/response_cache.db"
+    },
+    # Appels/seconde et rafale autorisés par clé de llm_model_configs
+    "rate_limits": {
+        "default": {"rate": 2.0, "burst": 4},
+        "analysis": {"rate": 1.0, "burst": 2},
+        "optimization": {"rate": 1.0, "burst": 2}
+    },
+    # Concurrence AIMD par provider / modèle : réduite sur 429 / 503, pause sur Retry-After,
+    # appels idempotents rejoués (backoff jitteré) tant que deadline (s) n'est pas atteinte
+    "adaptive_limits": {
+        "enabled": True,
+        "limiter": {
+            "initial_limit": 4,
+            "min_limit": 1,
+            "max_limit": 32,
+            "increase": 1.0,
+            "decrease": 0.5,
+            "decrease_cooldown": 1.0,
+            "deadline": 30.0,
+            "max_attempts": 5,
+            "backoff_base": 0.5,
+            "backoff_max": 8.0
+        }
+    },
+    "bulk_analysis": {
+        "concurrency": 8,
+        "checkpoint_path": "logs/bulk_checkpoint.jsonl",
+        # Exécution reprise par défaut ; ses entrées sont retirées quand elle se termine sans repli
+        "run_id": "default",
+        "progress_every": 25
+    },
+    # Rotation de log_file_path et taille de la file d'écriture
+    "logging": {
+        "max_bytes": 10 * 1024 * 1024,
+        "backup_count": 5,
+        "rotate_seconds": 24 * 3600,
+        "queue_size": 10000
+    },
+    "insights": {
+        "database_path": "logs/insights_aggregates.db",
+        "max_insights": 5
+    },
+    # Analyses longues en arrière-plan (python scripts/job_worker.py)
+    "job_queue": {
+        "database_path": "logs/jobs.db",
+        "concurrency": 4,
+        "visibility_timeout": 300.0,
+        "max_attempts": 3,
+        "backoff_base": 2.0,
+        "backoff_max": 60.0,
+        "poll_interval": 0.2
+    },
+    # analyze_funnel : brouillon fast_draft, escalade vers analysis si le brouillon est
+    # invalide, si confidence_level < min_confidence ou si la complexité dépasse max_complexity
+    "cascade": {
+        "enabled": False,
+        "min_confidence": 0.7,
+        "max_complexity": 40,
+        # Dollars par million de tokens (benchmark et estimation de coût)
+        "prices": {
+            "gemini-2.5-flash": {"input": 0.30, "output": 2.50},
+            "gemini-2.5-pro": {"input": 1.25, "output": 10.00}
+        }
+    },
+    # Grands funnels (min_steps étapes ou plus de max_funnel_tokens) : fenêtres de
+    # window_steps étapes analysées en parallèle par chunk_model, puis fusion par merge_model
+    # (merge_pass False : réduction locale seule)
+    "chunked_analysis": {
+        "enabled": True,
+        "min_steps": 30,
+        "max_funnel_tokens": 12000,
+        "window_steps": 10,
+        "chunk_model": "fast_draft",
+        "merge_model": "fast_draft",
+        "merge_pass": True
+    },
+    # Analyse structurelle locale (repli démo et premier étage avant Gemini)
+    "heuristic_analysis": {
+        # analyze_funnel_stream émet d'abord un événement "preview" heuristique
+        "stream_preview": True
     }
 }
 
+# Version des templates de prompt (invalide le cache quand un prompt change)
+PROMPT_TEMPLATE_VERSION = templates_version()
+
 # Configuration Gemini avec gestion d'erreur
+def _load_genai():
+    """Importe google.generativeai au premier usage (None s'il n'est pas installé)"""
+    global genai
+    if genai is None:
+        try:
+            import google.generativeai as module
+        except ImportError:
+            return None
+        genai = module
+    return genai
+
+def _load_env():
+    """Charge le fichier .env si python-dotenv est disponible"""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
 def configure_gemini():
     """Configure Gemini avec gestion d'erreur"""
+    _load_env()
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         # Clé de test pour la démo (remplacez par votre vraie clé)
         print("⚠️ GEMINI_API_KEY non trouvée, utilisation du mode démo")
         return False
     
+    if _load_genai() is None:
+        print("⚠️ google-generativeai non installé, utilisation du mode démo")
+        return False
+    
     try:
         genai.configure(api_key=api_key)
         return True
@@ -76,7 +198,6 @@ class AgentMorphius:
     
     def __init__(self):
         self.models = GLOBAL_CONFIG["llm_model_configs"]
-        self.memory = self._load_memory()
         self.gemini_configured = configure_gemini()
         self.reasoning_schema = {
             "mode": "RRLA",
@@ -90,250 +211,520 @@ class AgentMorphius:
         # Créer les dossiers nécessaires
         os.makedirs("logs", exist_ok=True)
         
-        # Configuration du logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(GLOBAL_CONFIG["log_file_path"]),
-                logging.StreamHandler()
-            ]
-        )
+        # Configuration du logging (JSONL écrit par un thread dédié, hors boucle asyncio)
+        from structured_logging import setup_structured_logging
+        setup_structured_logging(GLOBAL_CONFIG["log_file_path"], **GLOBAL_CONFIG["logging"])
         self.logger = logging.getLogger(__name__)
+        
+        # Mémoire interrogée à la demande via l'index FTS5 persistant : rien n'est rechargé ici
+        self.memory_store = ExperienceStore(GLOBAL_CONFIG["database_path"])
+        self._import_legacy_memory()
+        self.memory_writer = WriteBehindPersister(self.memory_store, **GLOBAL_CONFIG["memory_write_behind"])
+        self.memory_index = MemoryIndex(self.memory_store, window=GLOBAL_CONFIG["memory_retrieval"]["window"])
+        self.response_cache = ResponseCache(**GLOBAL_CONFIG["response_cache"])
+        self.single_flight = SingleFlight()
+        from rate_limit import build_rate_limiters
+        self.rate_limiters = build_rate_limiters(self.models, GLOBAL_CONFIG["rate_limits"])
+        # Base des insights ouverte au premier generate_insights
+        self._insights_aggregator = None
+        atexit.register(self.shutdown)
         self.logger.info("🧠 Agent Morphius initialisé - Nümtema AGENCY")
     
-    def _load_memory(self) -> Dict:
-        """Charge la mémoire expérientielle de l'agent"""
+    def _import_legacy_memory(self):
+        """Import unique de l'ancien fichier JSON vers SQLite (aucune entrée chargée en mémoire)"""
         try:
-            if os.path.exists(GLOBAL_CONFIG["memory_file"]):
-                with open(GLOBAL_CONFIG["memory_file"], 'r', encoding='utf-8') as f:
-                    return json.load(f)
+            imported = self.memory_store.import_json(GLOBAL_CONFIG["memory_file"])
+            if imported:
+                self.logger.info(f"📥 {imported} entrées importées depuis {GLOBAL_CONFIG['memory_file']}")
         except Exception as e:
             self.logger.error(f"Erreur chargement mémoire: {e}")
-        return {"optimizations": [], "patterns": [], "best_practices": []}
     
-    def _save_memory(self):
-        """Sauvegarde la mémoire expérientielle"""
-        try:
-            os.makedirs(os.path.dirname(GLOBAL_CONFIG["memory_file"]), exist_ok=True)
-            with open(GLOBAL_CONFIG["memory_file"], 'w', encoding='utf-8') as f:
-                json.dump(self.memory, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            self.logger.error(f"Erreur sauvegarde mémoire: {e}")
+    def _save_memory(self, kind: str, entry: Dict):
+        """Ajoute une entrée à la mémoire expérientielle (append-only, indexée à l'écriture)"""
+        # Écrit par lots dans un thread dédié (aucune I/O disque sur le chemin de requête)
+        self.memory_writer.submit(kind, entry)
+    
+    @property
+    def insights_aggregator(self):
+        """Agrégats incrémentaux des insights (InsightsAggregator, ouvert au premier usage)"""
+        if self._insights_aggregator is None:
+            from insights_aggregator import InsightsAggregator
+            self._insights_aggregator = InsightsAggregator(GLOBAL_CONFIG["insights"]["database_path"])
+        return self._insights_aggregator
+    
+    def shutdown(self):
+        """Écrit la mémoire et les agrégats en attente (appelé aussi à la sortie du processus)"""
+        self.memory_writer.close()
+        if self._insights_aggregator is not None:
+            self._insights_aggregator.close()
+    
+    async def _call_gemini(self, model_key: str, method: str, attempt: Callable[[], Any]) -> Any:
+        """Appel Gemini idempotent sous le limiteur adaptatif du modèle (429 / 503 rejoués)"""
+        settings = GLOBAL_CONFIG["adaptive_limits"]
+        if not settings["enabled"]:
+            return await attempt()
+        from rate_limit import adaptive_limiter
+        limiter = adaptive_limiter("gemini", self.models[model_key], settings["limiter"])
+        return await limiter.call(attempt, method)
+    
+    def _gemini_slot(self, model_key: str, method: str):
+        """Place du limiteur adaptatif sans retry (streaming : les champs déjà émis ne se rejouent pas)"""
+        settings = GLOBAL_CONFIG["adaptive_limits"]
+        if not settings["enabled"]:
+            return nullcontext()
+        from rate_limit import adaptive_limiter
+        return adaptive_limiter("gemini", self.models[model_key], settings["limiter"]).slot(method)
+    
+    def _record_event(self, event: str, model_key: str, method: str):
+        """Compte un passage en cache, en démo ou en fallback"""
+        METRICS.record_event(event, "gemini", self.models[model_key], method)
+    
+    def _relevant_memory(self, funnel_data: Dict) -> Dict:
+        """Expériences passées les plus proches du funnel, sous budget de tokens"""
+        retrieval = GLOBAL_CONFIG["memory_retrieval"]
+        return self.memory_index.build_context(
+            funnel_data,
+            top_k=retrieval["top_k"],
+            token_budget=retrieval["token_budget"],
+        )
     
     async def analyze_funnel(self, funnel_data: Dict) -> Dict:
         """Analyse complète d'un funnel avec Gemini 2.5 Pro"""
         
         if not self.gemini_configured:
+            self._record_event("demo", "analysis", "analyze_funnel")
             return self._get_demo_analysis(funnel_data)
         
+        key = self._analysis_cache_key(funnel_data)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self._record_event("cache_hit", "analysis", "analyze_funnel")
+            return cached
+        
+        # Les appels concurrents identiques partagent un seul appel Gemini
+        return await self.single_flight.do(key, lambda: self._run_analysis(funnel_data, key))
+    
+    def _analysis_cache_key(self, funnel_data: Dict) -> str:
+        """Clé de cache commune à analyze_funnel et au streaming : modèles réellement utilisés"""
+        from chunked_analysis import should_chunk
+        
+        settings = GLOBAL_CONFIG["chunked_analysis"]
+        if should_chunk(funnel_data, settings):
+            # Map-reduce : fenêtres et fusion par fast_draft (ou réduction locale seule)
+            merge = self.models.get(settings["merge_model"], settings["merge_model"]) if settings["merge_pass"] else "local"
+            chunk = self.models.get(settings["chunk_model"], settings["chunk_model"])
+            model_label = f'chunked:{chunk}/{settings["window_steps"]}>{merge}'
+        else:
+            # La cascade peut répondre avec fast_draft : entrées de cache distinctes
+            model_label = self.models["analysis"]
+            if GLOBAL_CONFIG["cascade"]["enabled"]:
+                model_label = f'{self.models["fast_draft"]}>{model_label}'
+        return cache_key(model_label, PROMPT_TEMPLATE_VERSION, funnel_data)
+    
+    def _build_analysis_prompt(self, funnel_data: Dict) -> str:
+        """Prompt d'analyse complète d'un funnel (préfixe stable, données en JSON compact)"""
+        return ANALYSIS_PROMPT.render(memory=self._relevant_memory(funnel_data), funnel=funnel_data).text
+    
+    def _finalize_analysis(self, funnel_data: Dict, analysis: Dict, processing_time: float, key: str,
+                           model_key: str = "analysis") -> Dict:
+        """Complète une analyse Gemini, l'enregistre en mémoire et en cache"""
+        analysis["processing_time"] = f"{processing_time:.2f}s"
+        analysis["agent"] = "Morphius v2.1"
+        analysis["model_used"] = self.models[model_key]
+        
+        # Sauvegarder dans la mémoire
+        self._save_memory("optimizations", {
+            "timestamp": datetime.now().isoformat(),
+            "funnel_id": funnel_data.get("id", "unknown"),
+            "analysis": analysis
+        })
+        self.response_cache.set(key, analysis)
+        
+        return analysis
+    
+    async def analyze_funnel_stream(self, funnel_data: Dict) -> AsyncIterator[Dict]:
+        """Analyse en streaming : chaque champ de premier niveau est émis dès qu'il est complet"""
+        
+        def replay(analysis: Dict) -> Iterable[Dict]:
+            for field, value in analysis.items():
+                yield {"type": "field", "field": field, "value": value}
+            yield {"type": "complete", "analysis": analysis}
+        
+        if not self.gemini_configured:
+            self._record_event("demo", "analysis", "analyze_funnel_stream")
+            for event in replay(self._get_demo_analysis(funnel_data)):
+                yield event
+            return
+        
+        # Premier étage : diagnostic structurel affichable avant la réponse de Gemini
+        if GLOBAL_CONFIG["heuristic_analysis"]["stream_preview"]:
+            yield {"type": "preview", "analysis": self.quick_analysis(funnel_data)}
+        
+        key = self._analysis_cache_key(funnel_data)
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self._record_event("cache_hit", "analysis", "analyze_funnel_stream")
+            for event in replay(cached):
+                yield event
+            return
+        
+        from chunked_analysis import should_chunk
+        from json_stream import IncrementalJSONObjectParser
+        
+        # Grand funnel : pas de prompt unique à streamer, l'analyse map-reduce est rejouée
+        if should_chunk(funnel_data, GLOBAL_CONFIG["chunked_analysis"]):
+            for event in replay(await self._run_analysis(funnel_data, key)):
+                yield event
+            return
+        
+        parser = IncrementalJSONObjectParser()
         try:
+            await self.rate_limiters["analysis"].acquire()
             model = genai.GenerativeModel(self.models["analysis"])
             
-            prompt = f"""
-            🧠 AGENT MORPHIUS - ANALYSE FUNNEL
-            Framework: Nümtema AGENCY
-            
-            Analysez ce funnel de manière approfondie:
-            
-            DONNÉES FUNNEL:
-            {json.dumps(funnel_data, ensure_ascii=False, indent=2)}
-            
-            MÉMOIRE EXPÉRIENTIELLE:
-            {json.dumps(self.memory, ensure_ascii=False, indent=2)}
-            
-            ANALYSE DEMANDÉE:
-            1. Score global (/100)
-            2. Prédiction taux de conversion
-            3. Points forts identifiés
-            4. Problèmes détectés avec solutions
-            5. Recommandations d'optimisation
-            6. Analyse psychologique du parcours
-            7. Suggestions d'A/B testing
+            prompt = self._build_analysis_prompt(funnel_data)
+            async with self._gemini_slot("analysis", "analyze_funnel_stream"):
+                with METRICS.track("gemini", self.models["analysis"], "analyze_funnel_stream") as call:
+                    start_time = time.time()
+                    response = await model.generate_content_async(prompt, stream=True)
+                    async for chunk in response:
+                        for field, value in parser.feed(chunk.text):
+                            yield {"type": "field", "field": field, "value": value}
+                    processing_time = time.time() - start_time
+                    call.set_usage(prompt=prompt, text=parser.buffer)
+                    
+                    # Flux tronqué ou mal formé : l'extracteur tente une réparation
+                    fields = (
+                        validate(dict(parser.fields), ANALYSIS_SCHEMA) if parser.done
+                        else extract_json(parser.buffer, ANALYSIS_SCHEMA)
+                    )
+            analysis = self._finalize_analysis(funnel_data, fields, processing_time, key)
+            yield {"type": "complete", "analysis": analysis}
+        
+        except Exception as e:
+            self.logger.error(f"Erreur analyse funnel (streaming): {e}")
+            self._record_event("demo", "analysis", "analyze_funnel_stream")
+            # Les champs déjà émis restent valables ; l'analyse finale bascule en démo
+            yield {"type": "complete", "analysis": self._get_demo_analysis(funnel_data)}
+    
+    async def _run_analysis(self, funnel_data: Dict, key: str) -> Dict:
+        """Appel Gemini pour analyze_funnel (une seule exécution par clé en vol)"""
+        from chunked_analysis import should_chunk
+        
+        try:
+            if should_chunk(funnel_data, GLOBAL_CONFIG["chunked_analysis"]):
+                return await self._run_chunked_analysis(funnel_data, key)
             
-            RÉPONDEZ EN JSON STRUCTURÉ:
-            {{
-                "overall_score": 0-100,
-                "conversion_prediction": 0.0-100.0,
-                "strengths": ["point fort 1", "point fort 2"],
-                "issues": [
-                    {{
-                        "problem": "description du problème",
-                        "solution": "solution recommandée", 
-                        "impact": "impact estimé en %",
-                        "priority": "high|medium|low"
-                    }}
-                ],
-                "recommendations": [
-                    {{
-                        "type": "optimization|design|content|flow",
-                        "description": "description de la recommandation",
-                        "expected_improvement": "amélioration attendue",
-                        "implementation_difficulty": "easy|medium|hard"
-                    }}
-                ],
-                "psychological_analysis": {{
-                    "user_journey_flow": "analyse du parcours",
-                    "friction_points": ["point de friction 1"],
-                    "engagement_factors": ["facteur d'engagement 1"]
-                }},
-                "ab_test_suggestions": [
-                    {{
-                        "element": "élément à tester",
-                        "variant_a": "version actuelle",
-                        "variant_b": "version proposée",
-                        "hypothesis": "hypothèse du test"
-                    }}
-                ],
-                "confidence_level": 0.0-1.0
-            }}
-            """
+            prompt = self._build_analysis_prompt(funnel_data)
+            if GLOBAL_CONFIG["cascade"]["enabled"]:
+                return await self._run_cascade(funnel_data, prompt, key)
             
             start_time = time.time()
-            response = await model.generate_content_async(prompt)
-            processing_time = time.time() - start_time
-            
-            # Parser la réponse JSON
-            analysis_text = response.text
-            json_match = re.search(r'\{.*\}', analysis_text, re.DOTALL)
-            if json_match:
-                analysis = json.loads(json_match.group())
-                analysis["processing_time"] = f"{processing_time:.2f}s"
-                analysis["agent"] = "Morphius v2.1"
-                analysis["model_used"] = self.models["analysis"]
-                
-                # Sauvegarder dans la mémoire
-                self.memory["optimizations"].append({
-                    "timestamp": datetime.now().isoformat(),
-                    "funnel_id": funnel_data.get("id", "unknown"),
-                    "analysis": analysis
-                })
-                self._save_memory()
-                
-                return analysis
-            else:
-                raise ValueError("Impossible de parser la réponse JSON")
+            analysis = await self._generate_analysis("analysis", prompt)
+            return self._finalize_analysis(funnel_data, analysis, time.time() - start_time, key)
                 
         except Exception as e:
             self.logger.error(f"Erreur analyse funnel: {e}")
+            self._record_event("demo", "analysis", "analyze_funnel")
             return self._get_demo_analysis(funnel_data)
     
-    def _get_demo_analysis(self, funnel_data: Dict) -> Dict:
-        """Retourne une analyse de démonstration"""
-        return {
-            "overall_score": 78,
-            "conversion_prediction": 24.5,
-            "strengths": [
-                "Structure logique du funnel",
-                "Questions bien formulées",
-                "Design cohérent"
-            ],
-            "issues": [
-                {
-                    "problem": "Étape de bienvenue trop longue",
-                    "solution": "Réduire le texte à 2 phrases maximum",
-                    "impact": "+8% engagement",
-                    "priority": "medium"
-                },
-                {
-                    "problem": "Trop d'options dans la question 2",
-                    "solution": "Limiter à 4 options maximum",
-                    "impact": "+12% completion",
-                    "priority": "high"
-                }
-            ],
-            "recommendations": [
-                {
-                    "type": "optimization",
-                    "description": "Ajouter une barre de progression",
-                    "expected_improvement": "+15% completion",
-                    "implementation_difficulty": "easy"
-                },
-                {
-                    "type": "content",
-                    "description": "Personnaliser selon la source de trafic",
-                    "expected_improvement": "+20% engagement",
-                    "implementation_difficulty": "medium"
-                }
-            ],
-            "psychological_analysis": {
-                "user_journey_flow": "Parcours bien structuré avec progression logique",
-                "friction_points": ["Question trop complexe à l'étape 2"],
-                "engagement_factors": ["Design attractif", "Questions pertinentes"]
-            },
-            "ab_test_suggestions": [
-                {
-                    "element": "Bouton CTA",
-                    "variant_a": "Commencer",
-                    "variant_b": "Découvrir mes résultats",
-                    "hypothesis": "Un CTA plus spécifique augmente l'engagement"
-                }
-            ],
-            "confidence_level": 0.85,
-            "processing_time": "0.5s",
-            "agent": "Morphius v2.1 (Demo Mode)",
-            "model_used": "demo"
+    async def _generate_analysis(self, model_key: str, prompt: str, method: str = "analyze_funnel") -> Dict:
+        """Un appel Gemini d'analyse avec le modèle model_key, réponse JSON validée"""
+        
+        async def attempt() -> Dict:
+            await self.rate_limiters[model_key].acquire()
+            model = genai.GenerativeModel(self.models[model_key])
+            
+            with METRICS.track("gemini", self.models[model_key], method) as call:
+                response = await model.generate_content_async(prompt)
+                call.set_usage(response, prompt)
+                
+                # Parser la réponse JSON
+                return extract_json(response.text, ANALYSIS_SCHEMA)
+        
+        return await self._call_gemini(model_key, method, attempt)
+    
+    async def _run_chunked_analysis(self, funnel_data: Dict, key: str) -> Dict:
+        """Map-reduce : fenêtres d'étapes en parallèle, réduction locale puis passe de fusion"""
+        from chunked_analysis import funnel_summary, reduce_analyses, step_windows, window_scores
+        
+        settings = GLOBAL_CONFIG["chunked_analysis"]
+        start_time = time.time()
+        summary = funnel_summary(funnel_data)
+        windows = step_windows(funnel_data, settings["window_steps"])
+        
+        async def analyze_window(window: Dict) -> Dict:
+            prompt = ANALYSIS_CHUNK_PROMPT.render(
+                summary=summary, first_step=window["first_step"], last_step=window["last_step"],
+                steps=window["steps"],
+            ).text
+            return await self._generate_analysis(settings["chunk_model"], prompt, "analyze_funnel_chunk")
+        
+        outcomes = await asyncio.gather(*[analyze_window(window) for window in windows], return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+        done = [(window, outcome) for window, outcome in zip(windows, outcomes) if isinstance(outcome, dict)]
+        if not done:
+            raise outcomes[0]
+        if len(done) < len(windows):
+            self.logger.warning(f"Analyse map-reduce: {len(windows) - len(done)}/{len(windows)} segments en échec")
+        analyzed_windows = [window for window, _ in done]
+        partials = [analysis for _, analysis in done]
+        analysis = reduce_analyses(analyzed_windows, partials)
+        model_key, merged_by = settings["chunk_model"], "local"
+        
+        if settings["merge_pass"]:
+            prompt = ANALYSIS_MERGE_PROMPT.render(
+                memory=self._relevant_memory(funnel_data), summary=summary,
+                segments=window_scores(analyzed_windows, partials), partial=analysis,
+            ).text
+            try:
+                analysis = await self._generate_analysis(settings["merge_model"], prompt, "analyze_funnel_merge")
+                model_key = merged_by = settings["merge_model"]
+            except Exception as e:
+                # La réduction locale reste une analyse complète du funnel
+                self.logger.warning(f"Passe de fusion en échec, réduction locale conservée: {e}")
+        
+        analysis["chunked"] = {
+            "segments": len(windows),
+            "failed_segments": len(windows) - len(done),
+            "merged_by": self.models.get(merged_by, merged_by),
         }
+        return self._finalize_analysis(funnel_data, analysis, time.time() - start_time, key, model_key)
+    
+    async def _run_cascade(self, funnel_data: Dict, prompt: str, key: str) -> Dict:
+        """Brouillon fast_draft, escalade vers le modèle analysis seulement si nécessaire"""
+        from model_cascade import (
+            REASON_DRAFT_ERROR, REASON_INVALID_DRAFT, draft_escalation_reason, pre_escalation_reason,
+        )
+        
+        settings = GLOBAL_CONFIG["cascade"]
+        start_time = time.time()
+        reason = pre_escalation_reason(funnel_data, settings)
+        if reason is None:
+            try:
+                draft = await self._generate_analysis("fast_draft", prompt)
+                reason = draft_escalation_reason(draft, settings)
+            except JSONExtractionError:
+                reason = REASON_INVALID_DRAFT
+            except Exception as e:
+                self.logger.warning(f"Brouillon fast_draft en échec: {e}")
+                reason = REASON_DRAFT_ERROR
+            if reason is None:
+                draft["cascade"] = {"escalated": False, "reason": None}
+                return self._finalize_analysis(funnel_data, draft, time.time() - start_time, key, "fast_draft")
+        
+        self._record_event("escalation", "analysis", "analyze_funnel")
+        self.logger.info(f"⬆️ Escalade vers {self.models['analysis']} ({reason})")
+        analysis = await self._generate_analysis("analysis", prompt)
+        analysis["cascade"] = {"escalated": True, "reason": reason}
+        return self._finalize_analysis(funnel_data, analysis, time.time() - start_time, key)
+    
+    async def analyze_funnels_bulk(
+        self,
+        funnels: Iterable[Dict],
+        concurrency: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+        run_id: Optional[str] = None,
+    ) -> AsyncIterator[Dict]:
+        """Analyse en masse : résultats renvoyés au fil de l'eau, reprise sur checkpoint"""
+        from bulk_analysis import BulkCheckpoint
+        
+        settings = GLOBAL_CONFIG["bulk_analysis"]
+        concurrency = concurrency or settings["concurrency"]
+        checkpoint = BulkCheckpoint(checkpoint_path or settings["checkpoint_path"], run_id or settings["run_id"])
+        progress = {"completed": 0, "fallback": 0, "skipped": 0, "in_flight": 0}
+        start_time = time.time()
+        
+        async def run(funnel_id: str, content_hash: str, funnel_data: Dict) -> Dict:
+            analysis = await self.analyze_funnel(funnel_data)
+            return {"funnel_id": funnel_id, "content_hash": content_hash, "analysis": analysis}
+        
+        def collect(done) -> List[Dict]:
+            results = []
+            for task in done:
+                result = task.result()
+                content_hash = result.pop("content_hash")
+                # Les analyses de démo ne sont pas checkpointées : elles seront rejouées
+                if result["analysis"].get("model_used") == "demo":
+                    progress["fallback"] += 1
+                    result["status"] = "fallback"
+                else:
+                    checkpoint.record(result["funnel_id"], content_hash, result["analysis"])
+                    progress["completed"] += 1
+                    result["status"] = "completed"
+                results.append(result)
+            
+            progress["in_flight"] = len(pending)
+            progress["elapsed"] = round(time.time() - start_time, 2)
+            if progress_callback:
+                progress_callback(dict(progress))
+            done_count = progress["completed"] + progress["fallback"]
+            if done_count and done_count % settings["progress_every"] < len(done):
+                self.logger.info(f"📦 Analyse en masse: {done_count} funnels traités ({progress['skipped']} déjà faits)")
+            return results
+        
+        pending = set()
+        finished = False
+        try:
+            for funnel_data in funnels:
+                # Empreinte du contenu : un funnel modifié depuis le checkpoint est réanalysé
+                content_hash = cache_key("funnel", PROMPT_TEMPLATE_VERSION, funnel_data)
+                funnel_id = str(funnel_data.get("id") or content_hash)
+                if (funnel_id, content_hash) in checkpoint:
+                    progress["skipped"] += 1
+                    continue
+                
+                # Fenêtre bornée : jamais plus de `concurrency` analyses en vol
+                if len(pending) >= concurrency:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for result in collect(done):
+                        yield result
+                pending.add(asyncio.ensure_future(run(funnel_id, content_hash, funnel_data)))
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for result in collect(done):
+                    yield result
+            # Exécution complète : le checkpoint ne sert plus (les replis restent à reprendre)
+            finished = not progress["fallback"]
+        finally:
+            for task in pending:
+                task.cancel()
+            if finished:
+                checkpoint.finish()
+            else:
+                checkpoint.close()
+    
+    def quick_analysis(self, funnel_data: Dict) -> Dict:
+        """Analyse heuristique instantanée (règles sur la structure du funnel, sans Gemini)"""
+        from heuristic_analyzer import analyze_structure
+        
+        start_time = time.perf_counter()
+        analysis = analyze_structure(funnel_data)
+        analysis["processing_time"] = f"{time.perf_counter() - start_time:.4f}s"
+        analysis["agent"] = "Morphius v2.1 (Heuristic)"
+        analysis["model_used"] = "heuristic"
+        return analysis
+    
+    def _get_demo_analysis(self, funnel_data: Dict) -> Dict:
+        """Analyse de repli : heuristique locale, marquée démo (non checkpointée, retentée en file)"""
+        analysis = self.quick_analysis(funnel_data)
+        analysis["agent"] = "Morphius v2.1 (Demo Mode)"
+        analysis["model_used"] = "demo"
+        return analysis
     
     async def optimize_step(self, step_data: Dict, funnel_context: Dict) -> Dict:
         """Optimise une étape spécifique"""
         
         if not self.gemini_configured:
+            self._record_event("demo", "optimization", "optimize_step")
             return self._get_demo_optimization(step_data)
         
+        key = cache_key(
+            self.models["optimization"],
+            PROMPT_TEMPLATE_VERSION,
+            {"step": step_data, "context": funnel_context},
+        )
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            self._record_event("cache_hit", "optimization", "optimize_step")
+            return cached
+        
+        return await self.single_flight.do(
+            key, lambda: self._run_step_optimization(step_data, funnel_context, key)
+        )
+    
+    async def _run_step_optimization(self, step_data: Dict, funnel_context: Dict, key: str) -> Dict:
+        """Appel Gemini pour optimize_step (une seule exécution par clé en vol)"""
         try:
-            model = genai.GenerativeModel(self.models["optimization"])
+            prompt = OPTIMIZE_STEP_PROMPT.render(context=funnel_context, step=step_data).text
             
-            prompt = f"""
-            🧠 AGENT MORPHIUS - OPTIMISATION ÉTAPE
-            Framework: Nümtema AGENCY
+            async def attempt() -> Dict:
+                await self.rate_limiters["optimization"].acquire()
+                model = genai.GenerativeModel(self.models["optimization"])
+                
+                with METRICS.track("gemini", self.models["optimization"], "optimize_step") as call:
+                    response = await model.generate_content_async(prompt)
+                    call.set_usage(response, prompt)
+                    return extract_json(response.text, OPTIMIZATION_SCHEMA)
             
-            ÉTAPE À OPTIMISER:
-            {json.dumps(step_data, ensure_ascii=False, indent=2)}
+            optimization = await self._call_gemini("optimization", "optimize_step", attempt)
+            optimization["agent"] = "Morphius v2.1"
+            optimization["model_used"] = self.models["optimization"]
+            optimization["timestamp"] = datetime.now().isoformat()
+            self.response_cache.set(key, optimization)
             
-            CONTEXTE FUNNEL:
-            {json.dumps(funnel_context, ensure_ascii=False, indent=2)}
+            return optimization
+                
+        except Exception as e:
+            self.logger.error(f"Erreur optimisation étape: {e}")
+            self._record_event("demo", "optimization", "optimize_step")
+            return self._get_demo_optimization(step_data)
+    
+    async def optimize_funnel_steps(self, steps: List[Dict], funnel_context: Dict) -> List[Dict]:
+        """Optimise toutes les étapes en un seul appel (même schéma que optimize_step)"""
+        
+        if not self.gemini_configured:
+            self._record_event("demo", "optimization", "optimize_funnel_steps")
+            return [self._get_demo_optimization(step) for step in steps]
+        
+        keys = [
+            cache_key(self.models["optimization"], PROMPT_TEMPLATE_VERSION, {"step": step, "context": funnel_context})
+            for step in steps
+        ]
+        results: List[Optional[Dict]] = [self.response_cache.get(key) for key in keys]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if not missing:
+            return results
+        
+        try:
+            # Le contexte est envoyé une seule fois, sans les étapes déjà listées
+            shared_context = {k: v for k, v in funnel_context.items() if k != "steps"}
+            indexed_steps = [{"step_index": index, **steps[index]} for index in missing]
             
-            OPTIMISATION DEMANDÉE:
-            1. Titre optimisé (plus engageant)
-            2. Contenu amélioré (psychologie persuasive)
-            3. Options de réponse optimisées
-            4. Suggestions visuelles
-            5. Micro-copy amélioré
+            prompt = OPTIMIZE_STEPS_PROMPT.render(context=shared_context, steps=indexed_steps).text
             
-            RÉPONDEZ EN JSON:
-            {{
-                "optimized_title": "nouveau titre optimisé",
-                "optimized_content": "nouveau contenu optimisé", 
-                "optimized_options": ["option 1 optimisée", "option 2 optimisée"],
-                "visual_suggestions": [
-                    {{
-                        "element": "élément visuel",
-                        "suggestion": "suggestion d'amélioration",
-                        "reasoning": "justification psychologique"
-                    }}
-                ],
-                "expected_improvement": "pourcentage d'amélioration attendu",
-                "confidence": 0.0-1.0
-            }}
-            """
+            async def attempt() -> Dict:
+                await self.rate_limiters["optimization"].acquire()
+                model = genai.GenerativeModel(self.models["optimization"])
+                
+                with METRICS.track("gemini", self.models["optimization"], "optimize_funnel_steps") as call:
+                    response = await model.generate_content_async(prompt)
+                    call.set_usage(response, prompt)
+                    return extract_json(response.text, STEPS_OPTIMIZATION_SCHEMA)
             
-            response = await model.generate_content_async(prompt)
-            json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
+            packed = await self._call_gemini("optimization", "optimize_funnel_steps", attempt)
             
-            if json_match:
-                optimization = json.loads(json_match.group())
+            timestamp = datetime.now().isoformat()
+            for optimization in packed["steps"]:
+                if not isinstance(optimization, dict):
+                    continue
+                index = optimization.pop("step_index", None)
+                if index not in missing or results[index] is not None:
+                    continue
                 optimization["agent"] = "Morphius v2.1"
                 optimization["model_used"] = self.models["optimization"]
-                optimization["timestamp"] = datetime.now().isoformat()
-                
-                return optimization
-            else:
-                raise ValueError("Impossible de parser la réponse JSON")
-                
+                optimization["timestamp"] = timestamp
+                self.response_cache.set(keys[index], optimization)
+                results[index] = optimization
+        
         except Exception as e:
-            self.logger.error(f"Erreur optimisation étape: {e}")
-            return self._get_demo_optimization(step_data)
+            self.logger.error(f"Erreur optimisation funnel: {e}")
+        
+        # Étapes absentes de la réponse groupée : repli sur optimize_step en parallèle
+        remaining = [index for index, result in enumerate(results) if result is None]
+        if remaining:
+            self._record_event("fallback", "optimization", "optimize_funnel_steps")
+            fallbacks = await asyncio.gather(*[
+                self.optimize_step(steps[index], funnel_context) for index in remaining
+            ])
+            for index, optimization in zip(remaining, fallbacks):
+                results[index] = optimization
+        
+        return results
     
     def _get_demo_optimization(self, step_data: Dict) -> Dict:
         """Retourne une optimisation de démonstration"""
@@ -358,100 +749,205 @@ class AgentMorphius:
         }
     
     async def generate_insights(self, user_data: Dict) -> List[Dict]:
-        """Génère des insights personnalisés"""
-        
-        insights = [
-            {
-                "type": "optimization",
-                "title": "Optimisation Détectée",
-                "message": "Réorganiser l'étape 3 pourrait augmenter la conversion de 15%",
-                "priority": "high",
-                "impact": "+15%",
-                "action_required": "Modifier l'ordre des questions",
-                "confidence": 0.85,
-                "agent": "Morphius v2.1",
-                "timestamp": datetime.now().isoformat()
-            },
-            {
-                "type": "trend",
-                "title": "Tendance Positive",
-                "message": "Vos funnels B2B performent 23% mieux que la moyenne",
-                "priority": "info",
-                "impact": "+23%",
-                "action_required": "Continuer cette stratégie",
-                "confidence": 0.92,
-                "agent": "Morphius v2.1",
-                "timestamp": datetime.now().isoformat()
-            },
-            {
-                "type": "recommendation",
-                "title": "Nouvelle Fonctionnalité",
-                "message": "Ajouter une étape de qualification améliorerait le ROI",
-                "priority": "medium",
-                "impact": "+8%",
-                "action_required": "Implémenter une étape de scoring",
-                "confidence": 0.78,
-                "agent": "Morphius v2.1",
-                "timestamp": datetime.now().isoformat()
-            }
-        ]
+        """Génère des insights personnalisés (agrégats incrémentaux, sans relecture de l'historique)"""
+        from insights_aggregator import timestamped
         
-        return insights
+        # Lot écrit dans SQLite dès son ingestion (un processus tué ne perd rien),
+        # dans un thread : la transaction ne bloque pas la boucle asyncio
+        aggregator = self.insights_aggregator
+        aggregator.ingest(user_data)
+        await asyncio.to_thread(aggregator.write, aggregator.pending_writes())
+        
+        user_id = user_data.get("user_id") or user_data.get("id")
+        funnel_ids = [funnel["id"] for funnel in user_data.get("funnels") or [] if isinstance(funnel, dict) and "id" in funnel]
+        insights = self.insights_aggregator.insights(funnel_ids or None, user_id=user_id)
+        insights = insights[:GLOBAL_CONFIG["insights"]["max_insights"]]
+        
+        if not insights:
+            insights = [{
+                "type": "recommendation",
+                "title": "Données Insuffisantes",
+                "message": "Pas encore assez de trafic pour dégager une tendance fiable",
+                "priority": "info",
+                "impact": "N/A",
+                "action_required": "Activer le suivi des vues et des étapes de vos funnels",
+                "confidence": 0.5,
+            }]
+        return timestamped(insights, "Morphius v2.1")
     
     async def predict_conversion(self, funnel_data: Dict, historical_data: List[Dict]) -> Dict:
-        """Prédit le taux de conversion"""
+        """Prédit le taux de conversion (modèle local ajusté sur l'historique)"""
         
-        return {
-            "predicted_conversion_rate": 24.5,
-            "confidence_interval": {"min": 18.2, "max": 31.8},
-            "influencing_factors": [
-                {
-                    "factor": "Nombre d'étapes",
-                    "impact": "négatif",
-                    "weight": 0.3
-                },
-                {
-                    "factor": "Qualité des questions",
-                    "impact": "positif", 
-                    "weight": 0.5
-                }
-            ],
-            "scenarios": {
-                "optimistic": {"rate": 31.8, "conditions": "Optimisations appliquées"},
-                "realistic": {"rate": 24.5, "conditions": "État actuel"},
-                "pessimistic": {"rate": 18.2, "conditions": "Sans améliorations"}
-            },
-            "improvement_recommendations": [
-                {
-                    "action": "Réduire le nombre d'étapes",
-                    "expected_lift": "+12%",
-                    "effort_required": "Moyen"
-                }
-            ],
-            "model_confidence": 0.83,
-            "agent": "Morphius v2.1",
-            "timestamp": datetime.now().isoformat()
-        }
+        from conversion_model import ConversionModel  # NumPy chargé au premier usage
+        
+        prediction = ConversionModel().fit(historical_data).predict(funnel_data)
+        prediction["agent"] = "Morphius v2.1"
+        prediction["timestamp"] = datetime.now().isoformat()
+        return prediction
+    
+    def predict_conversions_batch(self, funnels: List[Dict], historical_data: List[Dict]) -> List[Dict]:
+        """Prédit le taux de conversion de nombreux funnels en un appel vectorisé"""
+        from conversion_model import ConversionModel
+        
+        return ConversionModel().fit(historical_data).predict_many(funnels)
+
+    def job_handlers(self) -> Dict[str, Callable[[Dict], Any]]:
+        """Handlers de la file de tâches, par type de tâche"""
+        
+        async def analyze(job: Dict) -> Dict:
+            return self._job_result(job, await self.analyze_funnel(job["payload"]["funnel_data"]))
+        
+        async def optimize(job: Dict) -> Dict:
+            payload = job["payload"]
+            return self._job_result(job, await self.optimize_step(payload["step_data"], payload["funnel_context"]))
+        
+        return {"analyze_funnel": analyze, "optimize_step": optimize}
+    
+    def _job_result(self, job: Dict, result: Dict) -> Dict:
+        """Un repli démo dû à une erreur Gemini est retenté ; à la dernière tentative, il est rendu"""
+        from job_queue import is_last_attempt
+        
+        degraded = str(result.get("agent", "")).endswith("(Demo Mode)")
+        if degraded and self.gemini_configured and not is_last_attempt(job):
+            raise RuntimeError("Réponse de repli (mode démo) après une erreur Gemini")
+        return result
+
+# Instance globale de l'agent, créée au premier appel d'API
+_agent_morphius: Optional[AgentMorphius] = None
+
+def get_agent() -> AgentMorphius:
+    """Retourne l'agent partagé (initialisation paresseuse)"""
+    global _agent_morphius
+    if _agent_morphius is None:
+        _agent_morphius = AgentMorphius()
+    return _agent_morphius
 
-# Instance globale de l'agent
-agent_morphius = AgentMorphius()
+# File de tâches partagée : enqueue/get n'ont pas besoin de l'agent (ni de Gemini)
+_job_queue = None
+
+def get_job_queue():
+    """Retourne la file de tâches persistante JobQueue (ouverte au premier usage)"""
+    global _job_queue
+    if _job_queue is None:
+        from job_queue import JobQueue
+        settings = GLOBAL_CONFIG["job_queue"]
+        _job_queue = JobQueue(settings["database_path"], max_attempts=settings["max_attempts"])
+    return _job_queue
+
+def __getattr__(name: str):
+    # Compatibilité : `from agent_morphius_fixed import agent_morphius`
+    if name == "agent_morphius":
+        return get_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def bind_request_id() -> str:
+    """Identifiant de la requête courante pour les logs (structured_logging importé au premier appel)"""
+    from structured_logging import bind_request_id as bind
+    return bind()
 
 # Fonctions utilitaires pour l'API
 async def analyze_funnel_with_ai(funnel_data: Dict) -> Dict:
     """Interface pour l'API d'analyse"""
-    return await agent_morphius.analyze_funnel(funnel_data)
+    bind_request_id()
+    return await get_agent().analyze_funnel(funnel_data)
+
+async def analyze_funnels_bulk_with_ai(
+    funnels: Iterable[Dict],
+    checkpoint_path: Optional[str] = None,
+    run_id: Optional[str] = None,
+) -> AsyncIterator[Dict]:
+    """Interface pour l'API d'analyse en masse (run_id : reprise d'une exécution interrompue)"""
+    bind_request_id()
+    async for result in get_agent().analyze_funnels_bulk(funnels, checkpoint_path=checkpoint_path, run_id=run_id):
+        yield result
+
+async def analyze_funnel_stream_with_ai(funnel_data: Dict) -> AsyncIterator[Dict]:
+    """Interface pour l'API d'analyse en streaming"""
+    bind_request_id()
+    async for event in get_agent().analyze_funnel_stream(funnel_data):
+        yield event
+
+async def quick_funnel_analysis(funnel_data: Dict) -> Dict:
+    """Interface pour l'API d'analyse heuristique instantanée"""
+    bind_request_id()
+    return get_agent().quick_analysis(funnel_data)
 
 async def optimize_step_with_ai(step_data: Dict, funnel_context: Dict) -> Dict:
     """Interface pour l'API d'optimisation"""
-    return await agent_morphius.optimize_step(step_data, funnel_context)
+    bind_request_id()
+    return await get_agent().optimize_step(step_data, funnel_context)
+
+async def optimize_funnel_steps_with_ai(steps: List[Dict], funnel_context: Dict) -> List[Dict]:
+    """Interface pour l'API d'optimisation du funnel complet"""
+    bind_request_id()
+    return await get_agent().optimize_funnel_steps(steps, funnel_context)
 
 async def generate_user_insights(user_data: Dict) -> List[Dict]:
     """Interface pour l'API d'insights"""
-    return await agent_morphius.generate_insights(user_data)
+    bind_request_id()
+    return await get_agent().generate_insights(user_data)
 
 async def predict_funnel_conversion(funnel_data: Dict, historical_data: List[Dict]) -> Dict:
     """Interface pour l'API de prédiction"""
-    return await agent_morphius.predict_conversion(funnel_data, historical_data)
+    bind_request_id()
+    return await get_agent().predict_conversion(funnel_data, historical_data)
+
+async def predict_funnel_conversions_batch(funnels: List[Dict], historical_data: List[Dict]) -> List[Dict]:
+    """Interface pour l'API de prédiction en masse"""
+    bind_request_id()
+    return get_agent().predict_conversions_batch(funnels, historical_data)
+
+async def enqueue_funnel_analysis(funnel_data: Dict, priority: int = 0, idempotency_key: Optional[str] = None) -> Dict:
+    """Met une analyse en file et rend la main immédiatement"""
+    job_id = get_job_queue().enqueue("analyze_funnel", {"funnel_data": funnel_data}, priority, idempotency_key)
+    return {"job_id": job_id, "status": get_job_queue().get(job_id)["status"]}
+
+async def enqueue_step_optimization(step_data: Dict, funnel_context: Dict, priority: int = 0,
+                                    idempotency_key: Optional[str] = None) -> Dict:
+    """Met une optimisation d'étape en file et rend la main immédiatement"""
+    job_id = get_job_queue().enqueue(
+        "optimize_step", {"step_data": step_data, "funnel_context": funnel_context}, priority, idempotency_key
+    )
+    return {"job_id": job_id, "status": get_job_queue().get(job_id)["status"]}
+
+async def get_job(job_id: str) -> Dict:
+    """État d'une tâche : status, attempts, result (une fois terminée), error"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return {"job_id": job_id, "status": "unknown"}
+    return {
+        "job_id": job_id,
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+async def run_job_worker(concurrency: Optional[int] = None, stop_when_idle: bool = False) -> Dict:
+    """Exécute les tâches en file avec les méthodes de l'agent (jusqu'à l'arrêt du processus)"""
+    from job_queue import JobWorkerPool
+    
+    settings = GLOBAL_CONFIG["job_queue"]
+    pool = JobWorkerPool(
+        get_job_queue(),
+        get_agent().job_handlers(),
+        concurrency=concurrency or settings["concurrency"],
+        visibility_timeout=settings["visibility_timeout"],
+        poll_interval=settings["poll_interval"],
+        backoff_base=settings["backoff_base"],
+        backoff_max=settings["backoff_max"],
+    )
+    await pool.run(stop_when_idle=stop_when_idle)
+    return pool.stats
+
+def get_agent_metrics() -> Dict:
+    """Snapshot des métriques LLM (latences, tokens, taux d'échec)"""
+    return METRICS.snapshot()
+
+def get_agent_metrics_prometheus() -> str:
+    """Métriques LLM au format texte Prometheus"""
+    return METRICS.prometheus()
 
 if __name__ == "__main__":
     # Test de l'agent
@@ -468,7 +964,7 @@ if __name__ == "__main__":
     
     async def test_agent():
         print("🧠 Test Agent Morphius...")
-        analysis = await agent_morphius.analyze_funnel(test_funnel)
+        analysis = await get_agent().analyze_funnel(test_funnel)
         print("Analyse:", json.dumps(analysis, ensure_ascii=False, indent=2))
     
     asyncio.run(test_agent())
@@ -5,11 +5,16 @@ Nümtema AGENCY - Framework Exclusif
 
 import asyncio
 import json
-import time
-from typing import Dict, Any, Optional
+from typing import Dict
 from datetime import datetime
 
 from settings_manager import get_settings_manager, AIProviderConfig
+from heuristic_analyzer import analyze_structure
+from json_extract import ANALYSIS_SCHEMA, extract_json
+from provider_clients import ProviderClientPool
+from rate_limit import adaptive_limiter
+from resilience import AllProvidersFailedError, ResilientExecutor
+from telemetry import METRICS
 
 # Imports conditionnels des IA
 try:
@@ -30,12 +35,47 @@ try:
 except ImportError:
     ANTHROPIC_AVAILABLE = False
 
+# Disjoncteurs par provider et hedging de la chaîne de fallback
+RESILIENCE_CONFIG = {
+    "breaker": {
+        "window_size": 20,
+        "failure_rate_threshold": 0.5,
+        "min_calls": 5,
+        "open_seconds": 30.0,
+        "half_open_max_calls": 1
+    },
+    "hedge": False,
+    "hedge_percentile": 0.95,
+    "hedge_min_samples": 20,
+    "hedge_default_delay": 2.0,
+    # Disjoncteurs et latences partagés entre les processus lancés à chaque requête
+    "persist_path": "logs/provider_health.db",
+    # Limiteur AIMD partagé par provider / modèle (voir rate_limit.AdaptiveLimiter) ;
+    # le disjoncteur ne voit l'échec qu'une fois les retries sur quota épuisés
+    "adaptive_limits": {
+        "initial_limit": 4,
+        "min_limit": 1,
+        "max_limit": 32,
+        "deadline": 20.0,
+        "max_attempts": 4
+    }
+}
+
 class AgentMorphiusWithSettings:
     """Agent Morphius avec configuration UI dynamique"""
     
     def __init__(self):
         self.settings = get_settings_manager()
         self.logger = self._setup_logging()
+        self.clients = ProviderClientPool()
+        self.executor = ResilientExecutor(
+            breaker_options=RESILIENCE_CONFIG["breaker"],
+            hedge=getattr(self.settings.general_settings, "hedge_requests", RESILIENCE_CONFIG["hedge"]),
+            hedge_percentile=RESILIENCE_CONFIG["hedge_percentile"],
+            hedge_min_samples=RESILIENCE_CONFIG["hedge_min_samples"],
+            hedge_default_delay=RESILIENCE_CONFIG["hedge_default_delay"],
+            persist_path=RESILIENCE_CONFIG["persist_path"],
+        )
         
     def _setup_logging(self):
         import logging
@@ -47,52 +87,61 @@ class AgentMorphiusWithSettings:
         
         # Vérifier le mode démo
         if self.settings.is_demo_mode():
+            METRICS.record_event("demo", "demo", "demo", "analyze_funnel_with_ui_settings")
             return self._get_demo_analysis(funnel_data)
         
         # Obtenir le provider actif
         active_provider = self.settings.get_active_provider()
         if not active_provider:
             self.logger.warning("Aucun provider IA configuré, utilisation du mode démo")
+            METRICS.record_event("demo", "demo", "demo", "analyze_funnel_with_ui_settings")
             return self._get_demo_analysis(funnel_data)
         
-        # Essayer avec le provider principal
+        # Chaîne: provider principal puis fallbacks (disjoncteurs et hedging gérés par l'executor)
+        providers = [active_provider]
+        if self.settings.general_settings.auto_fallback:
+            providers += [
+                provider for provider in self.settings.get_fallback_providers()[1:]
+                if provider.id != active_provider.id
+            ]
+        
+        def log_failure(provider: AIProviderConfig, error: BaseException):
+            self.logger.error(f"Erreur avec {provider.name}: {error}")
+        
         try:
-            return await self._analyze_with_provider(funnel_data, active_provider)
-        except Exception as e:
-            self.logger.error(f"Erreur avec {active_provider.name}: {e}")
-            
-            # Essayer les fallbacks si activés
-            if self.settings.general_settings.auto_fallback:
-                fallback_providers = self.settings.get_fallback_providers()
-                
-                for provider in fallback_providers[1:]:  # Skip le premier (déjà essayé)
-                    try:
-                        self.logger.info(f"Tentative avec fallback: {provider.name}")
-                        return await self._analyze_with_provider(funnel_data, provider)
-                    except Exception as fallback_error:
-                        self.logger.error(f"Fallback {provider.name} échoué: {fallback_error}")
-                        continue
-            
+            result = await self.executor.run(
+                providers,
+                lambda provider: self._analyze_with_provider(funnel_data, provider),
+                on_error=log_failure,
+            )
+        except AllProvidersFailedError:
             # Tous les providers ont échoué, utiliser le mode démo
             self.logger.warning("Tous les providers ont échoué, utilisation du mode démo")
+            METRICS.record_event("demo", active_provider.id, active_provider.model, "analyze_funnel_with_ui_settings")
             return self._get_demo_analysis(funnel_data)
+        
+        if result.get("provider_used") != active_provider.name:
+            METRICS.record_event("fallback", active_provider.id, active_provider.model, "analyze_funnel_with_ui_settings")
+        return result
     
     async def _analyze_with_provider(self, funnel_data: Dict, provider: AIProviderConfig) -> Dict:
         """Analyse avec un provider spécifique"""
         
         if provider.id == "gemini" and GEMINI_AVAILABLE:
-            return await self._analyze_with_gemini(funnel_data, provider)
+            attempt = lambda: self._analyze_with_gemini(funnel_data, provider)
         elif provider.id == "openai" and OPENAI_AVAILABLE:
-            return await self._analyze_with_openai(funnel_data, provider)
+            attempt = lambda: self._analyze_with_openai(funnel_data, provider)
         elif provider.id == "anthropic" and ANTHROPIC_AVAILABLE:
-            return await self._analyze_with_anthropic(funnel_data, provider)
+            attempt = lambda: self._analyze_with_anthropic(funnel_data, provider)
         else:
             raise Exception(f"Provider {provider.id} non disponible")
+        
+        limiter = adaptive_limiter(provider.id, provider.model, RESILIENCE_CONFIG["adaptive_limits"])
+        return await limiter.call(attempt, "analyze_funnel_with_ui_settings")
     
     async def _analyze_with_gemini(self, funnel_data: Dict, provider: AIProviderConfig) -> Dict:
         """Analyse avec Gemini"""
-        genai.configure(api_key=provider.api_key)
-        model = genai.GenerativeModel(provider.model)
+        model = self.clients.for_provider(provider)
         
         prompt = f"""
         🧠 AGENT MORPHIUS - ANALYSE FUNNEL PREMIUM
@@ -106,94 +155,81 @@ class AgentMorphiusWithSettings:
         - confidence_level (0-1)
         """
         
-        response = await model.generate_content_async(prompt)
-        
-        # Parser la réponse JSON
-        import re
-        json_match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if json_match:
-            result = json.loads(json_match.group())
-            result["provider_used"] = provider.name
-            result["model_used"] = provider.model
-            return result
-        else:
-            raise Exception("Impossible de parser la réponse Gemini")
+        with METRICS.track(provider.id, provider.model, "analyze_funnel_with_ui_settings") as call:
+            response = await model.generate_content_async(prompt)
+            call.set_usage(response, prompt)
+            
+            # Parser la réponse JSON
+            result = extract_json(response.text, ANALYSIS_SCHEMA)
+        result["provider_used"] = provider.name
+        result["model_used"] = provider.model
+        return result
     
     async def _analyze_with_openai(self, funnel_data: Dict, provider: AIProviderConfig) -> Dict:
         """Analyse avec OpenAI"""
-        client = openai.OpenAI(api_key=provider.api_key)
-        
-        response = await client.chat.completions.acreate(
-            model=provider.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Tu es l'Agent Morphius, expert en analyse de funnels. Réponds toujours en JSON valide."
-                },
-                {
-                    "role": "user", 
-                    "content": f"Analyse ce funnel: {json.dumps(funnel_data)}"
-                }
-            ]
-        )
+        client = self.clients.for_provider(provider)
         
-        result = json.loads(response.choices[0].message.content)
+        with METRICS.track(provider.id, provider.model, "analyze_funnel_with_ui_settings") as call:
+            response = await client.chat.completions.create(
+                model=provider.model,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": "Tu es l'Agent Morphius, expert en analyse de funnels. Réponds toujours en JSON valide."
+                    },
+                    {
+                        "role": "user", 
+                        "content": f"Analyse ce funnel: {json.dumps(funnel_data)}"
+                    }
+                ]
+            )
+            call.set_usage(response)
+            
+            result = extract_json(response.choices[0].message.content, ANALYSIS_SCHEMA)
         result["provider_used"] = provider.name
         result["model_used"] = provider.model
         return result
     
     async def _analyze_with_anthropic(self, funnel_data: Dict, provider: AIProviderConfig) -> Dict:
         """Analyse avec Anthropic"""
-        client = anthropic.Anthropic(api_key=provider.api_key)
-        
-        response = await client.messages.acreate(
-            model=provider.model,
-            max_tokens=1000,
-            messages=[
-                {
-                    "role": "user",
-                    "content": f"Analyse ce funnel en JSON: {json.dumps(funnel_data)}"
-                }
-            ]
-        )
+        client = self.clients.for_provider(provider)
         
-        result = json.loads(response.content[0].text)
+        with METRICS.track(provider.id, provider.model, "analyze_funnel_with_ui_settings") as call:
+            response = await client.messages.create(
+                model=provider.model,
+                max_tokens=1000,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": f"Analyse ce funnel en JSON: {json.dumps(funnel_data)}"
+                    }
+                ]
+            )
+            call.set_usage(response)
+            
+            result = extract_json(response.content[0].text, ANALYSIS_SCHEMA)
         result["provider_used"] = provider.name
         result["model_used"] = provider.model
         return result
     
+    async def shutdown(self):
+        """Ferme proprement les clients IA partagés et l'état des disjoncteurs"""
+        await self.clients.aclose()
+        self.executor.close()
+    
     def _get_demo_analysis(self, funnel_data: Dict) -> Dict:
-        """Analyse de démonstration"""
-        return {
-            "overall_score": 78.5,
-            "conversion_prediction": 24.2,
-            "engagement_factors": [
-                "Design professionnel",
-                "Questions pertinentes",
-                "Call-to-action clair"
-            ],
-            "friction_points": [
-                "Formulaire potentiellement trop long",
-                "Manque de preuve sociale"
-            ],
-            "recommendations": [
-                {
-                    "type": "urgency",
-                    "description": "Ajouter un timer d'urgence",
-                    "expected_improvement": "+25% conversion"
-                },
-                {
-                    "type": "social_proof",
-                    "description": "Intégrer des témoignages",
-                    "expected_improvement": "+18% crédibilité"
-                }
-            ],
-            "confidence_level": 0.85,
+        """Analyse de démonstration (heuristique locale sur la structure du funnel)"""
+        analysis = analyze_structure(funnel_data)
+        psychology = analysis["psychological_analysis"]
+        analysis["engagement_factors"] = psychology["engagement_factors"]
+        analysis["friction_points"] = psychology["friction_points"]
+        analysis.update({
             "provider_used": "Mode Démo",
             "model_used": "simulation",
             "timestamp": datetime.now().isoformat(),
             "agent": "Morphius Ultimate v3.0"
-        }
+        })
+        return analysis
 
 # Instance globale
 agent_morphius_ui = AgentMorphiusWithSettings()
@@ -213,5 +249,6 @@ if __name__ == "__main__":
         
         result = await agent_morphius_ui.analyze_funnel_with_ui_settings(test_funnel)
         print(json.dumps(result, indent=2, ensure_ascii=False))
+        await agent_morphius_ui.shutdown()
     
     asyncio.run(test())
@@ -6,30 +6,68 @@ Nümtema AGENCY - Framework Exclusif
 import subprocess
 import sys
 import os
+import re
 import json
 import time
 import logging
-from typing import Dict, List, Optional
+import argparse
+import importlib
+from importlib import metadata
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/installer.log'),
-        logging.StreamHandler()
-    ]
+from dependency_lock import (
+    environment_mismatches, inputs_digest, merge_pins, parse_requirement, read_lock, read_requirements,
+    requirement_lines, scan_wheelhouse, verify_wheelhouse, write_lock,
 )
+
 logger = logging.getLogger(__name__)
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Verrou unifié et wheels pré-téléchargées (mode hors ligne)
+DEFAULT_LOCK_PATH = PROJECT_ROOT / "requirements.lock"
+DEFAULT_WHEELHOUSE = PROJECT_ROOT / "wheelhouse"
+
+def setup_logging():
+    """Configuration du logging (après création du dossier logs)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('logs/installer.log'),
+            logging.StreamHandler()
+        ]
+    )
+
+# Modules de la bibliothèque standard (aucune distribution pip à vérifier)
+STDLIB_MODULES = getattr(sys, "stdlib_module_names", frozenset({"asyncio"}))
+
+def version_tuple(version: str) -> Tuple[int, ...]:
+    """'1.26.4' -> (1, 26, 4) ; suffixes (rc1, .post1, +local) ignorés"""
+    parts = []
+    for part in version.split("+")[0].split("."):
+        match = re.match(r"\d+", part)
+        if match is None:
+            break
+        parts.append(int(match.group()))
+    return tuple(parts)
+
+def same_version(installed: str, pinned: str) -> bool:
+    """Égalité au sens de pip (==) : '1.0' et '1.0.0' sont équivalents"""
+    left, right = version_tuple(installed), version_tuple(pinned)
+    width = max(len(left), len(right))
+    return left + (0,) * (width - len(left)) == right + (0,) * (width - len(right))
+
 class DependencyInstaller:
     """Installateur automatique de dépendances avec retry et fallback"""
     
-    def __init__(self):
+    def __init__(self, lock_path: Path = DEFAULT_LOCK_PATH, wheelhouse: Path = DEFAULT_WHEELHOUSE):
+        self.lock_path = Path(lock_path)
+        self.wheelhouse = Path(wheelhouse)
         self.required_packages = {
             "google-generativeai": "0.8.3",
             "python-dotenv": "1.0.0",
+            "numpy": "1.26.4",  # Prédiction de conversion locale
             "asyncio": None,  # Built-in
             "aiofiles": "23.2.1",
             "requests": "2.31.0",
@@ -38,51 +76,91 @@ class DependencyInstaller:
         }
         self.installation_log = []
         self.failed_packages = []
+        # Packages réellement présents : déjà conformes ou installés puis revérifiés
+        self.verified_packages: List[str] = []
+        self.phase_timings: Dict[str, float] = {}
         
-    def check_package(self, package_name: str) -> bool:
-        """Vérifie si un package est installé"""
+    def installed_version(self, package_name: str) -> Optional[str]:
+        """Version installée d'une distribution (métadonnées pip, sans import du package)"""
         try:
-            __import__(package_name.replace('-', '_'))
+            return metadata.version(package_name)
+        except metadata.PackageNotFoundError:
+            return None
+    
+    def check_package(self, package_name: str, version: Optional[str] = None) -> bool:
+        """Vérifie si un package est installé, dans la version épinglée (==) si elle est donnée"""
+        if package_name in STDLIB_MODULES:
             return True
-        except ImportError:
+        installed = self.installed_version(package_name)
+        if installed is None:
             return False
+        # Même comparaison que l'installation (package==version)
+        return version is None or same_version(installed, version)
     
-    def install_package(self, package: str, version: Optional[str] = None, retry_count: int = 3) -> bool:
-        """Installe un package avec retry automatique"""
-        package_spec = f"{package}=={version}" if version else package
+    def present_packages(self) -> List[str]:
+        """Packages requis présents, quelle que soit leur version (versions fixées par le verrou)"""
+        importlib.invalidate_caches()
+        return [
+            package for package in self.required_packages
+            if package in STDLIB_MODULES or self.installed_version(package) is not None
+        ]
+    
+    def plan_installation(self) -> List[Tuple[str, Optional[str]]]:
+        """Packages absents ou trop anciens (une seule lecture des métadonnées par package)"""
+        plan = []
+        for package, version in self.required_packages.items():
+            if self.check_package(package, version):
+                logger.info(f"✅ {package} déjà installé")
+                self.verified_packages.append(package)
+            else:
+                plan.append((package, version))
+        return plan
+    
+    def _pip_install(self, specs: List[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", "pip", "install", "--upgrade", *specs],
+            capture_output=True,
+            text=True,
+            timeout=300 + 60 * len(specs)  # 5 minutes + 1 minute par package
+        )
+    
+    def install_packages(self, plan: List[Tuple[str, Optional[str]]], retry_count: int = 3) -> bool:
+        """Installe tout le plan en une seule invocation pip, avec retry automatique"""
+        specs = [f"{package}=={version}" if version else package for package, version in plan]
         
         for attempt in range(retry_count):
             try:
-                logger.info(f"📦 Installation de {package_spec} (tentative {attempt + 1}/{retry_count})")
-                
-                result = subprocess.run(
-                    [sys.executable, "-m", "pip", "install", package_spec, "--upgrade"],
-                    capture_output=True,
-                    text=True,
-                    timeout=300  # 5 minutes timeout
-                )
+                logger.info(f"📦 Installation de {' '.join(specs)} (tentative {attempt + 1}/{retry_count})")
+                result = self._pip_install(specs)
                 
                 if result.returncode == 0:
-                    logger.info(f"✅ {package} installé avec succès")
-                    self.installation_log.append({
-                        "package": package,
-                        "version": version,
-                        "status": "success",
-                        "attempt": attempt + 1
-                    })
+                    for package, version in plan:
+                        logger.info(f"✅ {package} installé avec succès")
+                        self.installation_log.append({
+                            "package": package,
+                            "version": version,
+                            "status": "success",
+                            "attempt": attempt + 1
+                        })
                     return True
                 else:
-                    logger.warning(f"⚠️ Échec installation {package}: {result.stderr}")
+                    logger.warning(f"⚠️ Échec installation groupée: {result.stderr}")
                     
             except subprocess.TimeoutExpired:
-                logger.error(f"⏰ Timeout lors de l'installation de {package}")
+                logger.error(f"⏰ Timeout lors de l'installation de {', '.join(specs)}")
             except Exception as e:
-                logger.error(f"❌ Erreur installation {package}: {e}")
+                logger.error(f"❌ Erreur installation groupée: {e}")
                 
             if attempt < retry_count - 1:
                 wait_time = 2 ** attempt  # Exponential backoff
                 logger.info(f"⏳ Attente {wait_time}s avant nouvelle tentative...")
                 time.sleep(wait_time)
+        return False
+    
+    def install_package(self, package: str, version: Optional[str] = None, retry_count: int = 3) -> bool:
+        """Installe un package avec retry automatique"""
+        if self.install_packages([(package, version)], retry_count):
+            return True
         
         self.failed_packages.append(package)
         self.installation_log.append({
@@ -94,28 +172,158 @@ class DependencyInstaller:
         return False
     
     def install_all(self) -> Dict[str, bool]:
-        """Installe tous les packages requis"""
+        """Installe tous les packages requis : vérification, plan, un seul pip, vérification finale"""
         logger.info("🔧 Début de l'installation des dépendances Agent Morphius...")
+        self.phase_timings = {}
+        self.verified_packages = []
         
-        results = {}
-        for package, version in self.required_packages.items():
-            if package == "asyncio":  # Skip built-in modules
-                results[package] = True
+        start = time.perf_counter()
+        if self.matches_lock():
+            self.verified_packages = self.present_packages()
+            self.phase_timings["check"] = time.perf_counter() - start
+            return {package: package in self.verified_packages for package in self.required_packages}
+        plan = self.plan_installation()
+        self.phase_timings["check"] = time.perf_counter() - start
+        results = {package: True for package in self.required_packages}
+        
+        start = time.perf_counter()
+        if plan and not self.install_packages(plan):
+            # Le pip groupé échoue en bloc : installations séparées pour isoler les
+            # packages fautifs, l'une après l'autre (un seul pip écrit dans site-packages)
+            logger.warning("⚠️ Installation groupée impossible, installation package par package")
+            for package, version in plan:
+                results[package] = self.install_package(package, version, retry_count=1)
+        self.phase_timings["install"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        importlib.invalidate_caches()  # métadonnées des distributions fraîchement installées
+        for package, version in plan:
+            if not results[package]:
                 continue
-                
-            if self.check_package(package):
-                logger.info(f"✅ {package} déjà installé")
-                results[package] = True
+            if self.check_package(package, version):
+                self.verified_packages.append(package)
             else:
-                results[package] = self.install_package(package, version)
+                logger.warning(f"⚠️ {package} toujours absent après installation")
+                results[package] = False
+                self.failed_packages.append(package)
+        self.phase_timings["verify"] = time.perf_counter() - start
         
         return results
     
+    def unified_requirements(self) -> Tuple[List[str], List[str]]:
+        """Exigences fusionnées (requirements.txt > required_packages > install_dependencies.py) et conflits"""
+        from install_dependencies import PACKAGES
+        
+        merged, conflicts = merge_pins([
+            ("requirements.txt", read_requirements(str(PROJECT_ROOT / "requirements.txt"))),
+            ("auto_installer.py", [(name, "", version) for name, version in self.required_packages.items()]),
+            ("install_dependencies.py", [parsed for parsed in map(parse_requirement, PACKAGES) if parsed]),
+        ], skip=[name for name in self.required_packages if name in STDLIB_MODULES] + ["asyncio"])
+        for conflict in conflicts:
+            logger.warning(f"⚠️ Versions divergentes: {conflict}")
+        return requirement_lines(merged), conflicts
+    
+    def matches_lock(self) -> bool:
+        """Environnement déjà conforme au verrou (lecture des métadonnées seulement)"""
+        if not self.lock_path.exists():
+            return False
+        lock, _ = read_lock(str(self.lock_path))
+        if lock and not environment_mismatches(lock):
+            logger.info(f"✅ Environnement conforme à {self.lock_path.name} ({len(lock)} packages), rien à installer")
+            return True
+        return False
+    
+    def build_wheelhouse(self) -> bool:
+        """Résout le verrou unifié et télécharge toutes les wheels (transitives comprises)"""
+        self.phase_timings = {}
+        start = time.perf_counter()
+        lines, conflicts = self.unified_requirements()
+        self.wheelhouse.mkdir(parents=True, exist_ok=True)
+        requirements_in = self.wheelhouse / "requirements.in"
+        requirements_in.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        self.phase_timings["resolve"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        logger.info(f"📦 Téléchargement des wheels de {len(lines)} packages dans {self.wheelhouse}")
+        try:
+            result = subprocess.run(
+                [sys.executable, "-m", "pip", "wheel", "--wheel-dir", str(self.wheelhouse), "-r", str(requirements_in)],
+                capture_output=True,
+                text=True,
+                timeout=1800
+            )
+        except subprocess.TimeoutExpired:
+            logger.error("⏰ Timeout lors du téléchargement des wheels")
+            return False
+        self.phase_timings["download"] = time.perf_counter() - start
+        if result.returncode != 0:
+            logger.error(f"❌ Échec de pip wheel: {result.stderr}")
+            return False
+        
+        start = time.perf_counter()
+        wheels = scan_wheelhouse(str(self.wheelhouse))
+        write_lock(str(self.lock_path), wheels, inputs_digest(lines), conflicts)
+        self.phase_timings["lock"] = time.perf_counter() - start
+        logger.info(f"🔒 {self.lock_path.name} écrit : {len(wheels)} distributions avec hash sha256")
+        return True
+    
+    def install_offline(self) -> bool:
+        """Installe le verrou depuis le wheelhouse (--no-index), après vérification des hash"""
+        self.phase_timings = {}
+        self.verified_packages = []
+        start = time.perf_counter()
+        if not self.lock_path.exists():
+            logger.error(f"❌ {self.lock_path} absent : lancez d'abord build-wheelhouse")
+            self.failed_packages = list(self.required_packages)
+            return False
+        lock, digest = read_lock(str(self.lock_path))
+        if digest != inputs_digest(self.unified_requirements()[0]):
+            logger.warning("⚠️ Verrou obsolète (exigences modifiées depuis build-wheelhouse)")
+        mismatches = environment_mismatches(lock)
+        self.phase_timings["check"] = time.perf_counter() - start
+        if not mismatches:
+            logger.info(f"✅ Environnement conforme à {self.lock_path.name}, rien à installer")
+            self.verified_packages = self.present_packages()
+            return True
+        
+        start = time.perf_counter()
+        errors = verify_wheelhouse(lock, str(self.wheelhouse))
+        self.phase_timings["verify_hashes"] = time.perf_counter() - start
+        if errors:
+            for error in errors:
+                logger.error(f"❌ {error}")
+            self.failed_packages = [error.split("==", 1)[0] for error in errors]
+            return False
+        
+        # Hors ligne : pas de retry (aucun réseau à attendre), pip revérifie les hash
+        start = time.perf_counter()
+        logger.info(f"📦 Installation hors ligne de {len(mismatches)} packages depuis {self.wheelhouse}")
+        result = subprocess.run(
+            [sys.executable, "-m", "pip", "install", "--no-index", "--find-links", str(self.wheelhouse),
+             "--require-hashes", "-r", str(self.lock_path)],
+            capture_output=True,
+            text=True,
+            timeout=600
+        )
+        self.phase_timings["install"] = time.perf_counter() - start
+        if result.returncode != 0:
+            logger.error(f"❌ Échec installation hors ligne: {result.stderr}")
+            self.failed_packages = [mismatch.split("==", 1)[0] for mismatch in mismatches]
+            return False
+        
+        start = time.perf_counter()
+        importlib.invalidate_caches()
+        self.failed_packages = [mismatch.split("==", 1)[0] for mismatch in environment_mismatches(lock)]
+        self.verified_packages = [package for package in self.present_packages() if package not in self.failed_packages]
+        self.phase_timings["verify"] = time.perf_counter() - start
+        return not self.failed_packages
+    
     def generate_report(self) -> Dict:
         """Génère un rapport d'installation"""
-        successful = len([log for log in self.installation_log if log["status"] == "success"])
-        failed = len(self.failed_packages)
+        failed = len(set(self.failed_packages))
         total = len(self.required_packages)
+        # Seulement les packages vérifiés (conformes d'emblée ou installés puis revérifiés)
+        successful = len(set(self.verified_packages))
         
         return {
             "timestamp": time.time(),
@@ -123,6 +331,7 @@ class DependencyInstaller:
             "successful": successful,
             "failed": failed,
             "success_rate": (successful / total) * 100,
+            "phase_timings": self.phase_timings,
             "failed_packages": self.failed_packages,
             "installation_log": self.installation_log,
             "recommendations": self.get_recommendations()
@@ -142,13 +351,33 @@ class DependencyInstaller:
         
         return recommendations
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Installation des dépendances Agent Morphius")
+    parser.add_argument("command", nargs="?", default="install", choices=["install", "build-wheelhouse"])
+    parser.add_argument("--offline", action="store_true", help="installer depuis le wheelhouse (--no-index)")
+    parser.add_argument("--lock", default=str(DEFAULT_LOCK_PATH))
+    parser.add_argument("--wheelhouse", default=str(DEFAULT_WHEELHOUSE))
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
     """Point d'entrée principal"""
+    args = parse_args(argv)
     # Créer les dossiers nécessaires
     os.makedirs("logs", exist_ok=True)
+    setup_logging()
+    
+    installer = DependencyInstaller(args.lock, args.wheelhouse)
+    if args.command == "build-wheelhouse":
+        success = installer.build_wheelhouse()
+        print("⏱️  Phases: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in installer.phase_timings.items()))
+        print(f"{'✅' if success else '❌'} Wheelhouse: {args.wheelhouse} | verrou: {args.lock}")
+        return success
     
-    installer = DependencyInstaller()
-    results = installer.install_all()
+    if args.offline:
+        success = installer.install_offline()
+    else:
+        installer.install_all()
+        success = True
     report = installer.generate_report()
     
     # Sauvegarder le rapport
@@ -161,6 +390,7 @@ def main():
     print("="*60)
     print(f"✅ Packages installés: {report['successful']}/{report['total_packages']}")
     print(f"📈 Taux de succès: {report['success_rate']:.1f}%")
+    print("⏱️  Phases: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in report['phase_timings'].items()))
     
     if report['failed_packages']:
         print(f"❌ Échecs: {', '.join(report['failed_packages'])}")
@@ -172,7 +402,7 @@ def main():
     print("🌐 Nümtema AGENCY - https://www.numtemaagency.com")
     print("📞 Contact: 07 45 43 42 40")
     
-    return report['success_rate'] > 80  # Succès si > 80%
+    return success and report['success_rate'] > 80  # Succès si > 80%
 
 if __name__ == "__main__":
     success = main()
@@ -0,0 +1,217 @@
+"""
+Benchmark - Limiteur adaptatif (AIMD, 429 / 503, Retry-After)
+Nümtema AGENCY - Framework Exclusif
+
+Un serveur HTTP local joue le provider et impose un quota : QUOTA_RPS
+requêtes par fenêtre d'une seconde (429 + Retry-After jusqu'à la fenêtre
+suivante) et MAX_CONCURRENT requêtes simultanées (503). Un faux SDK Gemini
+envoie chaque appel de l'agent à ce serveur.
+
+BURST analyses distinctes sont lancées d'un coup :
+1. sans limiteur adaptatif : les refus du provider finissent en mode démo ;
+2. avec limiteur : concurrence ajustée en AIMD, Retry-After respecté,
+   retries jitterés dans l'échéance ; aucune analyse en démo, attente en
+   file mesurée par la télémétrie.
+Le même limiteur partagé sert ensuite dans plusieurs asyncio.run successifs
+(un par requête / job) sans erreur de boucle.
+"""
+
+import asyncio
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import agent_morphius_fixed
+from agent_morphius_fixed import GLOBAL_CONFIG
+from fake_provider import FakeProviderError
+from rate_limit import TokenBucket, adaptive_limiter, adaptive_limiters_snapshot
+from telemetry import METRICS
+
+BURST = 400
+QUOTA_RPS = 100
+MAX_CONCURRENT = 16
+SERVER_LATENCY = 0.05
+
+RESPONSE = json.dumps({
+    "overall_score": 70,
+    "conversion_prediction": 21.0,
+    "issues": [],
+    "recommendations": [],
+    "confidence_level": 0.8,
+})
+
+
+class QuotaServer(ThreadingHTTPServer):
+    """Provider local : quota par fenêtre d'une seconde et plafond de concurrence"""
+
+    daemon_threads = True
+    request_queue_size = 2048
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), QuotaHandler)
+        self.lock = threading.Lock()
+        self.window = 0
+        self.window_count = 0
+        self.in_flight = 0
+        self.counts = {200: 0, 429: 0, 503: 0}
+
+    def admit(self):
+        """(statut, Retry-After) de la requête entrante"""
+        with self.lock:
+            now = time.time()
+            window = int(now)
+            if window != self.window:
+                self.window, self.window_count = window, 0
+            if self.window_count >= QUOTA_RPS:
+                self.counts[429] += 1
+                return 429, str(max(1, math.ceil(window + 1 - now)))
+            if self.in_flight >= MAX_CONCURRENT:
+                self.counts[503] += 1
+                return 503, None
+            self.window_count += 1
+            self.in_flight += 1
+            self.counts[200] += 1
+            return 200, None
+
+    def reset(self):
+        with self.lock:
+            self.counts = {200: 0, 429: 0, 503: 0}
+
+
+class QuotaHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status, retry_after = self.server.admit()
+        body = b"{}"
+        if status == 200:
+            time.sleep(SERVER_LATENCY)
+            with self.server.lock:
+                self.server.in_flight -= 1
+            body = RESPONSE.encode("utf-8")
+        self.send_response(status)
+        if retry_after:
+            self.send_header("Retry-After", retry_after)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class QuotaModel:
+    """generate_content_async via HTTP vers le serveur de quota"""
+
+    def __init__(self, port: int, name: str):
+        self.port = port
+        self.name = name
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        payload = prompt.encode("utf-8")
+        writer.write(
+            f"POST /v1/models/{self.name}:generateContent HTTP/1.0\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n".encode("ascii") + payload
+        )
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+        head, _, body = raw.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split()[1])
+        headers = {key.lower(): value.strip() for key, _, value in (line.partition(":") for line in lines[1:])}
+        if status != 200:
+            error = FakeProviderError(f"{status} quota dépassé", status_code=status)
+            error.response = SimpleNamespace(status_code=status, headers=headers)
+            raise error
+        return SimpleNamespace(text=body.decode("utf-8"))
+
+
+class QuotaGenAI:
+    def __init__(self, port: int):
+        self.port = port
+
+    def configure(self, **kwargs):
+        pass
+
+    def GenerativeModel(self, name: str) -> QuotaModel:
+        return QuotaModel(self.port, name)
+
+
+async def burst(agent, label: str, server: QuotaServer, enabled: bool):
+    GLOBAL_CONFIG["adaptive_limits"]["enabled"] = enabled
+    server.reset()
+    METRICS.reset()
+    funnels = [{"id": f"{label}-{i}", "steps": [{"type": "welcome", "title": f"Funnel {i}"}]} for i in range(BURST)]
+    start = time.perf_counter()
+    analyses = await asyncio.gather(*[agent.analyze_funnel(funnel) for funnel in funnels])
+    elapsed = time.perf_counter() - start
+    demo = sum(analysis["model_used"] == "demo" for analysis in analyses)
+    counts = dict(server.counts)
+    print(f"{label:<16}: {BURST - demo:3d}/{BURST} analyses Gemini, {demo:3d} en démo | "
+          f"provider : {counts[200]} acceptées, {counts[429]} × 429, {counts[503]} × 503 | {elapsed:5.2f}s")
+    return demo, counts, elapsed
+
+
+def check_event_loops(runs: int = 3):
+    """Limiteur et token bucket partagés, sollicités en concurrence dans des boucles successives"""
+    limiter = adaptive_limiter("local", "boucles", {"initial_limit": 1})
+    bucket = TokenBucket(rate=1000, burst=1)
+
+    async def contended():
+        async def call():
+            await bucket.acquire()
+            async with limiter.slot("boucles"):
+                await asyncio.sleep(0.001)
+        await asyncio.gather(*(call() for _ in range(8)))
+
+    for _ in range(runs):
+        asyncio.run(contended())
+    assert limiter.in_flight == 0
+    print(f"✅ {runs} asyncio.run successifs avec le même limiteur partagé")
+
+
+async def main():
+    print("📊 BENCHMARK LIMITEUR ADAPTATIF")
+    print(f"Quota du provider local : {QUOTA_RPS} req/s, {MAX_CONCURRENT} simultanées, {SERVER_LATENCY * 1000:.0f} ms")
+    server = QuotaServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    agent_morphius_fixed.genai = QuotaGenAI(server.server_address[1])
+    os.environ.setdefault("GEMINI_API_KEY", "local-quota-server")
+    GLOBAL_CONFIG["rate_limits"] = {"default": {"rate": 1e6, "burst": 1000}}
+    agent = agent_morphius_fixed.get_agent()
+    try:
+        naive_demo, naive_counts, _ = await burst(agent, "sans limiteur", server, enabled=False)
+        demo, counts, elapsed = await burst(agent, "limiteur AIMD", server, enabled=True)
+    finally:
+        agent.shutdown()
+        server.shutdown()
+
+    waits = METRICS.snapshot()["queue_waits"][0]
+    limiter = adaptive_limiters_snapshot()[0]
+    print(f"⏱️  Attente en file : moyenne {waits['wait_avg'] * 1000:.0f} ms, p95 ≤ {waits['wait_p95']:.2f}s, "
+          f"max {waits['wait_max']:.2f}s ({waits['count']} acquisitions)")
+    print(f"Limiteur final : limite {limiter['limit']}, {limiter['decreases']} réductions, "
+          f"{limiter['retried']} retries, {limiter['throttled']} refus reçus")
+    print(f"Débit utile : {(BURST - demo) / elapsed:.0f} analyses/s pour un quota de {QUOTA_RPS} req/s")
+    assert naive_demo > BURST // 2
+    assert demo == 0
+    assert counts[429] + counts[503] < (naive_counts[429] + naive_counts[503]) / 4
+    assert "morphius_llm_queue_wait_seconds_count" in METRICS.prometheus()
+    print("✅ Quota respecté : aucune analyse en démo sous rafale")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        asyncio.run(main())
+        check_event_loops()
@@ -0,0 +1,95 @@
+"""
+Benchmark - Construction de AgentMorphius() avec un historique de 100 000 analyses
+Nümtema AGENCY - Framework Exclusif
+
+Chaque requête d'API lance un interpréteur neuf et construit l'agent : la
+construction ne doit ni relire l'historique ni reconstruire d'index. La
+base logs/agent_memory.db est remplie de ROWS analyses, puis AgentMorphius()
+est chronométré (import exclu) dans RUNS processus neufs. Référence :
+relecture complète de l'historique (ancien démarrage, load_memory()).
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(SCRIPTS_DIR)
+
+from memory_store import ExperienceStore
+
+ROWS = 100_000
+BATCH = 20_000
+RUNS = 5
+STARTUP_BUDGET_MS = 100
+
+CHECK = f"""
+import sys, time
+sys.path.insert(0, {os.path.abspath(SCRIPTS_DIR)!r})
+import agent_morphius_fixed
+start = time.perf_counter()
+agent = agent_morphius_fixed.AgentMorphius()
+elapsed = (time.perf_counter() - start) * 1000
+context = agent._relevant_memory({{"title": "Quiz minceur", "steps": [{{"title": "Votre objectif santé ?"}}]}})
+agent.shutdown()
+print(f"{{elapsed:.2f}} {{len(context['optimizations'])}}")
+"""
+
+
+def analysis(i: int) -> dict:
+    theme = ("minceur", "coaching", "immobilier", "formation", "santé")[i % 5]
+    return {
+        "timestamp": "2025-01-01T00:00:00",
+        "funnel_id": f"funnel-{i % 5000}",
+        "analysis": {
+            "overall_score": 40 + i % 55,
+            "strengths": [f"Quiz {theme} bien structuré"],
+            "issues": [{"problem": f"Étape {theme} trop longue", "solution": "Simplifier le formulaire"}],
+        },
+    }
+
+
+def construct(cwd: str, env: dict) -> tuple:
+    """(durée de AgentMorphius() en ms, expériences retrouvées)"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHECK], cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed, found = result.stdout.strip().splitlines()[-1].split()
+    return float(elapsed), int(found)
+
+
+def main():
+    print("📊 BENCHMARK DÉMARRAGE DE L'AGENT")
+    env = {key: value for key, value in os.environ.items() if key != "GEMINI_API_KEY"}
+    with tempfile.TemporaryDirectory() as cwd:
+        store = ExperienceStore(os.path.join(cwd, "logs", "agent_memory.db"))
+        for start in range(0, ROWS, BATCH):
+            store.append_many("optimizations", [analysis(i) for i in range(start, start + BATCH)])
+
+        start = time.perf_counter()
+        memory = store.load_memory()
+        full_ms = (time.perf_counter() - start) * 1000
+        store.close()
+        print(f"Historique : {len(memory['optimizations']):,} analyses | relecture complète (ancien démarrage) : "
+              f"{full_ms:.0f} ms")
+
+        # Premier run : compile les .pyc, non mesuré
+        construct(cwd, env)
+        samples, found = [], 0
+        for _ in range(RUNS):
+            elapsed, found = construct(cwd, env)
+            samples.append(elapsed)
+
+    median = statistics.median(samples)
+    print(f"AgentMorphius() : médiane {median:.1f} ms, max {max(samples):.1f} ms "
+          f"(budget {STARTUP_BUDGET_MS} ms, {RUNS} processus) | {found} expériences retrouvées via FTS5")
+    assert median <= STARTUP_BUDGET_MS, f"construction trop lente : {median:.1f} ms > {STARTUP_BUDGET_MS} ms"
+    assert found > 0
+    print("✅ Construction indépendante de la taille de l'historique")
+
+
+if __name__ == "__main__":
+    main()
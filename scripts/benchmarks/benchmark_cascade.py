@@ -0,0 +1,188 @@
+"""
+Benchmark - Cascade fast_draft -> analysis sur réponses rejouées
+Nümtema AGENCY - Framework Exclusif
+
+Rejoue, sans réseau, les réponses enregistrées des deux modèles pour chaque
+funnel (latence enregistrée comprise, accélérée x TIME_SCALE) et compare le
+mode pro seul au mode cascade : latence, coût (tokens x tarifs de
+GLOBAL_CONFIG["cascade"]["prices"]), taux d'escalade et accord avec la
+réponse pro seule (score global et prédiction de conversion proches).
+
+Enregistrement : python benchmark_cascade.py [enregistrement.jsonl]
+Une ligne par funnel : {"funnel": {...}, "responses": {modèle: {"text": ..., "latency": s}}}.
+Sans fichier, un enregistrement synthétique déterministe est généré.
+"""
+
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import agent_morphius_fixed
+from agent_morphius_fixed import GLOBAL_CONFIG, AgentMorphius
+from model_cascade import call_cost, funnel_complexity
+from telemetry import METRICS
+
+FUNNELS = 200
+TIME_SCALE = 1000  # 1 s enregistrée = 1 ms rejouée
+SCORE_TOLERANCE = 10
+CONVERSION_TOLERANCE = 3.0
+FLASH = GLOBAL_CONFIG["llm_model_configs"]["fast_draft"]
+PRO = GLOBAL_CONFIG["llm_model_configs"]["analysis"]
+
+
+def analysis_text(rng: random.Random, score: float, confidence: float) -> str:
+    return json.dumps({
+        "overall_score": round(max(0, min(100, score))),
+        "conversion_prediction": round(max(0.5, score / 4), 1),
+        "strengths": ["Promesse claire", "Peu d'étapes avant la valeur"],
+        "issues": [{"problem": f"Friction étape {rng.randint(1, 5)}", "solution": "Réduire les champs",
+                    "impact": "+8%", "priority": "high"}],
+        "recommendations": [{"type": "flow", "description": "Barre de progression",
+                             "expected_improvement": "+10%", "implementation_difficulty": "easy"}],
+        "psychological_analysis": {"user_journey_flow": "Linéaire", "friction_points": ["Formulaire"],
+                                   "engagement_factors": ["Quiz"]},
+        "ab_test_suggestions": [],
+        "confidence_level": round(confidence, 2),
+    }, ensure_ascii=False)
+
+
+def synthetic_recording(seed: int = 11) -> list:
+    """Brouillon d'autant plus éloigné de la réponse pro qu'il est peu confiant ; 8 % illisibles"""
+    rng = random.Random(seed)
+    recording = []
+    for i in range(FUNNELS):
+        funnel = {
+            "id": f"replay-{i:04d}",
+            "steps": [
+                {"id": f"s{j}", "type": "form", "fields": [{"id": f"f{k}"} for k in range(rng.randint(0, 3))],
+                 "options": ["Oui", "Non"][:rng.randint(0, 2)]}
+                for j in range(rng.randint(2, 16))
+            ],
+        }
+        complexity = funnel_complexity(funnel)
+        score = rng.uniform(35, 90)
+        confidence = rng.uniform(0.45, 0.97)
+        if rng.random() < 0.08:
+            draft = "Je ne peux pas fournir d'analyse structurée pour ce funnel."
+        else:
+            draft = analysis_text(rng, score + rng.gauss(0, (1 - confidence) * 25), confidence)
+        recording.append({
+            "funnel": funnel,
+            "responses": {
+                FLASH: {"text": draft, "latency": 2.0 + 0.04 * complexity},
+                PRO: {"text": analysis_text(rng, score, 0.85), "latency": 8.0 + 0.2 * complexity},
+            },
+        })
+    return recording
+
+
+def load_recording(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ReplayResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+def replay_genai(recording: list, replayed: list):
+    """Faux SDK : réponse enregistrée du modèle ; la latence enregistrée est ajoutée à `replayed`"""
+    by_id = {entry["funnel"]["id"]: entry["responses"] for entry in recording}
+
+    class ReplayModel:
+        def __init__(self, name: str):
+            self.name = name
+
+        async def generate_content_async(self, prompt: str, stream: bool = False):
+            # Les données du funnel sont la dernière ligne du prompt (JSON compact)
+            funnel_id = json.loads(prompt.rsplit("\n", 1)[1])["id"]
+            recorded = by_id[funnel_id][self.name]
+            replayed.append(recorded["latency"])
+            await asyncio.sleep(recorded["latency"] / TIME_SCALE)
+            return ReplayResponse(recorded["text"])
+
+    class ReplayGenAI:
+        GenerativeModel = ReplayModel
+
+    return ReplayGenAI
+
+
+async def run_mode(recording: list, replayed: list, cascade: bool) -> tuple:
+    GLOBAL_CONFIG["cascade"]["enabled"] = cascade
+    METRICS.reset()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        agent = AgentMorphius()
+        agent.gemini_configured = True
+        latencies, results = [], {}
+        for entry in recording:
+            replayed.clear()
+            start = time.perf_counter()
+            analysis = await agent.analyze_funnel(entry["funnel"])
+            # Latence enregistrée des appels + temps local réel (non accéléré)
+            recorded = sum(replayed)
+            latencies.append(recorded + time.perf_counter() - start - recorded / TIME_SCALE)
+            assert analysis["model_used"] != "demo"
+            results[entry["funnel"]["id"]] = analysis
+        agent.shutdown()
+    prices = GLOBAL_CONFIG["cascade"]["prices"]
+    cost = sum(call_cost(call["model"], call["prompt_tokens"], call["response_tokens"], prices)
+               for call in METRICS.snapshot()["calls"])
+    return results, latencies, cost
+
+
+def agrees(candidate: dict, reference: dict) -> bool:
+    return (abs(candidate["overall_score"] - reference["overall_score"]) <= SCORE_TOLERANCE
+            and abs(candidate.get("conversion_prediction", 0) - reference.get("conversion_prediction", 0))
+            <= CONVERSION_TOLERANCE)
+
+
+def report(label: str, latencies: list, cost: float):
+    ordered = sorted(latencies)
+    print(f"{label:<12} | latence moy {statistics.mean(ordered):5.2f} s | p95 {ordered[int(len(ordered) * 0.95)]:5.2f} s "
+          f"| coût ${cost:.4f} pour {len(ordered)} funnels")
+
+
+async def main(path: str = None):
+    print("📊 BENCHMARK CASCADE fast_draft -> analysis")
+    recording = load_recording(path) if path else synthetic_recording()
+    replayed = []
+    agent_morphius_fixed.genai = replay_genai(recording, replayed)
+    GLOBAL_CONFIG["rate_limits"] = {"default": {"rate": 1e6, "burst": 1000}}
+    cwd = os.getcwd()
+    try:
+        pro, pro_latencies, pro_cost = await run_mode(recording, replayed, cascade=False)
+        cascade, cascade_latencies, cascade_cost = await run_mode(recording, replayed, cascade=True)
+    finally:
+        os.chdir(cwd)
+
+    report("pro seul", pro_latencies, pro_cost)
+    report("cascade", cascade_latencies, cascade_cost)
+    kept = [funnel_id for funnel_id, analysis in cascade.items() if not analysis["cascade"]["escalated"]]
+    reasons = {}
+    for analysis in cascade.values():
+        reason = analysis["cascade"]["reason"]
+        if reason:
+            reasons[reason] = reasons.get(reason, 0) + 1
+    agreement = sum(agrees(cascade[i], pro[i]) for i in pro) / len(pro)
+    draft_agreement = sum(agrees(cascade[i], pro[i]) for i in kept) / max(1, len(kept))
+    print(f"Brouillons retenus : {len(kept)}/{len(pro)} | escalades : {reasons}")
+    print(f"Accord avec pro seul : {agreement:.1%} (brouillons retenus : {draft_agreement:.1%}, "
+          f"tolérance ±{SCORE_TOLERANCE} pts de score, ±{CONVERSION_TOLERANCE} pts de conversion)")
+    print(f"Seuils : confidence_level >= {GLOBAL_CONFIG['cascade']['min_confidence']}, "
+          f"complexité <= {GLOBAL_CONFIG['cascade']['max_complexity']}")
+    assert cascade_cost < pro_cost
+    assert statistics.mean(cascade_latencies) < statistics.mean(pro_latencies)
+    print("✅ Cascade moins chère et plus rapide que le modèle pro seul")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
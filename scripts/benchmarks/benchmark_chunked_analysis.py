@@ -0,0 +1,192 @@
+"""
+Benchmark - Analyse map-reduce des grands funnels contre le prompt unique
+Nümtema AGENCY - Framework Exclusif
+
+Faux SDK Gemini dont la latence dépend de la taille du prompt et de la
+réponse (délai du premier token + prefill + décodage, profils ci-dessous,
+accélérés x TIME_SCALE) et qui refuse les prompts au-delà de CONTEXT_LIMIT
+tokens (fenêtre utile simulée). Funnels vidéo synthétiques de 20 à 90
+étapes (médias, textes, options, styles), sans réseau.
+
+Pour chaque taille : latence, plus gros prompt envoyé, analyses en démo
+(dépassement de contexte) et coût (tarifs de GLOBAL_CONFIG["cascade"]),
+en prompt unique, en map-reduce avec fusion fast_draft, fusion analysis,
+et réduction locale seule.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import agent_morphius_fixed
+from agent_morphius_fixed import GLOBAL_CONFIG
+from fake_provider import FakeProviderError
+from json_extract import ANALYSIS_SCHEMA, validate
+from model_cascade import call_cost
+from prompt_templates import estimate_tokens
+from telemetry import METRICS
+
+SIZES = (20, 45, 90)
+FUNNELS_PER_SIZE = 6
+TIME_SCALE = 50  # 1 s simulée = 20 ms réelles
+CONTEXT_LIMIT = 16_000
+FLASH = GLOBAL_CONFIG["llm_model_configs"]["fast_draft"]
+PRO = GLOBAL_CONFIG["llm_model_configs"]["analysis"]
+
+# Profils de latence supposés : premier token (s), prefill et décodage (tokens/s)
+PROFILES = {
+    PRO: {"first_token": 0.8, "prefill": 8_000, "decode": 90},
+    FLASH: {"first_token": 0.35, "prefill": 20_000, "decode": 250},
+}
+
+
+def analysis_text(prompt: str) -> str:
+    seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+    score = 45 + seed % 40
+    return json.dumps({
+        "overall_score": score,
+        "conversion_prediction": round(score / 4, 1),
+        "strengths": ["Vidéos courtes et rythmées", f"Accroche n°{seed % 7}"],
+        "issues": [
+            {"problem": f"Friction à l'étape {seed % 50 + 1}", "solution": "Raccourcir la vidéo",
+             "impact": "+6% completion", "priority": "high"},
+            {"problem": "Questions trop rapprochées", "solution": "Intercaler une preuve sociale",
+             "impact": "+4% engagement", "priority": "medium"},
+        ],
+        "recommendations": [{"type": "flow", "description": "Ajouter des paliers de progression",
+                             "expected_improvement": "+10% completion", "implementation_difficulty": "easy"}],
+        "psychological_analysis": {"user_journey_flow": "Progression régulière, fatigue en milieu de parcours",
+                                   "friction_points": ["Durée totale des vidéos"],
+                                   "engagement_factors": ["Personnalisation"]},
+        "ab_test_suggestions": [{"element": "Vidéo d'ouverture", "variant_a": "90 s", "variant_b": "30 s",
+                                 "hypothesis": "Une ouverture courte réduit l'abandon"}],
+        "confidence_level": 0.8,
+    }, ensure_ascii=False)
+
+
+class SizedModel:
+    def __init__(self, name: str):
+        self.name = name
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        prompt_tokens = estimate_tokens(prompt)
+        if prompt_tokens > CONTEXT_LIMIT:
+            raise FakeProviderError(f"400 prompt de {prompt_tokens} tokens hors fenêtre", status_code=400)
+        text = analysis_text(prompt)
+        profile = PROFILES[self.name]
+        seconds = (profile["first_token"] + prompt_tokens / profile["prefill"]
+                   + estimate_tokens(text) / profile["decode"])
+        await asyncio.sleep(seconds / TIME_SCALE)
+        return SimpleNamespace(text=text)
+
+
+class SizedGenAI:
+    GenerativeModel = SizedModel
+
+    @staticmethod
+    def configure(**kwargs):
+        pass
+
+
+def video_funnel(label: str, index: int, steps: int) -> dict:
+    return {
+        "id": f"{label}-{steps}-{index}",
+        "title": "Masterclass vidéo - Transformation 90 jours",
+        "type": "video_funnel",
+        "steps": [
+            {
+                "id": f"s{j}",
+                "type": "video" if j % 3 else "choice",
+                "title": f"Module {j} : la méthode en pratique",
+                "content": "Regardez la vidéo puis répondez à la question pour débloquer la suite. " * 3,
+                "media": {"type": "video", "url": f"https://cdn.example.com/videos/module-{j}.mp4",
+                          "alt": f"Vidéo du module {j}", "autoplay": True, "captions": "fr"},
+                "options": ["Oui, tout à fait", "Plutôt oui", "Plutôt non", "Pas du tout"] if j % 3 == 0 else [],
+                "styling": {"background": "#0F172A", "accent": "#F59E0B", "layout": "split"},
+            }
+            for j in range(1, steps + 1)
+        ],
+    }
+
+
+def cost() -> float:
+    prices = GLOBAL_CONFIG["cascade"]["prices"]
+    return sum(call_cost(call["model"], call["prompt_tokens"], call["response_tokens"], prices)
+               for call in METRICS.snapshot()["calls"])
+
+
+async def run(agent, label: str, steps: int) -> dict:
+    METRICS.reset()
+    latencies, demo = [], 0
+    for index in range(FUNNELS_PER_SIZE):
+        start = time.perf_counter()
+        analysis = await agent.analyze_funnel(video_funnel(label, index, steps))
+        latencies.append((time.perf_counter() - start) * TIME_SCALE)
+        if analysis["model_used"] == "demo":
+            demo += 1
+        else:
+            validate(dict(analysis), ANALYSIS_SCHEMA)
+    calls = METRICS.snapshot()["calls"]
+    largest = max((call["prompt_tokens"] / call["count"] for call in calls), default=0)
+    return {"latency": statistics.median(latencies), "demo": demo, "largest": largest,
+            "cost": cost() / FUNNELS_PER_SIZE, "analysis": analysis}
+
+
+async def main():
+    print("📊 BENCHMARK ANALYSE MAP-REDUCE")
+    agent_morphius_fixed.genai = SizedGenAI
+    os.environ.setdefault("GEMINI_API_KEY", "offline-sized")
+    GLOBAL_CONFIG["rate_limits"] = {"default": {"rate": 1e6, "burst": 1000}}
+    GLOBAL_CONFIG["adaptive_limits"]["limiter"].update(initial_limit=64)
+    # Les analyses précédentes ne sont pas réinjectées : prompts comparables d'un mode à l'autre
+    GLOBAL_CONFIG["memory_retrieval"]["top_k"] = 0
+    settings = GLOBAL_CONFIG["chunked_analysis"]
+    agent = agent_morphius_fixed.get_agent()
+
+    modes = (
+        ("prompt unique", {"enabled": False}),
+        ("map-reduce", {"enabled": True, "merge_pass": True, "merge_model": "fast_draft"}),
+        ("map-reduce + pro", {"enabled": True, "merge_pass": True, "merge_model": "analysis"}),
+        ("réduction locale", {"enabled": True, "merge_pass": False}),
+    )
+    print(f"Seuil : {settings['min_steps']} étapes ou {settings['max_funnel_tokens']} tokens ; "
+          f"fenêtres de {settings['window_steps']} étapes ; contexte simulé {CONTEXT_LIMIT} tokens")
+    print(f"{'mode':<18} {'étapes':>6} {'latence s':>10} {'prompt max':>11} {'démo':>5} {'coût $':>9}")
+    results = {}
+    try:
+        for steps in SIZES:
+            for label, overrides in modes:
+                settings.update(overrides)
+                results[(label, steps)] = result = await run(agent, label.replace(" ", "_"), steps)
+                print(f"{label:<18} {steps:>6} {result['latency']:>10.2f} {result['largest']:>11,.0f} "
+                      f"{result['demo']:>5} {result['cost']:>9.4f}")
+    finally:
+        settings.update(enabled=True, merge_pass=True, merge_model="fast_draft")
+        agent.shutdown()
+
+    # Sous le seuil, le mode map-reduce n'intervient pas
+    assert results[("map-reduce", 20)]["analysis"].get("chunked") is None
+    chunked = results[("map-reduce", 45)]["analysis"]["chunked"]
+    print(f"Funnel de 45 étapes : {chunked['segments']} segments, fusion par {chunked['merged_by']}")
+    for steps in SIZES[1:]:
+        single, mapped = results[("prompt unique", steps)], results[("map-reduce", steps)]
+        assert mapped["demo"] == 0
+        if not single["demo"]:
+            assert mapped["latency"] < single["latency"] and mapped["largest"] < single["largest"] / 2
+    assert results[("prompt unique", 90)]["demo"] == FUNNELS_PER_SIZE
+    gain = results[("prompt unique", 45)]["latency"] / results[("map-reduce", 45)]["latency"]
+    print(f"✅ 45 étapes : {gain:.1f}x plus rapide ; 90 étapes : plus aucun dépassement de contexte")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark - Réutilisation des connexions du pool de clients IA
+Nümtema AGENCY - Framework Exclusif
+
+Un serveur HTTP local imite l'API OpenAI (chat.completions) et compte les
+connexions TCP ouvertes : 1 000 appels via ProviderClientPool doivent
+réutiliser quelques connexions seulement, contre une par appel avec un
+client neuf à chaque requête (comportement précédent).
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from provider_clients import ProviderClientPool
+
+CALLS = 1_000
+FRESH_CALLS = 100
+CONCURRENCY = 10
+COMPLETION = {
+    "id": "chatcmpl-local",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{
+        "index": 0,
+        "message": {"role": "assistant", "content": json.dumps({"overall_score": 80})},
+        "finish_reason": "stop",
+    }],
+    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+}
+
+
+class LocalOpenAIStandIn:
+    """Serveur HTTP/1.1 keep-alive minimal qui compte ses connexions"""
+
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        body = json.dumps(COMPLETION).encode("utf-8")
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode("latin-1").split("\r\n"):
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                self.requests += 1
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Connection: keep-alive\r\nContent-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+async def call(client):
+    response = await client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": "Analyse ce funnel"}],
+    )
+    assert json.loads(response.choices[0].message.content)["overall_score"] == 80
+
+
+async def run_pooled(base_url: str) -> float:
+    pool = ProviderClientPool()
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        async with semaphore:
+            await call(pool.get("openai", "sk-local", "gpt-4o-mini", base_url))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(CALLS)])
+    elapsed = time.perf_counter() - start
+    assert pool.stats["created"] == 1
+    await pool.aclose()
+    return elapsed
+
+
+async def run_fresh(base_url: str) -> float:
+    start = time.perf_counter()
+    for _ in range(FRESH_CALLS):
+        pool = ProviderClientPool()
+        await call(pool.get("openai", "sk-local", "gpt-4o-mini", base_url))
+        await pool.aclose()
+    return time.perf_counter() - start
+
+
+async def main():
+    print("📊 BENCHMARK POOL DE CLIENTS")
+
+    server = LocalOpenAIStandIn()
+    base_url = await server.start()
+    elapsed = await run_pooled(base_url)
+    print(f"Pool partagé   : {server.requests} appels, {server.connections} connexions TCP, "
+          f"{elapsed * 1000 / CALLS:.2f} ms/appel")
+    assert server.requests == CALLS and server.connections <= CONCURRENCY
+    await server.stop()
+
+    server = LocalOpenAIStandIn()
+    base_url = await server.start()
+    elapsed = await run_fresh(base_url)
+    print(f"Client par appel: {server.requests} appels, {server.connections} connexions TCP, "
+          f"{elapsed * 1000 / FRESH_CALLS:.2f} ms/appel")
+    await server.stop()
+
+    print("✅ Connexions réutilisées sur l'ensemble des appels")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
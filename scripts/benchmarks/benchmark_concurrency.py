@@ -0,0 +1,238 @@
+"""
+Benchmark - Charge concurrente des points d'entrée de l'agent (hors ligne)
+Nümtema AGENCY - Framework Exclusif
+
+Pilote les fonctions publiques (analyze_funnel_with_ai, optimize_step_with_ai,
+optimize_funnel_steps_with_ai, analyze_funnel_stream_with_ai et, si
+settings_manager est disponible, analyze_funnel_with_ui_config) avec un
+provider factice qui rejoue une cassette (fake_provider.py), de 1 à 1 000
+requêtes simultanées. Rapporte débit, latences p50/p95/p99, retard de la
+boucle asyncio et mémoire résidente. Aucun accès réseau ni clé API.
+
+    python benchmark_concurrency.py --levels 1,10,100,1000 --error-rate 0.02
+    python benchmark_concurrency.py --recorded-latency --time-scale 100
+
+Les limites de débit et de concurrence par modèle sont levées par défaut
+(on mesure l'agent, pas le token bucket ni le limiteur AIMD ; les erreurs
+injectées restent rejouées) : --keep-rate-limits pour les conserver.
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(SCRIPTS_DIR)
+
+import agent_morphius_fixed
+from agent_morphius_fixed import GLOBAL_CONFIG
+from fake_provider import Cassette, FakeGenAI, LatencyProfile
+from provider_clients import ProviderClientPool
+from telemetry import METRICS
+
+DEFAULT_CASSETTE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes", "agent_morphius.jsonl")
+LAG_INTERVAL = 0.005
+
+
+def make_funnel(n: int) -> dict:
+    return {
+        "id": f"load-{n}",
+        "title": "Quiz minceur",
+        "steps": [
+            {"id": f"load-{n}-s{i}", "type": "form", "title": f"Question {i}",
+             "fields": [{"id": "email", "type": "email", "required": True}], "options": ["Oui", "Non"]}
+            for i in range(4)
+        ],
+    }
+
+
+def rss_mb() -> float:
+    """Mémoire résidente actuelle (Linux), sinon pic depuis le démarrage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(ordered: list, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def monitor_lag(samples: list, stop: asyncio.Event):
+    """Retard de réveil d'une tâche qui dort LAG_INTERVAL : temps où la boucle était bloquée"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, loop.time() - expected))
+
+
+async def analyze(n: int):
+    return await agent_morphius_fixed.analyze_funnel_with_ai(make_funnel(n))
+
+
+async def optimize(n: int):
+    funnel = make_funnel(n)
+    return await agent_morphius_fixed.optimize_step_with_ai(funnel["steps"][0], funnel)
+
+
+async def optimize_steps(n: int):
+    funnel = make_funnel(n)
+    return await agent_morphius_fixed.optimize_funnel_steps_with_ai(funnel["steps"], funnel)
+
+
+async def stream(n: int):
+    async for event in agent_morphius_fixed.analyze_funnel_stream_with_ai(make_funnel(n)):
+        if event["type"] == "complete":
+            return event["analysis"]
+
+
+def ui_entry(fake: FakeGenAI):
+    """analyze_funnel_with_ui_config branché sur le provider factice (None si indisponible)"""
+    try:
+        import agent_morphius_with_settings as ui
+    except ImportError as e:
+        print(f"⏭️  analyze_funnel_with_ui_config ignoré ({e})")
+        return None
+    from types import SimpleNamespace
+
+    provider = SimpleNamespace(id="gemini", name="Gemini (rejeu)", model="gemini-2.5-pro",
+                               api_key="offline-replay", base_url=None)
+
+    class ReplaySettings:
+        general_settings = SimpleNamespace(auto_fallback=False, hedge_requests=False)
+
+        def is_demo_mode(self):
+            return False
+
+        def get_active_provider(self):
+            return provider
+
+        def get_fallback_providers(self):
+            return [provider]
+
+    ui.GEMINI_AVAILABLE = True
+    ui.agent_morphius_ui.settings = ReplaySettings()
+    ui.agent_morphius_ui.clients = ProviderClientPool(fake.factories())
+
+    async def run(n: int):
+        return await ui.analyze_funnel_with_ui_config(make_funnel(n))
+
+    return run
+
+
+async def run_level(entry, concurrency: int, requests: int, offset: int) -> dict:
+    latencies, lag = [], []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(lag, stop))
+    counter = iter(range(offset, offset + requests))
+    failures = 0
+
+    async def worker():
+        nonlocal failures
+        for n in counter:
+            start = time.perf_counter()
+            result = await entry(n)
+            latencies.append(time.perf_counter() - start)
+            failures += not result
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    latencies.sort()
+    lag.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "lag_p99": percentile(lag, 0.99) * 1000 if lag else 0.0,
+        "lag_max": lag[-1] * 1000 if lag else 0.0,
+        "rss": rss_mb(),
+        "rss_delta": rss_mb() - rss_before,
+        "failures": failures,
+    }
+
+
+def demo_events() -> int:
+    return sum(event["count"] for event in METRICS.snapshot()["events"] if event["event"] == "demo")
+
+
+async def main(args):
+    cassette = Cassette.load(args.cassette)
+    latency = None if args.recorded_latency else LatencyProfile(args.median, args.p95)
+    fake = FakeGenAI(cassette, latency=latency, error_rate=args.error_rate, chunk_size=args.chunk_size,
+                     seed=args.seed, time_scale=args.time_scale)
+
+    # Le faux SDK remplace google.generativeai avant la création paresseuse de l'agent
+    os.environ.setdefault("GEMINI_API_KEY", "offline-replay")
+    agent_morphius_fixed.genai = fake
+    if not args.keep_rate_limits:
+        GLOBAL_CONFIG["rate_limits"] = {"default": {"rate": 1e9, "burst": 10**6}}
+        GLOBAL_CONFIG["adaptive_limits"]["limiter"].update(initial_limit=10**6, max_limit=10**6)
+
+    entries = {"analyze": analyze, "optimize": optimize, "optimize_steps": optimize_steps, "stream": stream}
+    if "ui" in args.entries:
+        entries["ui"] = ui_entry(fake)
+
+    levels = [int(level) for level in args.levels.split(",")]
+    print("📊 BENCHMARK CHARGE CONCURRENTE (provider factice, hors ligne)")
+    print(f"Cassette : {len(cassette.interactions)} interactions | latence : "
+          f"{'enregistrée / ' + str(args.time_scale) if latency is None else f'médiane {args.median * 1000:.0f} ms, p95 {args.p95 * 1000:.0f} ms'}"
+          f" | erreurs injectées : {args.error_rate:.0%}")
+    print(f"{'entrée':<15}{'conc.':>6}{'req.':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'lag p99':>9}{'lag max':>9}{'RSS Mo':>9}{'Δ Mo':>7}")
+    offset = 0
+    for name in args.entries:
+        entry = entries.get(name)
+        if entry is None:
+            continue
+        for concurrency in levels:
+            requests = args.requests or max(50, 2 * concurrency)
+            errors_before, demo_before = fake.stats["errors"], demo_events()
+            row = await run_level(entry, concurrency, requests, offset)
+            offset += requests
+            print(f"{name:<15}{concurrency:>6}{requests:>7}{row['throughput']:>9.0f}{row['p50']:>9.1f}"
+                  f"{row['p95']:>9.1f}{row['p99']:>9.1f}{row['lag_p99']:>9.1f}{row['lag_max']:>9.1f}"
+                  f"{row['rss']:>9.1f}{row['rss_delta']:>7.1f}")
+            assert row["failures"] == 0
+            # Chaque passage en démo doit venir d'une erreur injectée (sinon : cassette incomplète)
+            assert demo_events() - demo_before <= fake.stats["errors"] - errors_before
+
+    agent_morphius_fixed.get_agent().shutdown()
+    print(f"Appels rejoués : {fake.stats['calls']} (dont {fake.stats['streams']} streamés, "
+          f"{fake.stats['errors']} erreurs injectées)")
+    print("✅ Charge concurrente mesurée sans réseau ni quota")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", default="1,10,100,1000")
+    parser.add_argument("--requests", type=int, default=0, help="requêtes par palier (défaut : max(50, 2 x conc.))")
+    parser.add_argument("--entries", default="analyze,optimize,optimize_steps,stream,ui",
+                        type=lambda value: value.split(","))
+    parser.add_argument("--cassette", default=DEFAULT_CASSETTE)
+    parser.add_argument("--median", type=float, default=0.02, help="latence médiane (s)")
+    parser.add_argument("--p95", type=float, default=0.08, help="latence p95 (s)")
+    parser.add_argument("--recorded-latency", action="store_true", help="latences de la cassette")
+    parser.add_argument("--time-scale", type=float, default=100.0, help="accélération des latences enregistrées")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        asyncio.run(main(arguments))
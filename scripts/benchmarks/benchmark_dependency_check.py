@@ -0,0 +1,106 @@
+"""
+Benchmark - Vérification et installation des dépendances
+Nümtema AGENCY - Framework Exclusif
+
+1. Vérification : __import__ de chaque package (avant) vs importlib.metadata
+   (après), chacun dans un interpréteur neuf : durée, modules chargés et
+   faux négatifs (google-generativeai, python-dotenv...).
+2. Installation : pip simulé (PIP_COST secondes par invocation, aucun
+   réseau) ; un pip par package manquant (avant) vs un seul pip pour tout
+   le plan (après), avec les durées par phase du rapport.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PIP_COST = 0.5  # démarrage de pip + résolution, par invocation
+
+CHECK = """
+import json, sys, time
+sys.path.insert(0, {scripts!r})
+import auto_installer
+installer = auto_installer.DependencyInstaller()
+before = len(sys.modules)
+start = time.perf_counter()
+if {legacy!r}:
+    def check(name):
+        try:
+            __import__(name.replace('-', '_'))
+            return True
+        except ImportError:
+            return False
+    results = {{name: check(name) for name in installer.required_packages}}
+else:
+    results = {{name: installer.check_package(name) for name in installer.required_packages}}
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": len(sys.modules) - before, "results": results}}))
+"""
+
+
+def run_check(legacy: bool) -> dict:
+    code = CHECK.format(scripts=os.path.abspath(SCRIPTS_DIR), legacy=legacy)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class FakePip:
+    """Remplace subprocess.run : coût fixe par invocation, succès"""
+
+    def __init__(self):
+        self.invocations = []
+
+    def __call__(self, command, **_):
+        self.invocations.append(command[command.index("--upgrade") + 1:])
+        time.sleep(PIP_COST)
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+
+def main():
+    print("📊 BENCHMARK DÉPENDANCES")
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.makedirs("logs")
+        legacy, current = run_check(legacy=True), run_check(legacy=False)
+        print(f"__import__          : {legacy['seconds'] * 1000:7.1f} ms, {legacy['modules']:4d} modules chargés")
+        print(f"importlib.metadata  : {current['seconds'] * 1000:7.1f} ms, {current['modules']:4d} modules chargés")
+        false_negatives = [name for name, ok in legacy["results"].items() if current["results"][name] and not ok]
+        print(f"Faux négatifs de __import__ : {', '.join(false_negatives) or 'aucun'}")
+        assert current["modules"] <= legacy["modules"]
+
+        sys.path.insert(0, os.path.abspath(SCRIPTS_DIR))
+        import auto_installer
+
+        fake_pip = FakePip()
+        auto_installer.subprocess.run = fake_pip
+        installer = auto_installer.DependencyInstaller()
+        # Environnement vierge : tous les packages (hors stdlib) sont à installer
+        installer.installed_version = lambda name: None
+        missing = [name for name in installer.required_packages if name not in auto_installer.STDLIB_MODULES]
+
+        start = time.perf_counter()
+        for name in missing:
+            installer._pip_install([name])
+        sequential = time.perf_counter() - start
+
+        fake_pip.invocations.clear()
+        start = time.perf_counter()
+        installer.install_all()
+        grouped = time.perf_counter() - start
+        report = installer.generate_report()
+
+    print(f"Installation de {len(missing)} packages : un pip par package {sequential:.2f}s "
+          f"({len(missing)} invocations) | plan groupé {grouped:.2f}s ({len(fake_pip.invocations)} invocation)")
+    print("Phases : " + ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in report["phase_timings"].items()))
+    assert len(fake_pip.invocations) == 1 and len(fake_pip.invocations[0]) == len(missing)
+    # pip factice : rien n'apparaît dans les métadonnées, seuls les modules stdlib comptent comme réussis
+    print(f"Rapport : {report['successful']}/{report['total_packages']} packages vérifiés")
+    assert report["successful"] == len(installer.required_packages) - len(missing)
+    print("✅ Vérification sans import, installation en une seule invocation pip")
+
+
+if __name__ == "__main__":
+    main()
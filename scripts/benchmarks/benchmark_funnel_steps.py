@@ -0,0 +1,119 @@
+"""
+Benchmark - optimize_funnel_steps vs boucle optimize_step
+Nümtema AGENCY - Framework Exclusif
+
+Compare latence totale et tokens de prompt pour un funnel de 12 étapes,
+avec un provider local simulé (aucun appel réseau).
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import agent_morphius_fixed
+from agent_morphius_fixed import AgentMorphius
+
+STEPS = 12
+BASE_LATENCY = 0.08         # secondes par appel (aller-retour)
+LATENCY_PER_TOKEN = 0.00002  # secondes par token de prompt
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Modèle simulé : latence = base + coût proportionnel au prompt"""
+
+    prompt_tokens = 0
+    calls = 0
+
+    def __init__(self, name: str):
+        self.name = name
+
+    async def generate_content_async(self, prompt: str) -> FakeResponse:
+        tokens = len(prompt) // 4
+        FakeModel.prompt_tokens += tokens
+        FakeModel.calls += 1
+        await asyncio.sleep(BASE_LATENCY + tokens * LATENCY_PER_TOKEN)
+        step = {
+            "optimized_title": "Titre optimisé",
+            "optimized_content": "Contenu optimisé",
+            "optimized_options": ["Option A", "Option B"],
+            "visual_suggestions": [],
+            "expected_improvement": "+10%",
+            "confidence": 0.8,
+        }
+        if "ÉTAPES À OPTIMISER" in prompt:
+            return FakeResponse(json.dumps({"steps": [{"step_index": i, **step} for i in range(STEPS)]}))
+        return FakeResponse(json.dumps(step))
+
+
+class FakeGenAI:
+    GenerativeModel = FakeModel
+
+
+def make_funnel() -> dict:
+    return {
+        "id": "bench-funnel",
+        "title": "Diagnostic minceur personnalisé",
+        "description": "Funnel vidéo de qualification " * 20,
+        "theme": {"primary_color": "#ff6b00", "font": "Inter"},
+        "steps": [
+            {
+                "type": "question",
+                "title": f"Question {i}",
+                "content": "Quel est votre objectif principal ? " * 3,
+                "options": ["Perdre du poids", "Gagner en énergie", "Mieux dormir", "Autre"],
+            }
+            for i in range(STEPS)
+        ],
+    }
+
+
+async def measure(label: str, run) -> tuple:
+    FakeModel.prompt_tokens = 0
+    FakeModel.calls = 0
+    start = time.perf_counter()
+    results = await run()
+    elapsed = time.perf_counter() - start
+    assert len(results) == STEPS
+    print(f"{label:<32} | {FakeModel.calls:>6} | {FakeModel.prompt_tokens:>14,} | {elapsed * 1000:>10.1f}")
+    return elapsed, FakeModel.prompt_tokens
+
+
+async def main():
+    agent_morphius_fixed.genai = FakeGenAI
+    agent = AgentMorphius()
+    agent.gemini_configured = True
+    for limiter in agent.rate_limiters.values():
+        limiter.rate, limiter.burst, limiter.tokens = 1000.0, 1000, 1000.0
+
+    funnel = make_funnel()
+    print("📊 BENCHMARK OPTIMISATION DES ÉTAPES")
+    print(f"{'mode':<32} | {'appels':>6} | {'tokens prompt':>14} | {'total (ms)':>10}")
+
+    async def sequential():
+        return [await agent.optimize_step(step, funnel) for step in funnel["steps"]]
+
+    agent.response_cache.clear()
+    loop_time, loop_tokens = await measure("boucle optimize_step", sequential)
+    agent.response_cache.clear()
+    packed_time, packed_tokens = await measure(
+        "optimize_funnel_steps (groupé)", lambda: agent.optimize_funnel_steps(funnel["steps"], funnel)
+    )
+    agent.response_cache.clear()
+
+    print(f"\nGain latence: {loop_time / packed_time:.1f}x, tokens: {loop_tokens / packed_tokens:.1f}x")
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        asyncio.run(main())
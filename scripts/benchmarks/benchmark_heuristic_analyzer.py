@@ -0,0 +1,103 @@
+"""
+Benchmark - Analyse heuristique locale (repli de l'analyse Gemini)
+Nümtema AGENCY - Framework Exclusif
+
+1. Latence : 10 000 funnels synthétiques (graine fixe) analysés, objectif
+   bien inférieur à une milliseconde par funnel.
+2. Validité : chaque analyse respecte ANALYSIS_SCHEMA ; résultat identique
+   d'un appel à l'autre ; le score varie avec la structure (l'ancienne
+   démo renvoyait 78 pour tous les funnels).
+3. Règles : un funnel propre obtient un meilleur score qu'un funnel long,
+   sans CTA ni progression, avec trop d'options et un formulaire chargé.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from heuristic_analyzer import analyze_structure
+from json_extract import ANALYSIS_SCHEMA, validate
+
+FUNNELS = 10_000
+BUDGET_MS = 0.2
+STEP_TYPES = ["landing", "welcome", "form", "video", "text", "cta", "choice", "lead_capture", "thank-you"]
+
+CLEAN_FUNNEL = {
+    "id": "propre",
+    "settings": {"showProgress": True},
+    "steps": [
+        {"type": "welcome", "title": "Prêt à reprendre le contrôle ?", "media": {"type": "image", "url": "/x.svg"}},
+        {"type": "choice", "title": "Votre niveau d'énergie ?", "options": ["Élevé", "Variable", "Bas"]},
+        {"type": "choice", "title": "Votre sommeil ?", "options": ["Bon", "Moyen", "Mauvais"]},
+        {"type": "lead_capture", "title": "Vos résultats sont prêts !",
+         "fields": [{"type": "email", "label": "Email", "required": True}]},
+    ],
+}
+
+HEAVY_FUNNEL = {
+    "id": "charge",
+    "steps": [{"type": "text", "title": "Étape", "content": "Texte explicatif. " * 30} for _ in range(9)] + [
+        {"type": "choice", "title": "Votre profil ?", "options": [f"Option {i}" for i in range(10)]},
+        {"type": "text", "title": "Vos coordonnées", "fields": [
+            {"type": kind, "label": kind, "required": True}
+            for kind in ("text", "text", "email", "phone", "textarea", "select", "checkbox")
+        ]},
+    ],
+}
+
+
+def make_funnel(rng: random.Random) -> dict:
+    steps = []
+    for i in range(rng.randint(0, 12)):
+        step_type = rng.choice(STEP_TYPES)
+        step = {"id": f"s{i}", "type": step_type, "title": "Étape " * rng.randint(1, 8),
+                "content": "Texte. " * rng.randint(0, 60)}
+        if step_type == "choice":
+            step["options"] = [f"Option {j}" for j in range(rng.randint(2, 9))]
+        if step_type in ("form", "lead_capture"):
+            step["fields"] = [
+                {"id": f"f{j}", "type": rng.choice(["text", "email", "phone", "textarea"]),
+                 "label": "Champ", "required": rng.random() < 0.5}
+                for j in range(rng.randint(1, 7))
+            ]
+        steps.append(step)
+    return {"id": "funnel", "settings": {"showProgress": rng.random() < 0.5}, "steps": steps}
+
+
+def main():
+    print("📊 BENCHMARK ANALYSE HEURISTIQUE")
+    rng = random.Random(11)
+    funnels = [make_funnel(rng) for _ in range(FUNNELS)]
+
+    start = time.perf_counter()
+    analyses = [analyze_structure(funnel) for funnel in funnels]
+    per_funnel_ms = (time.perf_counter() - start) * 1000 / FUNNELS
+    print(f"⏱️  {FUNNELS:,} funnels : {per_funnel_ms * 1000:.1f} µs par funnel (budget {BUDGET_MS * 1000:.0f} µs)")
+    assert per_funnel_ms < BUDGET_MS
+
+    for analysis in analyses[:500]:
+        validate(json.loads(json.dumps(analysis)), ANALYSIS_SCHEMA)
+    assert [analyze_structure(funnel) for funnel in funnels[:200]] == analyses[:200]
+    scores = [analysis["overall_score"] for analysis in analyses]
+    distinct = len(set(scores))
+    print(f"✅ Schéma respecté, résultat déterministe, {distinct} scores distincts "
+          f"(min {min(scores)}, médiane {sorted(scores)[len(scores) // 2]}, max {max(scores)})")
+    assert distinct > 20
+
+    clean, heavy = analyze_structure(CLEAN_FUNNEL), analyze_structure(HEAVY_FUNNEL)
+    print(f"Funnel propre : {clean['overall_score']}/100, {len(clean['issues'])} problème(s)")
+    print(f"Funnel chargé : {heavy['overall_score']}/100, {len(heavy['issues'])} problème(s) :")
+    for issue in heavy["issues"]:
+        print(f"   [{issue['priority']}] {issue['problem']}")
+    assert clean["overall_score"] >= 85 and not clean["issues"]
+    assert heavy["overall_score"] < 40 and heavy["issues"][0]["priority"] == "high"
+    assert "Aucune indication de progression" in heavy["psychological_analysis"]["friction_points"]
+    print("✅ Analyse structurelle instantanée, sans appel LLM")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark - Temps d'import de agent_morphius_fixed (python -X importtime)
+Nümtema AGENCY - Framework Exclusif
+
+Chaque worker d'API lance un interpréteur neuf et importe l'agent : l'import
+doit rester sous IMPORT_BUDGET_MS et n'avoir aucun effet de bord (pas de pip,
+pas de dossier logs/, pas de SDK Gemini ni de NumPy chargés).
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+IMPORT_BUDGET_MS = 150
+RUNS = 7
+HEAVY_MODULES = ("google.generativeai", "dotenv", "numpy", "openai", "anthropic")
+
+CHECK = f"""
+import sys
+sys.path.insert(0, {os.path.abspath(SCRIPTS_DIR)!r})
+import agent_morphius_fixed
+loaded = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(",".join(loaded))
+"""
+
+
+def import_time_ms(cwd: str) -> tuple:
+    """(temps cumulé de l'import en ms, modules lourds chargés)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHECK],
+        cwd=cwd, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == "agent_morphius_fixed":
+            cumulative = int(parts[1]) / 1000
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative, loaded
+
+
+def main():
+    print("📊 BENCHMARK TEMPS D'IMPORT")
+    with tempfile.TemporaryDirectory() as cwd:
+        # Premier run : compile les .pyc, non mesuré
+        import_time_ms(cwd)
+        samples = []
+        for _ in range(RUNS):
+            elapsed, loaded = import_time_ms(cwd)
+            samples.append(elapsed)
+        created = os.listdir(cwd)
+
+    median = statistics.median(samples)
+    print(f"import agent_morphius_fixed : médiane {median:.1f} ms, max {max(samples):.1f} ms "
+          f"(budget {IMPORT_BUDGET_MS} ms, {RUNS} runs)")
+    print(f"Modules lourds chargés à l'import : {loaded or 'aucun'}")
+    print(f"Fichiers créés dans le répertoire courant : {created or 'aucun'}")
+
+    assert median <= IMPORT_BUDGET_MS, f"import trop lent : {median:.1f} ms > {IMPORT_BUDGET_MS} ms"
+    assert not loaded, f"modules chargés à l'import : {loaded}"
+    assert not created, f"effets de bord à l'import : {created}"
+    print("✅ Import rapide et sans effet de bord")
+
+
+if __name__ == "__main__":
+    main()
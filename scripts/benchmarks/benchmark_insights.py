@@ -0,0 +1,144 @@
+"""
+Benchmark - Agrégats incrémentaux des insights (10 millions d'événements)
+Nümtema AGENCY - Framework Exclusif
+
+Les événements (vues, étapes, abandons, conversions) sont appliqués un à un
+aux compteurs. La latence de generate_insights est mesurée à 1 M et 10 M
+événements : elle doit rester constante, car seuls les agrégats sont lus.
+Les soumissions déjà comprises dans les totaux de la table funnels ne sont
+pas comptées deux fois, et un lot renvoyé du plus récent au plus ancien
+(ordre de l'API) est ingéré en entier.
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from insights_aggregator import InsightsAggregator
+
+CHECKPOINTS = [1_000_000, 10_000_000]
+FUNNELS = 50
+STEPS = 6
+SEGMENTS = ("B2B", "B2C")
+
+
+def event_stream(total: int, seed: int = 3):
+    """Parcours de visiteurs : vue, étapes vues, abandon ou conversion"""
+    rng = random.Random(seed)
+    drop_rates = {f"funnel-{f}": [rng.uniform(0.02, 0.12) for _ in range(STEPS)] for f in range(FUNNELS)}
+    for funnel_id in drop_rates:
+        drop_rates[funnel_id][2] = 0.35  # étape 3 problématique
+    funnel_ids = list(drop_rates)
+    step_ids = [f"step-{s}" for s in range(STEPS)]
+    emitted = 0
+    while emitted < total:
+        funnel_id = funnel_ids[int(rng.random() * FUNNELS)]
+        segment = SEGMENTS[rng.random() < 0.4]
+        yield ("view", funnel_id, None, segment)
+        emitted += 1
+        rates = drop_rates[funnel_id]
+        boost = 0.6 if segment == "B2B" else 1.0
+        for index in range(STEPS):
+            yield ("step_view", funnel_id, step_ids[index], None)
+            emitted += 1
+            if rng.random() < rates[index] * boost:
+                yield ("drop_off", funnel_id, step_ids[index], None)
+                emitted += 1
+                break
+        else:
+            yield ("conversion", funnel_id, None, segment)
+            emitted += 1
+
+
+def check_single_count():
+    """Totaux de la table funnels + soumissions correspondantes : conversions comptées une fois"""
+    aggregator = InsightsAggregator()
+    aggregator.ingest({
+        "user_id": "user-2",
+        "funnels": [{"id": "quiz-1", "views": 100, "conversions": 10}],
+        "submissions": [{"id": i, "quiz_id": "quiz-1", "created_at": f"2025-01-01T00:00:{i:02d}"} for i in range(10)],
+    })
+    assert aggregator.funnels["quiz-1"].measured() == (100, 10)
+    aggregator.ingest({"submissions": [{"id": 10, "quiz_id": "quiz-1", "created_at": "2025-01-01T00:01:00"}]})
+    aggregator.ingest({"funnels": [{"id": "quiz-1", "views": 120, "conversions": 11}]})
+    assert aggregator.funnels["quiz-1"].measured() == (120, 11)
+    print("✅ Totaux de la table funnels et soumissions : aucune conversion comptée deux fois")
+
+
+def check_submission_order(directory: str):
+    """Lot du plus récent au plus ancien : tout est ingéré, puis rien au second passage"""
+    path = os.path.join(directory, "order.db")
+    submissions = [
+        {"id": i, "quiz_id": "quiz-1", "created_at": f"2025-01-0{i}T10:00:00"} for i in range(5, 0, -1)
+    ]
+    aggregator = InsightsAggregator(path)
+    assert aggregator.ingest_submissions(submissions) == 5
+    assert aggregator.ingest_submissions(submissions) == 0
+    aggregator.flush()
+    # Processus suivant (sans close) : curseur et compteurs relus depuis SQLite
+    reloaded = InsightsAggregator(path)
+    newer = {"id": 6, "quiz_id": "quiz-1", "created_at": "2025-01-06T10:00:00"}
+    assert reloaded.ingest_submissions([newer] + submissions) == 1
+    assert reloaded.funnels["quiz-1"].totals[1] == 6
+    print("✅ Soumissions du plus récent au plus ancien : 5/5 ingérées, aucune en double")
+
+
+def main():
+    print("📊 BENCHMARK INSIGHTS INCRÉMENTAUX")
+    check_single_count()
+    with tempfile.TemporaryDirectory() as directory:
+        check_submission_order(directory)
+    with tempfile.TemporaryDirectory() as directory:
+        aggregator = InsightsAggregator(os.path.join(directory, "insights.db"))
+        funnels = [
+            {"id": f"funnel-{f}", "steps": [{"id": f"step-{s}"} for s in range(STEPS)]} for f in range(FUNNELS)
+        ]
+        for funnel in funnels:
+            aggregator.observe_funnel(funnel, user_id="user-1")
+
+        record = aggregator.record
+        processed = 0
+        elapsed = 0.0
+        stream = event_stream(CHECKPOINTS[-1])
+        for checkpoint in CHECKPOINTS:
+            start = time.perf_counter()
+            for event_type, funnel_id, step_id, segment in stream:
+                record(event_type, funnel_id, step_id, segment)
+                processed += 1
+                if processed >= checkpoint:
+                    break
+            elapsed += time.perf_counter() - start
+
+            start = time.perf_counter()
+            insights = aggregator.insights(user_id="user-1")
+            insight_ms = (time.perf_counter() - start) * 1000
+            print(f"{processed:>11,} événements | {elapsed * 1e9 / processed:6.0f} ns/événement | "
+                  f"insights {insight_ms:6.2f} ms ({len(insights)} insights)")
+            assert insight_ms < 50, "la génération d'insights ne doit pas dépendre du volume d'événements"
+
+        start = time.perf_counter()
+        written = aggregator.flush()
+        print(f"Flush SQLite : {written} compteurs en {(time.perf_counter() - start) * 1000:.1f} ms")
+        aggregator.close()
+
+        # Redémarrage : les agrégats matérialisés sont rechargés, pas les événements
+        start = time.perf_counter()
+        reloaded = InsightsAggregator(os.path.join(directory, "insights.db"))
+        for funnel in funnels:
+            reloaded.observe_funnel(funnel, user_id="user-1")
+        again = reloaded.insights(user_id="user-1")
+        print(f"Rechargement + insights : {(time.perf_counter() - start) * 1000:.1f} ms")
+        assert [i["message"] for i in again] == [i["message"] for i in insights]
+        assert any(i["type"] == "optimization" for i in insights)
+        assert any(i.get("segment") == "B2B" for i in insights)
+        reloaded.close()
+
+    print("✅ Insights calculés depuis les agrégats, sans relecture de l'historique")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark - File de tâches durable (débit et reprise après arrêt brutal)
+Nümtema AGENCY - Framework Exclusif
+
+1. Débit : mise en file puis exécution de JOBS tâches (handler instantané
+   et handler de 20 ms) par un pool de workers, en tâches/seconde.
+2. Sémantique : priorités, clés d'idempotence, retries avec backoff
+   jitteré puis échec définitif.
+3. Reprise : un worker (processus séparé) est tué par SIGKILL en pleine
+   exécution ; un nouveau worker reprend les tâches à l'expiration du bail.
+   Aucune tâche perdue (exécution au moins une fois).
+4. Bout en bout : enqueue_funnel_analysis / get_job avec l'agent et un
+   provider factice.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(SCRIPTS_DIR)
+
+from job_queue import DONE, FAILED, JobFailedError, JobQueue, JobWorkerPool
+
+JOBS = 5_000
+KILL_JOBS = 200
+VISIBILITY = 1.0
+
+KILLED_WORKER = """
+import asyncio, sys
+sys.path.insert(0, {scripts!r})
+from job_queue import JobQueue, JobWorkerPool
+
+queue = JobQueue({db!r})
+
+async def handle(job):
+    with open({log!r}, "a") as f:
+        f.write(job["id"] + "\\n")
+    await asyncio.sleep(0.05)
+    return {{"ok": True}}
+
+print("ready", flush=True)
+asyncio.run(JobWorkerPool(queue, {{"sleep": handle}}, concurrency=16, visibility_timeout={visibility}).run())
+"""
+
+
+async def throughput(directory: str, label: str, delay: float, concurrency: int):
+    queue = JobQueue(os.path.join(directory, f"{label}.db"))
+    start = time.perf_counter()
+    for i in range(JOBS):
+        queue.enqueue("work", {"n": i})
+    enqueue_rate = JOBS / (time.perf_counter() - start)
+
+    async def handle(job):
+        if delay:
+            await asyncio.sleep(delay)
+        return {"n": job["payload"]["n"]}
+
+    pool = JobWorkerPool(queue, {"work": handle}, concurrency=concurrency, poll_interval=0.01)
+    start = time.perf_counter()
+    await pool.run(stop_when_idle=True)
+    rate = JOBS / (time.perf_counter() - start)
+    assert queue.counts()[DONE] == JOBS
+    print(f"{label:<22}: mise en file {enqueue_rate:8,.0f} tâches/s | exécution {rate:7,.0f} tâches/s "
+          f"({concurrency} workers)")
+    queue.close()
+
+
+async def semantics(directory: str):
+    queue = JobQueue(os.path.join(directory, "semantics.db"), max_attempts=3)
+    low = queue.enqueue("work", {"name": "basse"}, priority=0)
+    high = queue.enqueue("work", {"name": "haute"}, priority=10)
+    assert queue.claim(["work"], 30)["id"] == high
+    assert queue.enqueue("work", {"name": "doublon"}, idempotency_key="funnel-42") == \
+        queue.enqueue("work", {"name": "doublon"}, idempotency_key="funnel-42")
+
+    attempts = {}
+
+    async def flaky(job):
+        attempts[job["id"]] = job["attempts"]
+        if job["payload"].get("always_fail") or job["attempts"] < 3:
+            raise RuntimeError("erreur provider simulée")
+        return {"attempt": job["attempts"]}
+
+    recovered = queue.enqueue("flaky", {}, max_attempts=3)
+    doomed = queue.enqueue("flaky", {"always_fail": True}, max_attempts=2)
+    pool = JobWorkerPool(queue, {"flaky": flaky}, concurrency=2, poll_interval=0.01,
+                         backoff_base=0.05, backoff_max=0.2)
+    await pool.run(stop_when_idle=True)
+    assert queue.result(recovered) == {"attempt": 3}
+    try:
+        queue.result(doomed)
+        raise AssertionError("la tâche aurait dû échouer")
+    except JobFailedError as e:
+        print(f"Échec définitif après retries : {e}")
+    assert queue.get(low)["status"] == "queued"
+    print(f"✅ Priorités, idempotence, {pool.stats['retried']} retries jitterés, "
+          f"{pool.stats['failed']} échec définitif")
+    queue.close()
+
+
+async def kill_recovery(directory: str):
+    db = os.path.join(directory, "kill.db")
+    log = os.path.join(directory, "executions.log")
+    queue = JobQueue(db)
+    ids = [queue.enqueue("sleep", {"n": i}) for i in range(KILL_JOBS)]
+
+    code = KILLED_WORKER.format(scripts=SCRIPTS_DIR, db=db, log=log, visibility=VISIBILITY)
+    process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    process.stdout.readline()
+    time.sleep(0.25)
+    process.send_signal(signal.SIGKILL)
+    process.wait()
+    before = queue.counts()
+    print(f"SIGKILL : {before[DONE]} terminées, {before['running']} en cours (bail orphelin), "
+          f"{before['queued']} en attente")
+
+    executions = []
+
+    async def handle(job):
+        executions.append(job["id"])
+        return {"ok": True}
+
+    start = time.perf_counter()
+    await JobWorkerPool(queue, {"sleep": handle}, concurrency=16, poll_interval=0.05,
+                        visibility_timeout=VISIBILITY).run(stop_when_idle=True)
+    recovery = time.perf_counter() - start
+    counts = queue.counts()
+    with open(log) as f:
+        first_run = f.read().split()
+    duplicates = len(set(first_run) & set(executions))
+    print(f"Reprise en {recovery:.2f}s (bail {VISIBILITY:.0f}s) : {counts[DONE]}/{KILL_JOBS} terminées, "
+          f"{duplicates} réexécutées (interrompues par le kill), 0 perdue")
+    assert counts[DONE] == KILL_JOBS and counts[FAILED] == 0
+    assert all(queue.get(job_id)["result"] == {"ok": True} for job_id in ids)
+    queue.close()
+
+
+async def end_to_end(directory: str):
+    import agent_morphius_fixed
+    from fake_provider import Cassette, FakeGenAI, LatencyProfile
+
+    os.chdir(directory)
+    cassette = Cassette.load(os.path.join(SCRIPTS_DIR, "benchmarks", "cassettes", "agent_morphius.jsonl"))
+    agent_morphius_fixed.genai = FakeGenAI(cassette, latency=LatencyProfile(0.01, 0.03))
+    os.environ.setdefault("GEMINI_API_KEY", "offline-replay")
+    agent_morphius_fixed.GLOBAL_CONFIG["rate_limits"] = {"default": {"rate": 1e6, "burst": 1000}}
+
+    start = time.perf_counter()
+    job = await agent_morphius_fixed.enqueue_funnel_analysis({"id": "queued-funnel", "steps": []})
+    enqueue_ms = (time.perf_counter() - start) * 1000
+    stats = await agent_morphius_fixed.run_job_worker(concurrency=2, stop_when_idle=True)
+    status = await agent_morphius_fixed.get_job(job["job_id"])
+    assert status["status"] == DONE and status["result"]["model_used"] == "gemini-2.5-pro", status
+    print(f"✅ enqueue_funnel_analysis rend la main en {enqueue_ms:.1f} ms ; worker : {stats}")
+    agent_morphius_fixed.get_agent().shutdown()
+
+
+async def main():
+    print("📊 BENCHMARK FILE DE TÂCHES")
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            await throughput(directory, "handler instantané", 0.0, 8)
+            await throughput(directory, "handler de 20 ms", 0.02, 64)
+            await semantics(directory)
+            await kill_recovery(directory)
+            await end_to_end(directory)
+        finally:
+            os.chdir(cwd)
+    print("✅ File durable : aucune tâche perdue après un arrêt brutal")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,137 @@
+"""
+Benchmark - Extracteur JSON (corpus de fuzz + micro-benchmark 1 Ko → 1 Mo)
+Nümtema AGENCY - Framework Exclusif
+
+1. Corpus de fuzz généré (graine fixe) : prose, blocs ```json, objets
+   multiples, virgules finales, réponses tronquées.
+2. Micro-benchmark : extract_json vs re.search(r'\\{.*\\}', re.DOTALL) sur une
+   réponse bien formée (chemin rapide, même coût), puis sur une réponse
+   suivie de prose avec accolades (scanner, là où la regex échoue).
+"""
+
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from json_extract import ANALYSIS_SCHEMA, STRING_PATTERN, JSONExtractionError, extract_json
+
+FUZZ_CASES = 2000
+SIZES = [1_024, 10_240, 102_400, 1_048_576]
+PROSE = [
+    "Voici l'analyse demandée :",
+    "Analyse terminée. Exemple de format : {\"exemple\": true}.",
+    "Note : les accolades } et { dans ce texte ne sont pas du JSON.",
+    "",
+]
+
+
+def make_analysis(rng: random.Random, items: int = 3) -> dict:
+    return {
+        "overall_score": rng.randint(0, 100),
+        "strengths": [f"Point fort {i} avec \"guillemets\" et {{accolades}}" for i in range(items)],
+        "issues": [
+            {"problem": f"Problème {i}\\n", "solution": "Simplifier, [vraiment]", "priority": "high"}
+            for i in range(items)
+        ],
+        "confidence_level": round(rng.random(), 2),
+    }
+
+
+def mutate(rng: random.Random, analysis: dict) -> tuple:
+    """Retourne (texte, résultat attendu ou None si seule la validité compte)"""
+    body = json.dumps(analysis, ensure_ascii=False, indent=rng.choice([None, 2]))
+    kind = rng.choice(["plain", "prose", "fence", "multiple", "trailing_comma", "truncated"])
+
+    if kind == "plain":
+        return body, analysis
+    if kind == "prose":
+        return f"{rng.choice(PROSE)}\n{body}\n{rng.choice(PROSE)}", analysis
+    if kind == "fence":
+        return f"{rng.choice(PROSE)}\n```json\n{body}\n```\n{rng.choice(PROSE)}", analysis
+    if kind == "multiple":
+        return f'{{"exemple": true}} {body} {{"autre": 1}}', analysis
+    if kind == "trailing_comma":
+        # Virgule ajoutée avant chaque ] et } hors des chaînes
+        parts = re.split(f"({STRING_PATTERN.pattern})", body, flags=re.DOTALL)
+        return "".join(
+            part if index % 2 else re.sub(r"(\S)(\s*[}\]])", r"\1,\2", part)
+            for index, part in enumerate(parts)
+        ), analysis
+    # truncated : coupe après overall_score, le reste est réparé ou abandonné
+    cut = rng.randint(body.index('"strengths"'), len(body) - 2)
+    return body[:cut], None
+
+
+def run_fuzz():
+    rng = random.Random(1234)
+    failures = 0
+    for _ in range(FUZZ_CASES):
+        analysis = make_analysis(rng, rng.randint(1, 4))
+        text, expected = mutate(rng, analysis)
+        try:
+            result = extract_json(text, ANALYSIS_SCHEMA)
+        except JSONExtractionError:
+            failures += 1
+            continue
+        if expected is not None and result != expected:
+            failures += 1
+        elif expected is None and result["overall_score"] != analysis["overall_score"]:
+            failures += 1
+    print(f"✅ Fuzz: {FUZZ_CASES - failures}/{FUZZ_CASES} réponses extraites correctement")
+    assert failures == 0
+
+
+def greedy_regex(text: str) -> dict:
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    return json.loads(match.group())
+
+
+def timed(function, text: str, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        try:
+            function(text)
+        except ValueError:
+            pass
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run_microbenchmark():
+    rng = random.Random(99)
+    print(f"\n{'taille':>8} | {'regex greedy (ms)':>18} | {'extract_json (ms)':>18} | {'regex sur prose+{}':>18} "
+          f"| {'extract prose+{} (ms)':>21}")
+    for size in SIZES:
+        items = 1
+        while len(json.dumps(make_analysis(rng, items))) < size:
+            items *= 2
+        text = "Voici l'analyse :\n```json\n" + json.dumps(make_analysis(rng, items), ensure_ascii=False) + "\n```"
+        noisy = text + "\nExemple de format : {\"exemple\": true}"
+        repeat = max(3, 2_000_000 // size)
+        regex_ms = timed(greedy_regex, text, repeat)
+        extract_ms = timed(lambda t: extract_json(t, ANALYSIS_SCHEMA), text, repeat)
+        regex_noisy = "échec" if _fails(greedy_regex, noisy) else "ok"
+        noisy_ms = timed(lambda t: extract_json(t, ANALYSIS_SCHEMA), noisy, repeat)
+        assert not _fails(lambda t: extract_json(t, ANALYSIS_SCHEMA), noisy)
+        print(f"{len(text) // 1024:>6}Ko | {regex_ms:>18.3f} | {extract_ms:>18.3f} | {regex_noisy:>18} "
+              f"| {noisy_ms:>21.3f}")
+    # Réponse bien formée : le chemin rapide garde le coût de la regex
+    assert extract_ms <= 1.5 * regex_ms, f"extract_json {extract_ms:.2f} ms > 1.5 × regex {regex_ms:.2f} ms"
+    print("✅ Chemin rapide au coût de la regex, scanner seulement quand elle échoue")
+
+
+def _fails(function, text: str) -> bool:
+    try:
+        function(text)
+        return False
+    except ValueError:
+        return True
+
+
+if __name__ == "__main__":
+    run_fuzz()
+    run_microbenchmark()
@@ -0,0 +1,193 @@
+"""
+Benchmark - Journalisation JSONL hors boucle asyncio
+Nümtema AGENCY - Framework Exclusif
+
+1. Coût d'un appel de log vu par la boucle : FileHandler synchrone (avant)
+   vs DroppingQueueHandler + LogWriterListener (après), sur cache disque
+   rapide puis sur disque lent (0,5 ms par écriture).
+2. Disque lent et file saturée : les INFO sont abandonnés, les erreurs
+   passent, et l'appelant n'est jamais bloqué.
+3. Rotation du journal partagé par des processus de courte durée :
+   échéance respectée au démarrage d'un nouveau processus, aucune ligne
+   perdue quand plusieurs processus tournent le même fichier, et traceback
+   dans le champ `exception`.
+"""
+
+import json
+import logging
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(SCRIPTS_DIR)
+
+from structured_logging import (
+    DroppingQueueHandler, JsonLineFormatter, LogWriterListener, RequestIdFilter,
+    SizeAndTimeRotatingFileHandler, bind_request_id,
+)
+
+RECORDS = 20_000
+SLOW_RECORDS = 2_000
+EXTRA = {"method": "analyze_funnel", "provider": "gemini", "model": "gemini-2.5-pro",
+         "latency": 1.234, "prompt_tokens": 812, "response_tokens": 240, "outcome": "success"}
+
+
+def measure(logger: logging.Logger, records: int = RECORDS) -> tuple:
+    samples = []
+    for i in range(records):
+        start = time.perf_counter()
+        logger.info("Appel LLM %d", i, extra=EXTRA)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.mean(samples) * 1e6, samples[int(len(samples) * 0.999)] * 1e6
+
+
+def isolated_logger(name: str, handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+    return logger
+
+
+class SlowHandler(logging.Handler):
+    """Disque saturé : `delay` secondes par écriture"""
+
+    def __init__(self, delay: float = 0.002):
+        super().__init__()
+        self.delay = delay
+        self.levels = []
+
+    def emit(self, record):
+        time.sleep(self.delay)
+        self.levels.append(record.levelname)
+
+
+def queued(name: str, handler: logging.Handler, size: int) -> tuple:
+    log_queue = queue.Queue(maxsize=size)
+    queue_handler = DroppingQueueHandler(log_queue, high_watermark=size)
+    queue_handler.addFilter(RequestIdFilter())
+    listener = LogWriterListener(log_queue, handler)
+    listener.start()
+    return isolated_logger(name, queue_handler), listener
+
+
+PROCESSES = 4
+LINES_PER_PROCESS = 500
+
+WRITER = """
+import logging, sys
+sys.path.insert(0, {scripts!r})
+from structured_logging import setup_structured_logging
+setup_structured_logging({path!r}, max_bytes=20_000, backup_count=100, console=False)
+for i in range({lines}):
+    logging.getLogger("bench.process").info("processus %s ligne %d", sys.argv[1], i)
+"""
+
+
+def rotation_checks(directory: str):
+    """Échéance au démarrage, rotation concurrente et champ exception"""
+    # Processus précédent : dernière rotation il y a 2 h, échéance de 1 h
+    path = os.path.join(directory, "agent.jsonl")
+    handler = SizeAndTimeRotatingFileHandler(path, 10_000_000, 5, rotate_seconds=3600)
+    handler.emit(logging.makeLogRecord({"msg": "processus précédent"}))
+    handler.close()
+    past = time.time() - 7200
+    os.utime(handler.lock_path, (past, past))
+    # Nouveau processus de courte durée : l'échéance est déjà passée
+    handler = SizeAndTimeRotatingFileHandler(path, 10_000_000, 5, rotate_seconds=3600)
+    handler.emit(logging.makeLogRecord({"msg": "nouveau processus"}))
+    handler.close()
+    assert os.path.exists(f"{path}.1"), "rotation horaire manquée par un processus qui vient de démarrer"
+
+    # Traceback transmis par la file dans le champ exception
+    records = []
+    log_queue = queue.Queue()
+    queue_handler = DroppingQueueHandler(log_queue, high_watermark=100)
+    try:
+        raise ValueError("réponse Gemini invalide")
+    except ValueError:
+        isolated_logger("bench.exception", queue_handler).exception("Échec d'analyse")
+    records.append(json.loads(JsonLineFormatter().format(log_queue.get_nowait())))
+    assert records[0]["message"] == "Échec d'analyse"
+    assert "ValueError: réponse Gemini invalide" in records[0]["exception"]
+
+    # Plusieurs processus écrivent et tournent le même journal en parallèle
+    shared = os.path.join(directory, "shared.jsonl")
+    script = WRITER.format(scripts=SCRIPTS_DIR, path=shared, lines=LINES_PER_PROCESS)
+    writers = [subprocess.Popen([sys.executable, "-c", script, str(n)]) for n in range(PROCESSES)]
+    for writer in writers:
+        assert writer.wait() == 0
+    files = [name for name in os.listdir(directory) if name.startswith("shared.jsonl") and not name.endswith(".lock")]
+    lines = 0
+    for name in files:
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            lines += sum(1 for line in f if json.loads(line)["logger"] == "bench.process")
+    print(f"Rotation partagée : {PROCESSES} processus, {len(files)} fichiers, "
+          f"{lines}/{PROCESSES * LINES_PER_PROCESS} lignes conservées ; échéance horaire et exception OK")
+    assert lines == PROCESSES * LINES_PER_PROCESS and len(files) > 2
+
+
+def main():
+    print("📊 BENCHMARK JOURNALISATION")
+    bind_request_id("bench-request")
+    with tempfile.TemporaryDirectory() as directory:
+        file_handler = logging.FileHandler(os.path.join(directory, "sync.log"))
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        mean_us, p999_us = measure(isolated_logger("bench.sync", file_handler))
+        print(f"FileHandler synchrone   : {mean_us:6.1f} µs/appel (p99.9 {p999_us:7.1f} µs)")
+        file_handler.close()
+
+        path = os.path.join(directory, "async.jsonl")
+        writer = logging.FileHandler(path, encoding="utf-8")
+        writer.setFormatter(JsonLineFormatter())
+        logger, listener = queued("bench.queue", writer, RECORDS * 2)
+        mean_us, p999_us = measure(logger)
+        listener.stop()
+        writer.close()
+        print(f"QueueHandler + listener : {mean_us:6.1f} µs/appel (p99.9 {p999_us:7.1f} µs)")
+
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert len(lines) == RECORDS
+        assert lines[0]["request_id"] == "bench-request" and lines[0]["prompt_tokens"] == 812
+
+        rotation_checks(directory)
+
+    # Disque lent : l'écriture synchrone bloque la boucle à chaque appel
+    sync_us, _ = measure(isolated_logger("bench.slow_sync", SlowHandler(0.0005)), SLOW_RECORDS)
+    logger, listener = queued("bench.slow_queue", SlowHandler(0.0005), SLOW_RECORDS * 2)
+    queue_us, _ = measure(logger, SLOW_RECORDS)
+    listener.stop()
+    print(f"Disque lent (0,5 ms)    : synchrone {sync_us:6.1f} µs/appel, file {queue_us:6.1f} µs/appel")
+    assert queue_us * 5 < sync_us
+
+    # File de 100 éléments (50 réservés aux erreurs), écrivain lent : rafale de 5 000 INFO + 50 ERROR
+    slow = SlowHandler()
+    log_queue = queue.Queue(maxsize=100)
+    queue_handler = DroppingQueueHandler(log_queue, high_watermark=50)
+    listener = LogWriterListener(log_queue, slow)
+    listener.start()
+    logger = isolated_logger("bench.flood", queue_handler)
+    start = time.perf_counter()
+    for i in range(5_000):
+        logger.info("bruit %d", i)
+        if i % 100 == 0:
+            logger.error("erreur %d", i)
+    burst_ms = (time.perf_counter() - start) * 1000
+    listener.stop()
+    errors = slow.levels.count("ERROR")
+    print(f"Rafale sur disque lent : {burst_ms:.0f} ms pour 5 050 appels, "
+          f"{queue_handler.dropped['low_severity']} INFO abandonnés, {errors}/50 erreurs écrites")
+    assert errors == 50
+    assert burst_ms < 1000, "l'appelant ne doit pas attendre le disque"
+    print("✅ Logs JSONL écrits hors boucle, sans blocage sous saturation")
+
+
+if __name__ == "__main__":
+    main()
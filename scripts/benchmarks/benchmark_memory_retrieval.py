@@ -0,0 +1,83 @@
+"""
+Benchmark - Taille du prompt et latence de récupération mémoire
+Nümtema AGENCY - Framework Exclusif
+
+Compare l'ancienne injection complète de la mémoire (json.dumps(self.memory))
+à la sélection top-k sous budget de tokens, quand l'historique grandit.
+La recherche interroge l'index FTS5 de la base SQLite à chaque appel.
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from memory_retrieval import MemoryIndex
+from memory_store import ExperienceStore
+
+LEVELS = [100, 1_000, 10_000, 50_000]
+QUERIES = 50
+VOCABULARY = [
+    "santé", "minceur", "coaching", "immobilier", "b2b", "formation", "vidéo", "quiz",
+    "bienvenue", "formulaire", "email", "téléphone", "progression", "témoignages",
+    "urgence", "garantie", "prix", "offre", "diagnostic", "rendez-vous",
+]
+
+
+def make_analysis(rng: random.Random, i: int) -> dict:
+    words = rng.sample(VOCABULARY, 4)
+    return {
+        "timestamp": "2025-01-01T00:00:00",
+        "funnel_id": f"funnel-{i}",
+        "analysis": {
+            "overall_score": rng.randint(40, 95),
+            "strengths": [f"Funnel {words[0]} {words[1]} bien structuré"],
+            "issues": [{"problem": f"Étape {words[2]} trop longue", "solution": f"Simplifier {words[3]}"}],
+        },
+    }
+
+
+def make_funnel(rng: random.Random) -> dict:
+    words = rng.sample(VOCABULARY, 3)
+    return {
+        "id": "query",
+        "title": f"Funnel {words[0]}",
+        "steps": [{"type": "question", "title": f"{words[1]} {words[2]}"}],
+    }
+
+
+def main():
+    rng = random.Random(42)
+    print("📊 BENCHMARK RÉCUPÉRATION MÉMOIRE")
+    print(f"{'analyses':>10} | {'prompt complet (Ko)':>20} | {'prompt top-k (Ko)':>18} | {'latence (ms)':>12}")
+
+    directory = tempfile.TemporaryDirectory()
+    store = ExperienceStore(os.path.join(directory.name, "agent_memory.db"))
+    index = MemoryIndex(store)
+    memory = {"optimizations": [], "patterns": [], "best_practices": []}
+    for level in LEVELS:
+        added = [make_analysis(rng, i) for i in range(len(memory["optimizations"]), level)]
+        memory["optimizations"].extend(added)
+        store.append_many("optimizations", added)
+
+        full_bytes = len(json.dumps(memory, ensure_ascii=False, indent=2).encode("utf-8"))
+
+        funnels = [make_funnel(rng) for _ in range(QUERIES)]
+        start = time.perf_counter()
+        contexts = [index.build_context(funnel, top_k=5, token_budget=1500) for funnel in funnels]
+        latency = (time.perf_counter() - start) * 1000 / QUERIES
+
+        topk_bytes = max(len(json.dumps(c, ensure_ascii=False, indent=2).encode("utf-8")) for c in contexts)
+        print(f"{level:>10,} | {full_bytes / 1024:>20.1f} | {topk_bytes / 1024:>18.1f} | {latency:>12.3f}")
+        assert all(context["optimizations"] for context in contexts) and topk_bytes < 8 * 1024
+
+    store.close()
+    directory.cleanup()
+
+
+if __name__ == "__main__":
+    main()
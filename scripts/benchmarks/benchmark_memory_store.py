@@ -0,0 +1,69 @@
+"""
+Benchmark - Coût d'écriture de la mémoire expérientielle
+Nümtema AGENCY - Framework Exclusif
+
+Vérifie que l'ajout d'une analyse reste constant de 100 à 1 000 000
+analyses stockées (python scripts/benchmarks/benchmark_memory_store.py).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from memory_store import ExperienceStore
+
+LEVELS = [100, 10_000, 100_000, 1_000_000]
+SAMPLES = 500
+SAMPLE_ANALYSIS = {
+    "overall_score": 78,
+    "conversion_prediction": 24.5,
+    "strengths": ["Structure logique du funnel", "Questions bien formulées"],
+    "confidence_level": 0.85,
+}
+
+
+def fill_to(store: ExperienceStore, target: int, batch: int = 50_000):
+    """Remplit la base jusqu'à `target` analyses"""
+    current = store.count("optimizations")
+    while current < target:
+        size = min(batch, target - current)
+        store.append_many("optimizations", [
+            {"timestamp": "2025-01-01T00:00:00", "funnel_id": f"funnel-{(current + i) % 5000}", "analysis": SAMPLE_ANALYSIS}
+            for i in range(size)
+        ])
+        current += size
+
+
+def measure_append(store: ExperienceStore) -> float:
+    """Latence moyenne d'un append unitaire (ms)"""
+    start = time.perf_counter()
+    for i in range(SAMPLES):
+        store.append("optimizations", {"funnel_id": f"bench-{i}", "analysis": SAMPLE_ANALYSIS})
+    return (time.perf_counter() - start) * 1000 / SAMPLES
+
+
+def main():
+    levels = [int(arg) for arg in sys.argv[1:]] or LEVELS
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ExperienceStore(os.path.join(tmp, "agent_memory.db"))
+
+        print("📊 BENCHMARK MÉMOIRE EXPÉRIENTIELLE")
+        print(f"{'analyses stockées':>20} | {'append moyen (ms)':>18}")
+        results = []
+        for level in levels:
+            fill_to(store, level)
+            latency = measure_append(store)
+            results.append(latency)
+            print(f"{level:>20,} | {latency:>18.4f}")
+
+        store.close()
+
+    ratio = max(results) / min(results)
+    print(f"\nRatio max/min: {ratio:.2f}x (attendu: coût quasi constant)")
+
+
+if __name__ == "__main__":
+    main()
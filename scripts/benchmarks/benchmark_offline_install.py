@@ -0,0 +1,89 @@
+"""
+Benchmark - Démarrage à chaud de l'auto-installer (verrou + wheelhouse)
+Nümtema AGENCY - Framework Exclusif
+
+Sans réseau :
+1. Verrou construit depuis les versions installées : `auto_installer.py
+   install --offline` et `auto_installer.py` (mode par défaut) doivent
+   sortir en moins d'une seconde, processus compris, sans lancer pip.
+2. Wheelhouse factice : les hash sha256 du verrou sont vérifiés, une wheel
+   altérée ou absente est refusée avant tout appel à pip.
+3. Verrou unifié : exigences fusionnées et conflits entre les trois sources.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+SCRIPTS_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.append(SCRIPTS_DIR)
+
+from dependency_lock import normalize_name, read_lock, sha256_file, verify_wheelhouse, write_lock
+
+WARM_BUDGET = 1.0
+INSTALLER = os.path.join(SCRIPTS_DIR, "auto_installer.py")
+
+
+def installed_lock(path: str) -> int:
+    """Verrou des distributions déjà installées (hash factices : seule la version compte à chaud)"""
+    wheels = {}
+    for distribution in metadata.distributions():
+        name = distribution.metadata["Name"]
+        if name:
+            wheels.setdefault(normalize_name(name), {"version": distribution.version, "files": {"-": "0" * 64}})
+    write_lock(path, wheels, "benchmark")
+    return len(wheels)
+
+
+def run_installer(*args: str) -> tuple:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, INSTALLER, *args], capture_output=True, text=True)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print("📊 BENCHMARK INSTALLATION HORS LIGNE")
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        lock_path = os.path.join(directory, "requirements.lock")
+        count = installed_lock(lock_path)
+        for label, args in (("install --offline", ["install", "--offline"]), ("install (défaut)", [])):
+            seconds, result = run_installer(*args, "--lock", lock_path, "--wheelhouse", directory)
+            print(f"Démarrage à chaud, {label:<18}: {seconds * 1000:6.0f} ms ({count} distributions vérifiées)")
+            assert result.returncode == 0, result.stderr
+            assert "rien à installer" in result.stderr
+            assert seconds < WARM_BUDGET
+
+        wheelhouse = os.path.join(directory, "wheelhouse")
+        os.makedirs(wheelhouse)
+        wheel = os.path.join(wheelhouse, "morphius_absent-1.0.0-py3-none-any.whl")
+        with open(wheel, "wb") as f:
+            f.write(b"contenu de la wheel")
+        lock_path = os.path.join(directory, "offline.lock")
+        write_lock(lock_path, {"morphius-absent": {"version": "1.0.0", "files": {"w": sha256_file(wheel)}}}, "benchmark")
+        lock, _ = read_lock(lock_path)
+        assert verify_wheelhouse(lock, wheelhouse) == []
+        with open(wheel, "ab") as f:
+            f.write(b" (modifiee)")
+        errors = verify_wheelhouse(lock, wheelhouse)
+        print(f"Wheel altérée : {errors[0]}")
+        assert errors and "hash" in errors[0]
+        seconds, result = run_installer("install", "--offline", "--lock", lock_path, "--wheelhouse", wheelhouse)
+        assert result.returncode != 0 and "pip install" not in result.stderr
+        os.remove(wheel)
+        assert "absent du wheelhouse" in verify_wheelhouse(lock, wheelhouse)[0]
+        print("✅ Hash vérifiés avant pip : wheel altérée ou absente refusée")
+
+        os.makedirs("logs", exist_ok=True)
+        import auto_installer
+        lines, conflicts = auto_installer.DependencyInstaller().unified_requirements()
+        print(f"Verrou unifié : {len(lines)} exigences directes, {len(conflicts)} conflit(s) de version")
+        assert not any(line.startswith("asyncio") for line in lines)
+    print("✅ Démarrage à chaud sans pip ni réseau")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark - Taille et temps de construction des prompts
+Nümtema AGENCY - Framework Exclusif
+
+Compare l'ancien prompt d'analyse (f-string indentée + json.dumps(indent=2))
+au template précompilé (JSON canonique compact, préfixe statique en tête),
+pour des funnels de 3 à 48 étapes. Vérifie aussi que le préfixe reste
+identique d'un funnel à l'autre (cache de prompt des providers).
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from prompt_templates import ANALYSIS_PROMPT, estimate_tokens
+
+SIZES = [3, 12, 48]
+REPEAT = 2_000
+
+
+def make_funnel(rng: random.Random, steps: int) -> dict:
+    return {
+        "id": f"funnel-{rng.randint(0, 10_000)}",
+        "title": "Funnel coaching minceur",
+        "steps": [
+            {
+                "id": f"step-{i}",
+                "type": rng.choice(["landing", "form", "video", "text", "cta"]),
+                "title": f"Étape {i} : votre objectif ?",
+                "content": "Répondez en quelques secondes pour recevoir votre programme.",
+                "fields": [{"id": f"f{j}", "type": "text", "label": "Prénom", "required": True} for j in range(2)],
+                "options": ["Oui", "Non", "Peut-être"],
+            }
+            for i in range(steps)
+        ],
+    }
+
+
+MEMORY = {
+    "optimizations": [{"funnel_id": "funnel-1", "analysis": {"overall_score": 72, "strengths": ["Titre clair"]}}],
+    "patterns": [],
+    "best_practices": [],
+}
+
+
+def legacy_prompt(funnel_data: dict) -> str:
+    """Construction d'avant : f-string indentée reconstruite à chaque appel"""
+    return f"""
+        🧠 AGENT MORPHIUS - ANALYSE FUNNEL
+        Framework: Nümtema AGENCY
+
+        Analysez ce funnel de manière approfondie:
+
+        DONNÉES FUNNEL:
+        {json.dumps(funnel_data, ensure_ascii=False, indent=2)}
+
+        MÉMOIRE EXPÉRIENTIELLE (expériences les plus pertinentes):
+        {json.dumps(MEMORY, ensure_ascii=False, indent=2)}
+
+        ANALYSE DEMANDÉE:
+        1. Score global (/100)
+        2. Prédiction taux de conversion
+        3. Points forts identifiés
+        4. Problèmes détectés avec solutions
+        5. Recommandations d'optimisation
+        6. Analyse psychologique du parcours
+        7. Suggestions d'A/B testing
+
+        RÉPONDEZ EN JSON STRUCTURÉ:
+        {{
+            "overall_score": 0-100,
+            "conversion_prediction": 0.0-100.0,
+            "strengths": ["point fort 1", "point fort 2"],
+            "issues": [
+                {{
+                    "problem": "description du problème",
+                    "solution": "solution recommandée",
+                    "impact": "impact estimé en %",
+                    "priority": "high|medium|low"
+                }}
+            ],
+            "recommendations": [
+                {{
+                    "type": "optimization|design|content|flow",
+                    "description": "description de la recommandation",
+                    "expected_improvement": "amélioration attendue",
+                    "implementation_difficulty": "easy|medium|hard"
+                }}
+            ],
+            "psychological_analysis": {{
+                "user_journey_flow": "analyse du parcours",
+                "friction_points": ["point de friction 1"],
+                "engagement_factors": ["facteur d'engagement 1"]
+            }},
+            "ab_test_suggestions": [
+                {{
+                    "element": "élément à tester",
+                    "variant_a": "version actuelle",
+                    "variant_b": "version proposée",
+                    "hypothesis": "hypothèse du test"
+                }}
+            ],
+            "confidence_level": 0.0-1.0
+        }}
+        """
+
+
+def timed(build, funnel: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        build(funnel)
+    return (time.perf_counter() - start) * 1e6 / REPEAT
+
+
+def main():
+    print("📊 BENCHMARK TEMPLATES DE PROMPT")
+    print(f"{'étapes':>6} | {'ancien (o / tokens)':>20} | {'template (o / tokens)':>22} | {'gain tokens':>11} | "
+          f"{'ancien µs':>9} | {'template µs':>11}")
+    rng = random.Random(5)
+    prefixes = set()
+    for size in SIZES:
+        funnel = make_funnel(rng, size)
+        legacy = legacy_prompt(funnel)
+        rendered = ANALYSIS_PROMPT.render(memory=MEMORY, funnel=funnel)
+        prefixes.add(rendered.prefix_hash)
+
+        legacy_tokens = estimate_tokens(legacy)
+        template_tokens = estimate_tokens(rendered.text)
+        legacy_us = timed(legacy_prompt, funnel)
+        template_us = timed(lambda f: ANALYSIS_PROMPT.render(memory=MEMORY, funnel=f).text, funnel)
+        print(f"{size:>6} | {len(legacy.encode()):>9,} / {legacy_tokens:>7,} | "
+              f"{len(rendered.text.encode()):>10,} / {template_tokens:>8,} | "
+              f"{1 - template_tokens / legacy_tokens:>10.0%} | {legacy_us:>9.1f} | {template_us:>11.1f}")
+        assert template_tokens < legacy_tokens
+        assert json.loads(rendered.suffix.rsplit("\n", 1)[1]) == funnel
+
+    assert len(prefixes) == 1
+    print(f"Préfixe stable : {ANALYSIS_PROMPT.prefix_tokens} tokens identiques pour tous les funnels "
+          f"(hash {prefixes.pop()})")
+    print("✅ Prompts compacts, préfixe cacheable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark - Latence de queue avec disjoncteurs et hedging
+Nümtema AGENCY - Framework Exclusif
+
+Providers locaux simulés (délais et erreurs injectés) : compare la chaîne
+de fallback séquentielle historique à ResilientExecutor (disjoncteurs seuls,
+puis disjoncteurs + hedging au p95). Scénario 3 : un exécuteur neuf par
+requête (un processus par requête côté API), avec et sans persist_path.
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from resilience import AllProvidersFailedError, ResilientExecutor
+
+REQUESTS = 400
+CONCURRENCY = 20
+
+
+class FakeProvider:
+    """Provider simulé : latence log-normale, blocages et erreurs aléatoires"""
+
+    def __init__(self, provider_id: str, median: float, hang_rate: float, error_rate: float,
+                 hang_seconds: float = 1.5, seed: int = 0):
+        self.id = provider_id
+        self.name = provider_id
+        self.median = median
+        self.hang_rate = hang_rate
+        self.error_rate = error_rate
+        self.hang_seconds = hang_seconds
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def analyze(self) -> dict:
+        self.calls += 1
+        roll = self.rng.random()
+        if roll < self.error_rate:
+            await asyncio.sleep(self.median)
+            raise RuntimeError(f"{self.id}: 503")
+        if roll < self.error_rate + self.hang_rate:
+            await asyncio.sleep(self.hang_seconds)
+            raise TimeoutError(f"{self.id}: timeout")
+        await asyncio.sleep(self.rng.lognormvariate(0, 0.3) * self.median)
+        return {"overall_score": 80, "provider_used": self.id}
+
+
+def make_providers(primary_down: bool = False):
+    primary = FakeProvider("gemini", 0.05, hang_rate=0.08, error_rate=1.0 if primary_down else 0.02, seed=1)
+    backup = FakeProvider("openai", 0.07, hang_rate=0.01, error_rate=0.02, seed=2)
+    last = FakeProvider("anthropic", 0.09, hang_rate=0.0, error_rate=0.0, seed=3)
+    return [primary, backup, last]
+
+
+async def sequential(providers):
+    """Comportement d'origine : principal puis fallbacks, un par un"""
+    for provider in providers:
+        try:
+            return await provider.analyze()
+        except Exception:
+            continue
+    raise AllProvidersFailedError()
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(label: str, providers, run):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+    failures = 0
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await run(providers)
+            except AllProvidersFailedError:
+                failures += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[one() for _ in range(REQUESTS)])
+    calls = sum(provider.calls for provider in providers)
+    print(f"{label:<34} | {percentile(latencies, 0.5) * 1000:>7.0f} | {percentile(latencies, 0.95) * 1000:>7.0f} | "
+          f"{percentile(latencies, 0.99) * 1000:>7.0f} | {providers[0].calls:>8} | {calls:>7} | {failures:>6}")
+
+
+async def scenario(title: str, primary_down: bool):
+    print(f"\n{title}")
+    print(f"{'mode':<34} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'appels #1':>8} | {'appels':>7} | {'échecs':>6}")
+
+    await drive("séquentiel (historique)", make_providers(primary_down), sequential)
+
+    executor = ResilientExecutor(breaker_options={"open_seconds": 60})
+    await drive("disjoncteurs", make_providers(primary_down),
+                lambda providers: executor.run(providers, lambda p: p.analyze()))
+
+    executor = ResilientExecutor(breaker_options={"open_seconds": 60}, hedge=True,
+                                 hedge_min_samples=20, hedge_default_delay=0.2)
+    await drive("disjoncteurs + hedging p95", make_providers(primary_down),
+                lambda providers: executor.run(providers, lambda p: p.analyze()))
+    print(f"  hedging: {executor.stats}")
+
+
+async def per_request(persist_path=None, requests: int = 50) -> tuple:
+    """Un exécuteur neuf par requête : (appels au provider en panne, latence moyenne en ms)"""
+    providers = make_providers(primary_down=True)
+    start = time.perf_counter()
+    for _ in range(requests):
+        executor = ResilientExecutor(breaker_options={"open_seconds": 60}, persist_path=persist_path)
+        await executor.run(providers, lambda p: p.analyze())
+        executor.close()
+    return providers[0].calls, (time.perf_counter() - start) * 1000 / requests
+
+
+async def main():
+    print("📊 BENCHMARK RÉSILIENCE DES PROVIDERS")
+    await scenario("Scénario 1 : provider principal lent par intermittence (8% de blocages)", primary_down=False)
+    await scenario("Scénario 2 : provider principal en panne (100% d'erreurs)", primary_down=True)
+
+    print("\nScénario 3 : provider principal en panne, un exécuteur neuf par requête (50 requêtes)")
+    memory_calls, memory_ms = await per_request()
+    with tempfile.TemporaryDirectory() as directory:
+        shared_calls, shared_ms = await per_request(os.path.join(directory, "provider_health.db"))
+    print(f"{'état en mémoire':<34} | {memory_calls:>3} appels au provider en panne | {memory_ms:6.1f} ms/requête")
+    print(f"{'état partagé (SQLite)':<34} | {shared_calls:>3} appels au provider en panne | {shared_ms:6.1f} ms/requête")
+    assert memory_calls == 50 and shared_calls <= 5
+    print("✅ Disjoncteur ouvert conservé d'un processus à l'autre")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+Vérification - Coalescence single-flight des analyses identiques
+Nümtema AGENCY - Framework Exclusif
+
+100 appels concurrents identiques doivent produire exactement un appel
+provider, le même résultat (ou la même exception) pour tous, et l'annulation
+d'un appelant ne doit pas interrompre l'appel partagé.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from single_flight import SingleFlight
+
+CONCURRENCY = 100
+
+
+class FakeProvider:
+    """Provider local qui compte ses appels"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def analyze(self, funnel_id: str) -> dict:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("quota dépassé")
+        return {"funnel_id": funnel_id, "overall_score": 82}
+
+
+async def check_identical_calls():
+    flight, provider = SingleFlight(), FakeProvider()
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        flight.do("funnel-1", lambda: provider.analyze("funnel-1")) for _ in range(CONCURRENCY)
+    ])
+    elapsed = (time.perf_counter() - start) * 1000
+    assert provider.calls == 1, provider.calls
+    assert all(result is results[0] for result in results)
+    print(f"✅ {CONCURRENCY} appels identiques → {provider.calls} appel provider ({elapsed:.1f} ms)")
+
+
+async def check_shared_exception():
+    flight, provider = SingleFlight(), FakeProvider(fail=True)
+    results = await asyncio.gather(*[
+        flight.do("funnel-1", lambda: provider.analyze("funnel-1")) for _ in range(CONCURRENCY)
+    ], return_exceptions=True)
+    assert provider.calls == 1
+    assert all(isinstance(r, RuntimeError) and r is results[0] for r in results)
+    print("✅ Exception partagée par tous les appelants")
+
+
+async def check_cancelled_waiter():
+    flight, provider = SingleFlight(), FakeProvider()
+    first = asyncio.ensure_future(flight.do("funnel-1", lambda: provider.analyze("funnel-1")))
+    second = asyncio.ensure_future(flight.do("funnel-1", lambda: provider.analyze("funnel-1")))
+    await asyncio.sleep(0.01)
+    first.cancel()
+    result = await second
+    assert provider.calls == 1 and result["overall_score"] == 82
+    assert first.cancelled()
+    print("✅ L'annulation d'un appelant n'annule pas l'appel partagé")
+
+
+async def check_distinct_keys():
+    flight, provider = SingleFlight(), FakeProvider()
+    await asyncio.gather(*[
+        flight.do(f"funnel-{i}", lambda i=i: provider.analyze(f"funnel-{i}")) for i in range(10)
+    ])
+    assert provider.calls == 10
+    assert not any(f"funnel-{i}" in flight for i in range(10))
+    print("✅ Clés distinctes → appels distincts, aucune tâche résiduelle")
+
+
+async def main():
+    await check_identical_calls()
+    await check_shared_exception()
+    await check_cancelled_waiter()
+    await check_distinct_keys()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
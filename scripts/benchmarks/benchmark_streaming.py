@@ -0,0 +1,115 @@
+"""
+Benchmark - Analyse en streaming (temps jusqu'au premier champ)
+Nümtema AGENCY - Framework Exclusif
+
+Rejoue une réponse Gemini enregistrée, découpée en morceaux, sans réseau :
+vérifie le parsing incrémental puis compare le temps jusqu'au premier
+champ au temps de réponse complète.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import agent_morphius_fixed
+from agent_morphius_fixed import AgentMorphius
+from json_stream import IncrementalJSONObjectParser
+
+RECORDED_RESPONSE = """Voici l'analyse demandée :
+```json
+{
+  "overall_score": 72,
+  "conversion_prediction": 21.5,
+  "strengths": ["Promesse claire", "Vidéo d'accroche {courte}"],
+  "issues": [
+    {"problem": "Formulaire \\"trop long\\"", "solution": "3 champs max", "impact": "+9%", "priority": "high"}
+  ],
+  "recommendations": [
+    {"type": "flow", "description": "Ajouter une barre de progression", "expected_improvement": "+12%", "implementation_difficulty": "easy"}
+  ],
+  "psychological_analysis": {"user_journey_flow": "Linéaire", "friction_points": ["Étape 4"], "engagement_factors": ["Quiz"]},
+  "ab_test_suggestions": [],
+  "confidence_level": 0.81
+}
+```"""
+CHUNK_SIZE = 48
+CHUNK_DELAY = 0.05  # secondes entre deux morceaux
+
+
+def chunks(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for part in self.parts:
+            await asyncio.sleep(CHUNK_DELAY)
+            yield FakeChunk(part)
+
+
+class FakeModel:
+    def __init__(self, name: str):
+        self.name = name
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        return FakeStream(chunks(RECORDED_RESPONSE, CHUNK_SIZE))
+
+
+class FakeGenAI:
+    GenerativeModel = FakeModel
+
+
+def check_parser():
+    expected = json.loads(RECORDED_RESPONSE[RECORDED_RESPONSE.index("{"):RECORDED_RESPONSE.rindex("}") + 1])
+    for size in (1, 7, 48, len(RECORDED_RESPONSE)):
+        parser = IncrementalJSONObjectParser()
+        emitted = [field for part in chunks(RECORDED_RESPONSE, size) for field in parser.feed(part)]
+        assert parser.done
+        assert dict(emitted) == expected, size
+        assert [key for key, _ in emitted] == list(expected)
+    print("✅ Parsing incrémental identique au parsing complet (morceaux de 1 à N caractères)")
+
+
+async def check_stream():
+    agent_morphius_fixed.genai = FakeGenAI
+    agent = AgentMorphius()
+    agent.gemini_configured = True
+
+    start = time.perf_counter()
+    first_field_at = None
+    fields = []
+    async for event in agent.analyze_funnel_stream({"id": "stream-funnel", "steps": []}):
+        if event["type"] == "field":
+            first_field_at = first_field_at or time.perf_counter() - start
+            fields.append(event["field"])
+        else:
+            analysis = event["analysis"]
+    total = time.perf_counter() - start
+
+    assert analysis["overall_score"] == 72 and analysis["model_used"] != "demo"
+    assert fields[0] == "overall_score"
+    print(f"✅ {len(fields)} champs streamés")
+    print(f"⏱️  Premier champ: {first_field_at * 1000:.0f} ms | réponse complète: {total * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    check_parser()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        asyncio.run(check_stream())
@@ -0,0 +1,124 @@
+"""
+Benchmark - Persistance différée de la mémoire et écriture atomique
+Nümtema AGENCY - Framework Exclusif
+
+1. Coût de _save_memory vu par la requête : INSERT SQLite synchrone
+   vs WriteBehindPersister.submit (copie puis écriture par lots en
+   arrière-plan) ; une entrée modifiée après submit est écrite telle
+   qu'elle a été soumise.
+2. Processus tué (SIGKILL) pendant les écritures : la base SQLite reste
+   intègre et le JSON exporté via atomic_write_json est toujours lisible,
+   contrairement à une réécriture en place.
+"""
+
+import json
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(SCRIPTS_DIR)
+
+from memory_store import ExperienceStore
+from write_behind import WriteBehindPersister
+
+ENTRIES = 5_000
+KILL_TRIALS = 10
+
+WRITER = """
+import json, sys
+sys.path.insert(0, {scripts!r})
+from memory_store import ExperienceStore, atomic_write_json
+from write_behind import WriteBehindPersister
+
+store = ExperienceStore({db!r})
+writer = WriteBehindPersister(store, flush_interval=0.01, max_pending=20)
+memory = {{"optimizations": [{{"funnel_id": f"f{{i}}", "analysis": "x" * 200}} for i in range(3000)]}}
+print("ready", flush=True)
+i = 0
+while True:
+    writer.submit("optimizations", {{"funnel_id": f"f{{i}}", "analysis": {{"overall_score": i % 100}}}})
+    if i % 50 == 0:
+        if {atomic!r}:
+            atomic_write_json({json_path!r}, memory)
+        else:
+            with open({json_path!r}, "w", encoding="utf-8") as f:
+                json.dump(memory, f)
+    i += 1
+"""
+
+
+def entry(i: int) -> dict:
+    return {"timestamp": "2025-01-01T00:00:00", "funnel_id": f"funnel-{i}", "analysis": {"overall_score": i % 100}}
+
+
+def request_path_cost(directory: str):
+    store = ExperienceStore(os.path.join(directory, "sync.db"))
+    start = time.perf_counter()
+    for i in range(ENTRIES):
+        store.append("optimizations", entry(i))
+    sync_us = (time.perf_counter() - start) * 1e6 / ENTRIES
+    store.close()
+
+    store = ExperienceStore(os.path.join(directory, "behind.db"))
+    writer = WriteBehindPersister(store, flush_interval=0.05, max_pending=50)
+    start = time.perf_counter()
+    for i in range(ENTRIES):
+        writer.submit("optimizations", entry(i))
+    submit_us = (time.perf_counter() - start) * 1e6 / ENTRIES
+    # L'entrée modifiée après submit (analyse renvoyée puis enrichie) reste celle soumise
+    late = entry(ENTRIES)
+    writer.submit("optimizations", late)
+    late["analysis"]["overall_score"] = -1
+    writer.close()
+    assert store.count() == ENTRIES + 1
+    assert store.load_memory(limit=1)["optimizations"][-1]["analysis"]["overall_score"] == ENTRIES % 100
+    print(f"append synchrone : {sync_us:7.1f} µs/entrée | submit différé : {submit_us:5.2f} µs/entrée "
+          f"({writer.stats['batches']} transactions pour {ENTRIES} entrées)")
+    store.close()
+
+
+def kill_trials(directory: str, atomic: bool) -> tuple:
+    corrupted_json = 0
+    corrupted_db = 0
+    for trial in range(KILL_TRIALS):
+        db = os.path.join(directory, f"kill-{atomic}-{trial}.db")
+        json_path = os.path.join(directory, f"kill-{atomic}-{trial}.json")
+        code = WRITER.format(scripts=os.path.abspath(SCRIPTS_DIR), db=db, json_path=json_path, atomic=atomic)
+        process = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+        process.stdout.readline()
+        time.sleep(0.2 + 0.03 * trial)
+        process.send_signal(signal.SIGKILL)
+        process.wait()
+
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, encoding="utf-8") as f:
+                    json.load(f)
+            except ValueError:
+                corrupted_json += 1
+        conn = sqlite3.connect(db)
+        if conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+            corrupted_db += 1
+        conn.close()
+    return corrupted_json, corrupted_db
+
+
+def main():
+    print("📊 BENCHMARK WRITE-BEHIND")
+    with tempfile.TemporaryDirectory() as directory:
+        request_path_cost(directory)
+        in_place, _ = kill_trials(directory, atomic=False)
+        atomic, corrupted_db = kill_trials(directory, atomic=True)
+    print(f"SIGKILL x{KILL_TRIALS} : JSON réécrit en place corrompu {in_place} fois, "
+          f"atomic_write_json {atomic} fois, base SQLite corrompue {corrupted_db} fois")
+    assert atomic == 0 and corrupted_db == 0
+    print("✅ Aucun fichier à moitié écrit après un arrêt brutal")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Agent Morphius - Checkpoint des Analyses en Masse
+Nümtema AGENCY - Framework Exclusif
+
+Journal JSONL des funnels déjà analysés : une exécution interrompue
+reprend là où elle s'est arrêtée. Chaque entrée est identifiée par
+l'exécution (run_id) et l'empreinte du contenu du funnel : un funnel
+modifié est réanalysé. Une exécution terminée retire ses entrées (le
+fichier est supprimé s'il ne contient plus rien).
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Set, Tuple
+
+
+class BulkCheckpoint:
+    """Journal append-only des funnels traités par une exécution"""
+
+    def __init__(self, path: str, run_id: str = "default"):
+        self.path = path
+        self.run_id = run_id
+        self.completed: Set[Tuple[str, str]] = set()
+        # Entrées des autres exécutions, conservées quand celle-ci se termine
+        self.foreign = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    entry = self._parse(line)
+                    if entry is None:
+                        continue
+                    if entry["run_id"] == run_id:
+                        self.completed.add((entry["funnel_id"], entry["content_hash"]))
+                    else:
+                        self.foreign += 1
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        """key = (funnel_id, empreinte du contenu)"""
+        return key in self.completed
+
+    def record(self, funnel_id: str, content_hash: str, analysis: Dict):
+        """Marque un funnel (dans cette version) comme traité"""
+        self.completed.add((funnel_id, content_hash))
+        self._file.write(json.dumps({
+            "run_id": self.run_id,
+            "funnel_id": funnel_id,
+            "content_hash": content_hash,
+            "overall_score": analysis.get("overall_score"),
+            "timestamp": datetime.now().isoformat(),
+        }, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        """Ferme le journal en gardant les entrées (reprise possible)"""
+        if not self._file.closed:
+            self._file.close()
+
+    def finish(self):
+        """Exécution terminée : retire ses entrées, supprime le fichier s'il est vide"""
+        self.close()
+        self.completed.clear()
+        if not os.path.exists(self.path):
+            return
+        if not self.foreign:
+            os.remove(self.path)
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            kept = [line for line in f if (self._parse(line) or {}).get("run_id", self.run_id) != self.run_id]
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _parse(line: str):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            # Dernière ligne tronquée par un arrêt brutal
+            return None
+        # Ancien format (clé funnel_id seule) : ignoré, le funnel sera réanalysé
+        if not isinstance(entry, dict) or not {"run_id", "funnel_id", "content_hash"} <= entry.keys():
+            return None
+        return entry
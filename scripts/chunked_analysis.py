@@ -0,0 +1,149 @@
+"""
+Agent Morphius - Analyse Map-Reduce des Grands Funnels
+Nümtema AGENCY - Framework Exclusif
+
+Au-delà d'un seuil (nombre d'étapes ou taille estimée en tokens), le funnel
+n'est plus envoyé en un seul prompt : il est découpé en fenêtres d'étapes
+qui partagent un résumé global compact (titre, types d'étapes, plan des
+titres). Chaque fenêtre est analysée en parallèle par le modèle rapide,
+puis les analyses partielles sont réduites localement au format
+ANALYSIS_SCHEMA (moyennes pondérées par le nombre d'étapes, déduplication,
+tri par priorité) avant une passe de fusion finale. Seuils :
+GLOBAL_CONFIG["chunked_analysis"].
+"""
+
+from collections import Counter
+from typing import Dict, List
+
+from heuristic_analyzer import funnel_steps
+from prompt_templates import canonical_json, estimate_tokens
+
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+OUTLINE_TITLE_CHARS = 48
+DESCRIPTION_CHARS = 240
+
+# Taille des listes de l'analyse réduite (la passe de fusion reçoit une vue compacte)
+MAX_STRENGTHS = 8
+MAX_ISSUES = 12
+MAX_RECOMMENDATIONS = 10
+MAX_AB_TESTS = 5
+MAX_PSYCHOLOGY_ITEMS = 8
+
+
+def funnel_tokens(funnel_data: Dict) -> int:
+    """Taille estimée du funnel une fois sérialisé dans le prompt"""
+    return estimate_tokens(canonical_json(funnel_data))
+
+
+def should_chunk(funnel_data: Dict, settings: Dict) -> bool:
+    """Mode map-reduce : funnel trop long ou trop volumineux pour un seul prompt"""
+    if not settings["enabled"]:
+        return False
+    if len(funnel_steps(funnel_data)) >= settings["min_steps"]:
+        return True
+    return funnel_tokens(funnel_data) > settings["max_funnel_tokens"]
+
+
+def funnel_summary(funnel_data: Dict) -> Dict:
+    """Résumé global partagé par toutes les fenêtres (sans contenu, options ni médias)"""
+    steps = funnel_steps(funnel_data)
+    summary = {
+        key: funnel_data[key] for key in ("id", "title", "type", "goal", "audience") if funnel_data.get(key)
+    }
+    if funnel_data.get("description"):
+        summary["description"] = str(funnel_data["description"])[:DESCRIPTION_CHARS]
+    summary["step_count"] = len(steps)
+    summary["step_types"] = dict(Counter(str(step.get("type", "?")) for step in steps))
+    summary["outline"] = [
+        [number, step.get("type", "?"), str(step.get("title") or step.get("question") or "")[:OUTLINE_TITLE_CHARS]]
+        for number, step in enumerate(steps, 1)
+    ]
+    return summary
+
+
+def step_windows(funnel_data: Dict, window_steps: int) -> List[Dict]:
+    """Fenêtres consécutives d'étapes, numérotées comme dans le plan du résumé"""
+    steps = funnel_steps(funnel_data)
+    windows = []
+    for start in range(0, len(steps), window_steps):
+        chunk = steps[start:start + window_steps]
+        windows.append({
+            "first_step": start + 1,
+            "last_step": start + len(chunk),
+            "steps": [{"step_number": start + offset, **step} for offset, step in enumerate(chunk, 1)],
+        })
+    return windows
+
+
+def _unique(items: List, key, limit: int) -> List:
+    seen = set()
+    kept = []
+    for item in items:
+        marker = key(item)
+        if marker in seen:
+            continue
+        seen.add(marker)
+        kept.append(item)
+        if len(kept) >= limit:
+            break
+    return kept
+
+
+def _text_key(item) -> str:
+    return str(item).strip().lower()
+
+
+def _field_key(field: str):
+    return lambda item: _text_key(item.get(field) if isinstance(item, dict) else item)
+
+
+def _weighted_mean(values: List[tuple]) -> float:
+    total = sum(weight for _, weight in values)
+    return sum(value * weight for value, weight in values) / total
+
+
+def reduce_analyses(windows: List[Dict], analyses: List[Dict]) -> Dict:
+    """Réduction locale des analyses partielles au format ANALYSIS_SCHEMA"""
+    weights = [window["last_step"] - window["first_step"] + 1 for window in windows]
+    reduced: Dict = {}
+    for field in ("overall_score", "conversion_prediction", "confidence_level"):
+        values = [
+            (float(analysis[field]), weight)
+            for analysis, weight in zip(analyses, weights)
+            if isinstance(analysis.get(field), (int, float))
+        ]
+        if values:
+            reduced[field] = round(_weighted_mean(values), 1 if field == "conversion_prediction" else 2)
+    reduced["overall_score"] = int(round(reduced.get("overall_score", 0)))
+
+    def gather(field: str) -> List:
+        return [item for analysis in analyses for item in (analysis.get(field) or [])]
+
+    issues = [issue for issue in gather("issues") if isinstance(issue, dict)]
+    issues.sort(key=lambda issue: PRIORITY_ORDER.get(issue.get("priority"), len(PRIORITY_ORDER)))
+    reduced["strengths"] = _unique(gather("strengths"), _text_key, MAX_STRENGTHS)
+    reduced["issues"] = _unique(issues, _field_key("problem"), MAX_ISSUES)
+    reduced["recommendations"] = _unique(gather("recommendations"), _field_key("description"), MAX_RECOMMENDATIONS)
+    reduced["ab_test_suggestions"] = _unique(gather("ab_test_suggestions"), _field_key("element"), MAX_AB_TESTS)
+
+    flows, friction, engagement = [], [], []
+    for window, analysis in zip(windows, analyses):
+        psychology = analysis.get("psychological_analysis") or {}
+        if psychology.get("user_journey_flow"):
+            flows.append(f"Étapes {window['first_step']}-{window['last_step']} : {psychology['user_journey_flow']}")
+        friction += psychology.get("friction_points") or []
+        engagement += psychology.get("engagement_factors") or []
+    reduced["psychological_analysis"] = {
+        "user_journey_flow": " | ".join(flows),
+        "friction_points": _unique(friction, _text_key, MAX_PSYCHOLOGY_ITEMS),
+        "engagement_factors": _unique(engagement, _text_key, MAX_PSYCHOLOGY_ITEMS),
+    }
+    return reduced
+
+
+def window_scores(windows: List[Dict], analyses: List[Dict]) -> List[Dict]:
+    """Score de chaque fenêtre (contexte de la passe de fusion)"""
+    return [
+        {"steps": f"{window['first_step']}-{window['last_step']}", "score": analysis.get("overall_score")}
+        for window, analysis in zip(windows, analyses)
+    ]
@@ -0,0 +1,250 @@
+"""
+Agent Morphius - Modèle Local de Prédiction de Conversion
+Nümtema AGENCY - Framework Exclusif
+
+Régression ridge (NumPy) sur le logit du taux de conversion, ajustée sur
+l'historique fourni et rappelée vers un a priori métier quand l'historique
+est maigre. Les intervalles sont calibrés par les résidus leave-one-out
+(conformal split-free). Le mode batch score des milliers de funnels en un
+seul produit matriciel : aucun appel LLM.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from heuristic_analyzer import funnel_steps
+
+STEP_TYPES = ("landing", "form", "video", "text", "cta", "thank-you", "question")
+
+FEATURES = (
+    "bias",
+    "step_count",
+    "form_fields",
+    "required_fields",
+    "option_count",
+    "text_length",
+    "media_steps",
+) + tuple(f"type_{step_type}" for step_type in STEP_TYPES)
+
+# A priori sur l'échelle logit : funnel moyen ≈ 25 %, chaque friction coûte
+PRIOR_WEIGHTS = np.array([
+    -0.75,   # bias
+    -0.12,   # step_count
+    -0.08,   # form_fields
+    -0.06,   # required_fields
+    -0.01,   # option_count
+    -0.05,   # text_length (log)
+    0.10,    # media_steps
+    0.05, -0.05, 0.05, 0.0, 0.15, 0.10, 0.02,
+])
+
+# Échelle typique de chaque feature : pénalité ridge homogène
+FEATURE_SCALES = np.array([0.0, 3.0, 5.0, 3.0, 10.0, 2.0, 1.0] + [1.0] * len(STEP_TYPES))
+
+FACTOR_LABELS = {
+    "step_count": "Nombre d'étapes",
+    "form_fields": "Champs de formulaire",
+    "required_fields": "Champs obligatoires",
+    "option_count": "Nombre d'options",
+    "text_length": "Longueur des textes",
+    "media_steps": "Étapes vidéo / média",
+}
+
+PRIOR_SIGMA = 0.45        # écart-type logit utilisé tant que l'historique est trop court
+MIN_CALIBRATION = 8       # résidus LOO nécessaires pour calibrer l'intervalle
+INTERVAL_COVERAGE = 0.8
+
+
+def featurize(funnel: Dict) -> np.ndarray:
+    """Vecteur de features d'un funnel (ordre de FEATURES)"""
+    return featurize_many([funnel])[0]
+
+
+def featurize_many(funnels: Iterable[Dict]) -> np.ndarray:
+    """Matrice (n_funnels, n_features)"""
+    type_index = {step_type: 7 + index for index, step_type in enumerate(STEP_TYPES)}
+    rows = []
+    for funnel in funnels:
+        row = [1.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0] + [0.0] * len(STEP_TYPES)
+        text = 0
+        for step in funnel_steps(funnel):
+            row[1] += 1
+            step_type = step.get("type")
+            if step_type in type_index:
+                row[type_index[step_type]] += 1
+            elif step_type in ("single", "multiple", "scale", "boolean"):
+                row[type_index["question"]] += 1
+            if step.get("media") or step_type == "video":
+                row[6] += 1
+            fields = [field for field in step.get("fields") or () if isinstance(field, dict)]
+            row[2] += len(fields)
+            for field in fields:
+                if field.get("required"):
+                    row[3] += 1
+                row[4] += len(field.get("options") or ())
+            row[4] += len(step.get("options") or ())
+            text += len(step.get("title") or "") + len(step.get("content") or "") + len(step.get("question") or "")
+        row[5] = math.log1p(text)
+        rows.append(row)
+    if not rows:
+        return np.empty((0, len(FEATURES)))
+    return np.asarray(rows, dtype=float)
+
+
+def observed_rate(record: Dict) -> Optional[float]:
+    """Taux observé (0-1) d'une entrée d'historique, lissé si views/conversions"""
+    rate = record.get("conversion_rate")
+    if rate is not None:
+        # "24.5%" ou 24.5 : pourcentage ; 0.245 : fraction ; valeur illisible : ignorée
+        text = str(rate).strip()
+        try:
+            value = float(text.rstrip("%").strip())
+        except ValueError:
+            value = None
+        if value is not None and math.isfinite(value):
+            return value / 100 if text.endswith("%") or value > 1 else value
+    try:
+        views = float(record.get("views") or 0)
+        conversions = float(record.get("conversions") or 0)
+    except (TypeError, ValueError):
+        return None
+    if views > 0:
+        return (conversions + 1) / (views + 2)
+    return None
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(p, 1e-3, 1 - 1e-3)
+    return np.log(p / (1 - p))
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-z))
+
+
+class ConversionModel:
+    """Ridge rappelée vers PRIOR_WEIGHTS, intervalles calibrés par LOO"""
+
+    def __init__(self, prior_strength: float = 5.0, coverage: float = INTERVAL_COVERAGE):
+        self.prior_strength = prior_strength
+        self.coverage = coverage
+        self.weights = PRIOR_WEIGHTS.copy()
+        self.half_width = PRIOR_SIGMA * 1.2816  # z(0.9) : intervalle 80 % a priori
+        self.samples = 0
+
+    def fit(self, historical_data: Optional[List[Dict]]) -> "ConversionModel":
+        """Ajuste sur les entrées de l'historique qui ont un taux observé"""
+        funnels, rates = [], []
+        for record in historical_data or []:
+            rate = observed_rate(record)
+            if rate is None:
+                continue
+            funnels.append(record.get("funnel") or record.get("funnel_data") or record)
+            rates.append(rate)
+
+        self.samples = len(rates)
+        if not rates:
+            return self
+
+        X = featurize_many(funnels)
+        y = _logit(np.asarray(rates))
+
+        # min ||y - Xw||² + λ||D(w - w0)||²  ⇒  w = w0 + A⁻¹ Xᵀ(y - X w0)
+        penalty = np.diag(self.prior_strength / np.maximum(FEATURE_SCALES, 1e-6) ** 2)
+        penalty[0, 0] = 1e-6  # intercept libre
+        A = X.T @ X + penalty
+        A_inv = np.linalg.inv(A)
+        self.weights = PRIOR_WEIGHTS + A_inv @ (X.T @ (y - X @ PRIOR_WEIGHTS))
+
+        # Résidus leave-one-out : e_i / (1 - h_ii)
+        leverage = np.sum((X @ A_inv) * X, axis=1)
+        residuals = (y - X @ self.weights) / np.maximum(1 - leverage, 1e-3)
+        if len(residuals) >= MIN_CALIBRATION:
+            n = len(residuals)
+            level = min(1.0, self.coverage * (1 + 1 / n))
+            self.half_width = float(np.quantile(np.abs(residuals), level))
+        return self
+
+    def predict_matrix(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(taux, borne basse, borne haute) en pourcentage, vectorisé"""
+        z = X @ self.weights
+        return (
+            _sigmoid(z) * 100,
+            _sigmoid(z - self.half_width) * 100,
+            _sigmoid(z + self.half_width) * 100,
+        )
+
+    def predict_many(self, funnels: Iterable[Dict]) -> List[Dict]:
+        """Score batch : une ligne {rate, min, max} par funnel"""
+        rates, low, high = self.predict_matrix(featurize_many(funnels))
+        return [
+            {"predicted_conversion_rate": round(r, 1), "confidence_interval": {"min": round(lo, 1), "max": round(hi, 1)}}
+            for r, lo, hi in zip(rates.tolist(), low.tolist(), high.tolist())
+        ]
+
+    def confidence(self) -> float:
+        return round(0.5 + 0.45 * self.samples / (self.samples + 20), 2)
+
+    def explain(self, features: np.ndarray, top: int = 3) -> List[Dict]:
+        """Facteurs les plus influents : contribution w_j * x_j sur l'échelle logit"""
+        contributions = [
+            (name, self.weights[index] * features[index])
+            for index, name in enumerate(FEATURES) if name in FACTOR_LABELS and features[index]
+        ]
+        contributions.sort(key=lambda item: abs(item[1]), reverse=True)
+        total = sum(abs(value) for _, value in contributions[:top]) or 1.0
+        return [
+            {
+                "factor": FACTOR_LABELS[name],
+                "impact": "positif" if value > 0 else "négatif",
+                "weight": round(abs(value) / total, 2),
+            }
+            for name, value in contributions[:top]
+        ]
+
+    def recommendations(self, features: np.ndarray) -> List[Dict]:
+        """Gains estimés de variantes simples du funnel (une étape / deux champs de moins)"""
+        variants = []
+        if features[1] > 2:
+            variant = features.copy()
+            variant[1] -= 1
+            variants.append(("Réduire le nombre d'étapes", variant, "Moyen"))
+        if features[2] >= 2:
+            variant = features.copy()
+            variant[2] -= 2
+            variant[3] = max(0.0, variant[3] - 2)
+            variants.append(("Supprimer deux champs de formulaire", variant, "Faible"))
+        if not features[6]:
+            variant = features.copy()
+            variant[6] += 1
+            variants.append(("Ajouter une vidéo de présentation", variant, "Moyen"))
+        if not variants:
+            return []
+
+        base = _sigmoid(features @ self.weights)
+        lifts = _sigmoid(np.stack([variant for _, variant, _ in variants]) @ self.weights) / base - 1
+        ranked = sorted(zip(variants, lifts.tolist()), key=lambda item: item[1], reverse=True)
+        return [
+            {"action": action, "expected_lift": f"{lift * 100:+.0f}%", "effort_required": effort}
+            for (action, _, effort), lift in ranked if lift > 0
+        ]
+
+    def predict(self, funnel: Dict) -> Dict:
+        """Prédiction détaillée (structure de predict_conversion)"""
+        features = featurize(funnel)
+        rate, low, high = (float(value[0]) for value in self.predict_matrix(features[None, :]))
+        return {
+            "predicted_conversion_rate": round(rate, 1),
+            "confidence_interval": {"min": round(low, 1), "max": round(high, 1)},
+            "influencing_factors": self.explain(features),
+            "scenarios": {
+                "optimistic": {"rate": round(high, 1), "conditions": "Optimisations appliquées"},
+                "realistic": {"rate": round(rate, 1), "conditions": "État actuel"},
+                "pessimistic": {"rate": round(low, 1), "conditions": "Sans améliorations"},
+            },
+            "improvement_recommendations": self.recommendations(features),
+            "model_confidence": self.confidence(),
+            "training_samples": self.samples,
+        }
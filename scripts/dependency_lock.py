@@ -0,0 +1,181 @@
+"""
+Agent Morphius - Verrou Unifié des Dépendances et Wheelhouse
+Nümtema AGENCY - Framework Exclusif
+
+Fusionne les versions épinglées de requirements.txt, de
+DependencyInstaller.required_packages et d'install_dependencies.py en un
+seul verrou au format pip (`nom==version --hash=sha256:...`), transitives
+comprises. Les wheels sont téléchargées une fois dans un répertoire local
+puis installées avec --no-index ; si l'environnement correspond déjà au
+verrou, rien n'est lancé.
+"""
+
+import hashlib
+import os
+import re
+from importlib import metadata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+LOCK_HEADER = "# Agent Morphius - verrou unifié (python scripts/auto_installer.py build-wheelhouse)"
+INPUTS_PREFIX = "# inputs-sha256: "
+REQUIREMENT_PATTERN = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)(\[[^\]]*\])?\s*(?:==\s*([^\s;#]+))?")
+HASH_PATTERN = re.compile(r"--hash=sha256:([0-9a-f]{64})")
+ARCHIVE_SUFFIXES = (".whl", ".tar.gz", ".zip")
+
+
+def normalize_name(name: str) -> str:
+    """Nom de distribution normalisé (PEP 503) : Python_Dotenv -> python-dotenv"""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requirement(line: str) -> Optional[Tuple[str, str, Optional[str]]]:
+    """'uvicorn[standard]==0.24.0' -> ('uvicorn', '[standard]', '0.24.0') ; None pour un commentaire"""
+    line = line.split("#", 1)[0].strip()
+    if not line or line.startswith("-"):
+        return None
+    match = REQUIREMENT_PATTERN.match(line)
+    if match is None:
+        return None
+    return match.group(1), match.group(2) or "", match.group(3)
+
+
+def read_requirements(path: str) -> List[Tuple[str, str, Optional[str]]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [parsed for parsed in map(parse_requirement, f) if parsed is not None]
+
+
+def merge_pins(sources: List[Tuple[str, Iterable[Tuple[str, str, Optional[str]]]]],
+               skip: Iterable[str] = ()) -> Tuple[Dict[str, Dict], List[str]]:
+    """Fusionne les sources par ordre de priorité ; renvoie (exigences, conflits)
+
+    La première source qui épingle un package fixe sa version ; les extras
+    s'additionnent. `skip` : modules de la stdlib (asyncio...) à ne jamais
+    installer depuis PyPI.
+    """
+    skipped = {normalize_name(name) for name in skip}
+    merged: Dict[str, Dict] = {}
+    conflicts: List[str] = []
+    for source, requirements in sources:
+        for name, extras, version in requirements:
+            key = normalize_name(name)
+            if key in skipped:
+                continue
+            entry = merged.setdefault(key, {"name": name, "extras": set(), "version": None, "source": source})
+            if extras:
+                entry["extras"].update(extra.strip() for extra in extras.strip("[]").split(","))
+            if version is None:
+                continue
+            if entry["version"] is None:
+                entry["version"], entry["source"] = version, source
+            elif entry["version"] != version:
+                conflicts.append(f"{key}: {entry['version']} ({entry['source']}) retenu, {version} ({source}) ignoré")
+    return merged, conflicts
+
+
+def requirement_lines(merged: Dict[str, Dict]) -> List[str]:
+    """Entrée de `pip wheel -r` (extras conservés, transitives résolues par pip)"""
+    lines = []
+    for key in sorted(merged):
+        entry = merged[key]
+        extras = f"[{','.join(sorted(entry['extras']))}]" if entry["extras"] else ""
+        version = f"=={entry['version']}" if entry["version"] else ""
+        lines.append(f"{entry['name']}{extras}{version}")
+    return lines
+
+
+def inputs_digest(lines: List[str]) -> str:
+    """Empreinte des exigences fusionnées : détecte un verrou obsolète"""
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def archive_name_version(filename: str) -> Optional[Tuple[str, str]]:
+    """Nom et version depuis un nom de wheel ou d'archive source"""
+    if filename.endswith(".whl"):
+        parts = filename[:-4].split("-")
+        return (normalize_name(parts[0]), parts[1]) if len(parts) >= 5 else None
+    for suffix in ARCHIVE_SUFFIXES[1:]:
+        if filename.endswith(suffix):
+            name, _, version = filename[:-len(suffix)].rpartition("-")
+            return (normalize_name(name), version) if name else None
+    return None
+
+
+def scan_wheelhouse(directory: str) -> Dict[str, Dict]:
+    """{nom: {"version": ..., "files": {fichier: sha256}}} pour chaque archive du répertoire"""
+    found: Dict[str, Dict] = {}
+    for filename in sorted(os.listdir(directory)):
+        parsed = archive_name_version(filename)
+        if parsed is None:
+            continue
+        name, version = parsed
+        entry = found.setdefault(name, {"version": version, "files": {}})
+        entry["files"][filename] = sha256_file(os.path.join(directory, filename))
+    return found
+
+
+def write_lock(path: str, wheels: Dict[str, Dict], digest: str, conflicts: List[str] = ()):
+    """Verrou pip en mode hash : `pip install --require-hashes -r` le vérifie aussi"""
+    lines = [LOCK_HEADER, f"{INPUTS_PREFIX}{digest}"]
+    lines += [f"# conflit: {conflict}" for conflict in conflicts]
+    for name in sorted(wheels):
+        entry = wheels[name]
+        hashes = " \\\n    ".join(f"--hash=sha256:{sha}" for sha in sorted(set(entry["files"].values())))
+        lines.append(f"{name}=={entry['version']} \\\n    {hashes}")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+def read_lock(path: str) -> Tuple[Dict[str, Dict], Optional[str]]:
+    """({nom: {"version": ..., "hashes": [...]}}, empreinte des entrées)"""
+    entries: Dict[str, Dict] = {}
+    digest = None
+    with open(path, encoding="utf-8") as f:
+        text = f.read().replace("\\\n", " ")
+    for line in text.splitlines():
+        if line.startswith(INPUTS_PREFIX):
+            digest = line[len(INPUTS_PREFIX):].strip()
+            continue
+        parsed = parse_requirement(line)
+        if parsed is None or parsed[2] is None:
+            continue
+        entries[normalize_name(parsed[0])] = {"version": parsed[2], "hashes": HASH_PATTERN.findall(line)}
+    return entries, digest
+
+
+def environment_mismatches(lock: Dict[str, Dict]) -> List[str]:
+    """Packages du verrou absents ou dans une autre version (métadonnées seulement, aucun import)"""
+    installed = {}
+    for distribution in metadata.distributions():
+        name = distribution.metadata["Name"]
+        if name:
+            installed.setdefault(normalize_name(name), distribution.version)
+    return [
+        f"{name}=={entry['version']} (installé: {installed.get(name, 'absent')})"
+        for name, entry in lock.items()
+        if installed.get(name) != entry["version"]
+    ]
+
+
+def verify_wheelhouse(lock: Dict[str, Dict], directory: str) -> List[str]:
+    """Erreurs de hash ou archives manquantes ([] : wheelhouse conforme au verrou)"""
+    available = scan_wheelhouse(directory) if os.path.isdir(directory) else {}
+    errors = []
+    for name, entry in lock.items():
+        wheel = available.get(name)
+        if wheel is None or wheel["version"] != entry["version"]:
+            errors.append(f"{name}=={entry['version']} absent du wheelhouse")
+        elif not set(wheel["files"].values()) & set(entry["hashes"]):
+            errors.append(f"{name}=={entry['version']} : hash sha256 différent du verrou")
+    return errors
@@ -0,0 +1,271 @@
+"""
+Agent Morphius - Provider Factice (enregistrement / rejeu de cassettes)
+Nümtema AGENCY - Framework Exclusif
+
+Rejoue des réponses LLM enregistrées sans réseau ni quota : latence
+enregistrée (accélérée) ou tirée d'une loi log-normale (médiane, p95),
+taux d'erreur configurable et streaming découpé en morceaux. FakeGenAI
+remplace le module google.generativeai (configure, GenerativeModel) ;
+fake.factories() fournit des clients Gemini / OpenAI / Anthropic pour
+ProviderClientPool. RecordingGenAI enregistre les réponses du vrai SDK.
+
+Une cassette est un fichier JSONL, une interaction par ligne :
+{"model": ..., "prompt_head": 1re ligne du prompt, "prompt_hash": ..., "text": ..., "latency": s}
+Rejeu : même prompt exact si enregistré, sinon une réponse du même modèle et
+du même type de prompt (1re ligne), choisie de façon déterministe.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+# z de la loi normale au 95e percentile (p95 = médiane * exp(Z95 * sigma))
+Z95 = 1.6448536269514722
+
+
+class FakeProviderError(Exception):
+    """Erreur injectée (status_code imite l'erreur HTTP du provider)"""
+
+    def __init__(self, message: str = "Erreur provider simulée", status_code: int = 503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CassetteMissError(KeyError):
+    """Aucune interaction enregistrée pour ce modèle et ce type de prompt"""
+
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_head(prompt: str) -> str:
+    """Première ligne non vide : identifie le template (analyse, optimisation...)"""
+    for line in prompt.splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+
+class Cassette:
+    """Interactions enregistrées, indexées par prompt exact puis par (modèle, type de prompt)"""
+
+    def __init__(self, interactions: Optional[List[Dict]] = None):
+        self.interactions: List[Dict] = []
+        self._exact: Dict[Tuple[str, str], Dict] = {}
+        self._by_head: Dict[Tuple[str, str], List[Dict]] = {}
+        self._by_model: Dict[str, List[Dict]] = {}
+        for interaction in interactions or []:
+            self.add(**interaction)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with open(path, encoding="utf-8") as f:
+            return cls([json.loads(line) for line in f if line.strip()])
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+
+    def add(self, model: str, text: str, prompt: Optional[str] = None, prompt_head: str = "",
+            prompt_hash: str = "", latency: float = 0.0):
+        """Ajoute une interaction (depuis un prompt brut ou depuis une ligne de cassette)"""
+        if prompt is not None:
+            prompt_head, prompt_hash = _head_and_hash(prompt)
+        interaction = {"model": model, "prompt_head": prompt_head, "prompt_hash": prompt_hash,
+                       "text": text, "latency": latency}
+        self.interactions.append(interaction)
+        if prompt_hash:
+            self._exact[(model, prompt_hash)] = interaction
+        self._by_head.setdefault((model, prompt_head), []).append(interaction)
+        self._by_model.setdefault(model, []).append(interaction)
+
+    def match(self, model: str, prompt: str) -> Dict:
+        head, digest = _head_and_hash(prompt)
+        exact = self._exact.get((model, digest))
+        if exact is not None:
+            return exact
+        candidates = self._by_head.get((model, head)) or self._by_model.get(model)
+        if not candidates:
+            raise CassetteMissError(f"Aucune réponse enregistrée pour {model} / {head!r}")
+        return candidates[int(digest, 16) % len(candidates)]
+
+
+def _head_and_hash(prompt: str) -> Tuple[str, str]:
+    return prompt_head(prompt), prompt_hash(prompt)
+
+
+class LatencyProfile:
+    """Latence log-normale définie par sa médiane et son p95 (secondes)"""
+
+    def __init__(self, median: float = 0.02, p95: Optional[float] = None):
+        self.median = median
+        self.sigma = math.log((p95 or median) / median) / Z95 if median > 0 else 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(rng.gauss(0.0, self.sigma))
+
+
+class FakeResponse:
+    """Réponse non streamée (attributs lus par l'agent et par la télémétrie)"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    """Flux asynchrone : morceaux de chunk_size caractères, délai réparti entre eux"""
+
+    def __init__(self, text: str, chunk_size: int, delay: float):
+        self.parts = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)] or [""]
+        self.delay = delay / len(self.parts)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for part in self.parts:
+            await asyncio.sleep(self.delay)
+            yield FakeChunk(part)
+
+
+class FakeGenAI:
+    """Remplaçant de google.generativeai qui rejoue une cassette"""
+
+    def __init__(self, cassette: Cassette, latency: Optional[LatencyProfile] = None, error_rate: float = 0.0,
+                 chunk_size: int = 64, seed: int = 0, time_scale: float = 1.0):
+        self.cassette = cassette
+        # Sans profil : latence enregistrée dans la cassette, divisée par time_scale
+        self.latency = latency
+        self.time_scale = time_scale
+        self.error_rate = error_rate
+        self.chunk_size = chunk_size
+        self.rng = random.Random(seed)
+        self.stats = {"calls": 0, "errors": 0, "streams": 0}
+
+    def configure(self, api_key: Optional[str] = None, **_: Any):
+        """Aucune clé requise : le rejeu est hors ligne"""
+
+    def GenerativeModel(self, model_name: str, **_: Any) -> "FakeModel":
+        return FakeModel(self, model_name)
+
+    async def respond(self, model: str, prompt: str, stream: bool = False):
+        """Tire latence et erreur, puis rejoue la réponse enregistrée"""
+        self.stats["calls"] += 1
+        interaction = self.cassette.match(model, prompt)
+        text = interaction["text"]
+        if self.latency is not None:
+            delay = self.latency.sample(self.rng)
+        else:
+            delay = interaction.get("latency", 0.0) / self.time_scale
+        failed = self.rng.random() < self.error_rate
+        if stream:
+            self.stats["streams"] += 1
+            if failed:
+                await asyncio.sleep(delay)
+                self.stats["errors"] += 1
+                raise FakeProviderError()
+            return FakeStream(text, self.chunk_size, delay)
+        await asyncio.sleep(delay)
+        if failed:
+            self.stats["errors"] += 1
+            raise FakeProviderError()
+        return FakeResponse(text)
+
+    def factories(self) -> Dict[str, Any]:
+        """Fabriques de clients pour ProviderClientPool (gemini, openai, anthropic)"""
+        return {
+            "gemini": lambda api_key, model, base_url: self.GenerativeModel(model),
+            "openai": lambda api_key, model, base_url: _FakeOpenAIClient(self),
+            "anthropic": lambda api_key, model, base_url: _FakeAnthropicClient(self),
+        }
+
+
+class FakeModel:
+    def __init__(self, fake: FakeGenAI, model_name: str):
+        self.fake = fake
+        self.model_name = model_name
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **_: Any):
+        return await self.fake.respond(self.model_name, prompt, stream)
+
+
+class _FakeOpenAIClient:
+    """client.chat.completions.create(model=..., messages=[...])"""
+
+    def __init__(self, fake: FakeGenAI):
+        async def create(model: str, messages: List[Dict], **_: Any):
+            response = await fake.respond(model, messages[-1]["content"])
+            message = SimpleNamespace(role="assistant", content=response.text)
+            return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message)], usage=None)
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    async def close(self):
+        pass
+
+
+class _FakeAnthropicClient:
+    """client.messages.create(model=..., messages=[...])"""
+
+    def __init__(self, fake: FakeGenAI):
+        async def create(model: str, messages: List[Dict], **_: Any):
+            response = await fake.respond(model, messages[-1]["content"])
+            return SimpleNamespace(content=[SimpleNamespace(type="text", text=response.text)], usage=None)
+
+        self.messages = SimpleNamespace(create=create)
+
+    async def close(self):
+        pass
+
+
+class RecordingGenAI:
+    """Enveloppe le vrai SDK Gemini et enregistre chaque réponse dans une cassette"""
+
+    def __init__(self, genai_module: Any, cassette: Optional[Cassette] = None):
+        self.genai = genai_module
+        self.cassette = cassette or Cassette()
+
+    def configure(self, **options: Any):
+        self.genai.configure(**options)
+
+    def GenerativeModel(self, model_name: str, **options: Any) -> "_RecordingModel":
+        return _RecordingModel(self, model_name, self.genai.GenerativeModel(model_name, **options))
+
+
+class _RecordingModel:
+    def __init__(self, recorder: RecordingGenAI, model_name: str, model: Any):
+        self.recorder = recorder
+        self.model_name = model_name
+        self.model = model
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **options: Any):
+        start = time.perf_counter()
+        response = await self.model.generate_content_async(prompt, stream=stream, **options)
+        if not stream:
+            self.recorder.cassette.add(self.model_name, response.text, prompt=prompt,
+                                       latency=time.perf_counter() - start)
+            return response
+        return self._record_stream(response, prompt, start)
+
+    async def _record_stream(self, response: Any, prompt: str, start: float):
+        parts = []
+        async for chunk in response:
+            parts.append(chunk.text)
+            yield chunk
+        self.recorder.cassette.add(self.model_name, "".join(parts), prompt=prompt,
+                                   latency=time.perf_counter() - start)
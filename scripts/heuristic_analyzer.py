@@ -0,0 +1,245 @@
+"""
+Agent Morphius - Analyse Heuristique Locale des Funnels
+Nümtema AGENCY - Framework Exclusif
+
+Moteur de règles déterministe : score, problèmes, recommandations et points
+de friction calculés à partir de la structure du funnel (nombre d'étapes,
+options par question, longueur des textes, barre de progression, étape CTA,
+charge des formulaires). Même schéma JSON que l'analyse Gemini
+(ANALYSIS_SCHEMA), aucun appel réseau, bien moins d'une milliseconde par
+funnel : sert de repli quand Gemini est indisponible et de premier étage
+avant tout appel LLM.
+"""
+
+from typing import Dict, List, Tuple
+
+# Seuils des règles (au-delà : pénalité proportionnelle, plafonnée)
+MAX_STEPS = 7
+MIN_STEPS = 3
+MAX_OPTIONS = 5
+MAX_FIELDS = 4
+MAX_REQUIRED_FIELDS = 3
+MAX_STEP_CHARS = 280
+MAX_TITLE_CHARS = 90
+PROGRESS_MIN_STEPS = 4
+
+CTA_TYPES = ("cta", "lead_capture", "form")
+WELCOME_TYPES = ("landing", "welcome")
+QUESTION_TYPES = ("question", "choice", "single", "multiple", "scale", "boolean")
+HEAVY_FIELD_TYPES = ("textarea", "phone")
+
+BASE_SCORE = 92
+MIN_SCORE = 5
+BASE_CONFIDENCE = 0.55
+
+
+def funnel_steps(funnel: Dict) -> List[Dict]:
+    """Étapes du funnel : steps, config.steps ou questions (quiz)"""
+    steps = funnel.get("steps")
+    if steps is None:
+        steps = (funnel.get("config") or {}).get("steps")
+    if steps is None:
+        steps = funnel.get("questions") or (funnel.get("config") or {}).get("questions") or []
+    return [step for step in steps if isinstance(step, dict)]
+
+
+def shows_progress(funnel: Dict) -> bool:
+    """Barre de progression activée (settings du quiz ou de la config)"""
+    for source in (funnel, funnel.get("config") or {}):
+        settings = source.get("settings") or {}
+        if settings.get("showProgress") or settings.get("show_progress") or source.get("showProgress"):
+            return True
+    return False
+
+
+def _step_text(step: Dict) -> Tuple[str, int]:
+    title = step.get("title") or step.get("question") or ""
+    length = len(title) + len(step.get("content") or "") + len(step.get("description") or "")
+    return title, length
+
+
+def _issue(problem: str, solution: str, impact: str, priority: str) -> Dict:
+    return {"problem": problem, "solution": solution, "impact": impact, "priority": priority}
+
+
+def _recommendation(kind: str, description: str, improvement: str, difficulty: str) -> Dict:
+    return {
+        "type": kind,
+        "description": description,
+        "expected_improvement": improvement,
+        "implementation_difficulty": difficulty,
+    }
+
+
+def analyze_structure(funnel: Dict) -> Dict:
+    """Analyse déterministe d'un funnel au format ANALYSIS_SCHEMA"""
+    steps = funnel_steps(funnel)
+    issues: List[Dict] = []
+    recommendations: List[Dict] = []
+    strengths: List[str] = []
+    friction: List[str] = []
+    engagement: List[str] = []
+    ab_tests: List[Dict] = []
+    penalty = 0.0
+
+    count = len(steps)
+    if count > MAX_STEPS:
+        extra = count - MAX_STEPS
+        penalty += min(4 * extra, 24)
+        issues.append(_issue(
+            f"Funnel trop long ({count} étapes)",
+            f"Fusionner ou supprimer des étapes pour revenir à {MAX_STEPS} maximum",
+            f"+{min(3 * extra, 20)}% completion",
+            "high" if count > MAX_STEPS + 3 else "medium",
+        ))
+        friction.append(f"{count} étapes avant le résultat")
+    elif count < MIN_STEPS:
+        penalty += 40 if count == 0 else 8
+        issues.append(_issue(
+            "Funnel trop court pour qualifier le visiteur" if count else "Aucune étape définie",
+            "Prévoir au moins une accroche, une question et une capture de lead",
+            "+10% qualification des leads",
+            "high" if count == 0 else "medium",
+        ))
+    else:
+        strengths.append(f"Longueur du parcours maîtrisée ({count} étapes)")
+
+    fields_total = required_total = heavy_fields = 0
+    long_steps: List[int] = []
+    crowded: List[Tuple[int, int]] = []
+    questions = 0
+    media_steps = 0
+    has_cta = False
+    for index, step in enumerate(steps, 1):
+        step_type = step.get("type")
+        options = len(step.get("options") or ())
+        if step_type in QUESTION_TYPES or options:
+            questions += 1
+        if options > MAX_OPTIONS:
+            crowded.append((index, options))
+        if step_type in CTA_TYPES:
+            has_cta = True
+        if step.get("media") or step_type == "video":
+            media_steps += 1
+        title, length = _step_text(step)
+        if length > MAX_STEP_CHARS or len(title) > MAX_TITLE_CHARS:
+            long_steps.append(index)
+        for field in step.get("fields") or ():
+            if not isinstance(field, dict):
+                continue
+            fields_total += 1
+            required_total += bool(field.get("required"))
+            heavy_fields += field.get("type") in HEAVY_FIELD_TYPES
+            if len(field.get("options") or ()) > MAX_OPTIONS:
+                crowded.append((index, len(field["options"])))
+
+    for index, options in crowded:
+        penalty += min(2 * (options - MAX_OPTIONS), 10)
+        issues.append(_issue(
+            f"Trop d'options à l'étape {index} ({options})",
+            f"Limiter à {MAX_OPTIONS - 1} options maximum ou regrouper les réponses proches",
+            "+12% completion",
+            "high" if options > MAX_OPTIONS + 3 else "medium",
+        ))
+        friction.append(f"Choix trop nombreux à l'étape {index}")
+    if questions and not crowded:
+        strengths.append("Questions avec un nombre d'options raisonnable")
+
+    if long_steps:
+        penalty += min(4 * len(long_steps), 16)
+        listed = ", ".join(map(str, long_steps))
+        issues.append(_issue(
+            f"Texte trop long à l'étape {listed}" if len(long_steps) == 1 else f"Textes trop longs aux étapes {listed}",
+            "Réduire le texte à 2 phrases maximum et un titre court",
+            "+8% engagement",
+            "medium",
+        ))
+        friction.append(f"Lecture trop longue ({len(long_steps)} étape(s))")
+    elif steps:
+        strengths.append("Textes concis")
+
+    if steps and not has_cta:
+        penalty += 12
+        issues.append(_issue(
+            "Aucune étape d'appel à l'action ou de capture de lead",
+            "Terminer par une étape CTA ou un formulaire court",
+            "+20% conversion",
+            "high",
+        ))
+        friction.append("Pas de prochaine action claire en fin de parcours")
+    elif has_cta:
+        strengths.append("Appel à l'action présent")
+        ab_tests.append({
+            "element": "Bouton CTA",
+            "variant_a": "Commencer",
+            "variant_b": "Découvrir mes résultats",
+            "hypothesis": "Un CTA plus spécifique augmente l'engagement",
+        })
+
+    if count >= PROGRESS_MIN_STEPS and not shows_progress(funnel):
+        penalty += 5
+        recommendations.append(_recommendation(
+            "optimization", "Ajouter une barre de progression", "+15% completion", "easy",
+        ))
+        friction.append("Aucune indication de progression")
+    elif count >= PROGRESS_MIN_STEPS:
+        strengths.append("Barre de progression affichée")
+
+    if fields_total > MAX_FIELDS or required_total > MAX_REQUIRED_FIELDS:
+        excess = max(fields_total - MAX_FIELDS, required_total - MAX_REQUIRED_FIELDS)
+        penalty += min(3 * excess, 18)
+        issues.append(_issue(
+            f"Formulaire trop chargé ({fields_total} champs dont {required_total} obligatoires)",
+            f"Ne demander que l'essentiel ({MAX_REQUIRED_FIELDS} champs obligatoires maximum)",
+            f"+{min(5 * excess, 25)}% soumission",
+            "high" if excess > 2 else "medium",
+        ))
+        friction.append("Formulaire long")
+        ab_tests.append({
+            "element": "Formulaire",
+            "variant_a": f"{fields_total} champs",
+            "variant_b": "Email seul, le reste après la conversion",
+            "hypothesis": "Moins de champs augmente le taux de soumission",
+        })
+    elif fields_total:
+        strengths.append("Formulaire court")
+    if heavy_fields:
+        penalty += 2 * heavy_fields
+        recommendations.append(_recommendation(
+            "form", "Rendre facultatifs les champs téléphone et texte libre", "+6% soumission", "easy",
+        ))
+
+    if steps and steps[0].get("type") not in WELCOME_TYPES:
+        penalty += 3
+        recommendations.append(_recommendation(
+            "content", "Ouvrir sur une étape d'accroche qui annonce le bénéfice", "+10% engagement", "easy",
+        ))
+    if media_steps:
+        engagement.append("Contenu visuel ou vidéo")
+    else:
+        recommendations.append(_recommendation(
+            "content", "Ajouter un visuel sur l'étape d'accroche", "+5% engagement", "easy",
+        ))
+    if questions:
+        engagement.append(f"{questions} question(s) interactive(s)")
+
+    score = int(round(max(MIN_SCORE, min(100, BASE_SCORE - penalty))))
+    issues.sort(key=lambda issue: issue["priority"] != "high")
+    return {
+        "overall_score": score,
+        "conversion_prediction": round(score * 0.3, 1),
+        "strengths": strengths,
+        "issues": issues,
+        "recommendations": recommendations,
+        "psychological_analysis": {
+            "user_journey_flow": (
+                f"Parcours en {count} étape(s), {questions} question(s), "
+                f"{'avec' if has_cta else 'sans'} appel à l'action final"
+            ),
+            "friction_points": friction,
+            "engagement_factors": engagement,
+        },
+        "ab_test_suggestions": ab_tests,
+        # Règles structurelles : moins fiables qu'une lecture du contenu par un LLM
+        "confidence_level": round(min(0.75, BASE_CONFIDENCE + 0.03 * min(count, 5)), 2) if count else 0.3,
+    }
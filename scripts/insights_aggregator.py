@@ -0,0 +1,454 @@
+"""
+Agent Morphius - Agrégats Incrémentaux pour les Insights
+Nümtema AGENCY - Framework Exclusif
+
+Compteurs matérialisés par funnel, par étape et par segment (vues, abandons,
+conversions), mis à jour en O(1) à chaque événement. Les insights sont
+calculés à partir de ces agrégats : l'historique des soumissions n'est
+jamais relu. Les compteurs modifiés sont écrits dans SQLite par flush().
+
+Les totaux déclarés par la table funnels (colonnes views / conversions) et
+les événements comptés ici (vues, soumissions) mesurent la même chose par
+deux sources : ils sont gardés dans des compteurs séparés et le funnel
+retient la plus grande valeur de chaque source, jamais leur somme.
+"""
+
+import math
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+EVENT_TYPES = ("view", "step_view", "drop_off", "conversion")
+
+MIN_FUNNEL_VIEWS = 30     # vues minimales avant de comparer un funnel
+MIN_STEP_VIEWS = 30       # vues minimales avant de juger une étape
+MIN_SEGMENT_VIEWS = 30
+SEGMENT_DELTA = 0.10      # écart relatif minimal pour signaler un segment
+DROP_OFF_RATIO = 1.5      # étape signalée si son abandon dépasse 1,5× la moyenne du funnel
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS insight_aggregates (
+    funnel_id TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    views INTEGER NOT NULL,
+    outcomes INTEGER NOT NULL,
+    PRIMARY KEY (funnel_id, scope, key)
+);
+
+CREATE TABLE IF NOT EXISTS insight_cursors (
+    funnel_id TEXT PRIMARY KEY,
+    last_created_at TEXT NOT NULL,
+    last_ids TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS insight_owners (
+    user_id TEXT NOT NULL,
+    funnel_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, funnel_id)
+);
+"""
+
+
+class FunnelAggregate:
+    """Compteurs d'un funnel : [vues, résultat] par funnel, étape et segment"""
+
+    __slots__ = ("totals", "reported", "steps", "step_order", "segments", "dirty")
+
+    def __init__(self):
+        self.totals = [0, 0]                              # vues, conversions (événements)
+        self.reported = [0, 0]                            # vues, conversions (table funnels)
+        self.steps: Dict[str, List[int]] = {}             # vues, abandons
+        self.step_order: Dict[str, int] = {}
+        self.segments: Dict[str, List[int]] = {}          # vues, conversions
+        self.dirty = set()
+
+    def measured(self) -> Tuple[int, int]:
+        """Vues et conversions du funnel : la source la plus complète pour chacune"""
+        return max(self.totals[0], self.reported[0]), max(self.totals[1], self.reported[1])
+
+
+class InsightsAggregator:
+    """Agrégats incrémentaux, chargés paresseusement funnel par funnel"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self.funnels: Dict[str, FunnelAggregate] = {}
+        self.user_funnels: Dict[str, set] = {}
+        self.cursors: Dict[str, Tuple[str, set]] = {}
+        self._new_owners = set()
+        self._dirty_cursors = set()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    # ------------------------------------------------------------------
+    # Mise à jour O(1)
+    # ------------------------------------------------------------------
+
+    def record(self, event_type: str, funnel_id: str, step_id: Optional[str] = None,
+               segment: Optional[str] = None, count: int = 1):
+        """Applique un événement aux compteurs (O(1))"""
+        aggregate = self.funnels.get(funnel_id) or self._funnel(funnel_id)
+        if event_type == "view":
+            aggregate.totals[0] += count
+            aggregate.dirty.add(("funnel", ""))
+            if segment is not None:
+                self._counter(aggregate, "segment", segment)[0] += count
+        elif event_type == "conversion":
+            aggregate.totals[1] += count
+            aggregate.dirty.add(("funnel", ""))
+            if segment is not None:
+                self._counter(aggregate, "segment", segment)[1] += count
+        elif event_type == "step_view":
+            self._counter(aggregate, "step", step_id)[0] += count
+        elif event_type == "drop_off":
+            self._counter(aggregate, "step", step_id)[1] += count
+        else:
+            raise ValueError(f"Type d'événement inconnu: {event_type}")
+
+    def record_event(self, event: Dict):
+        """Événement au format dict {type, funnel_id, step_id?, segment?}"""
+        self.record(
+            event["type"],
+            str(event["funnel_id"]),
+            str(event["step_id"]) if event.get("step_id") is not None else None,
+            event.get("segment"),
+            event.get("count", 1),
+        )
+
+    def observe_funnel(self, funnel: Dict, user_id: Optional[str] = None):
+        """Déclare un funnel (ordre des étapes, propriétaire, compteurs de la table funnels)"""
+        funnel_id = str(funnel["id"])
+        aggregate = self._funnel(funnel_id)
+        steps = funnel.get("steps") or (funnel.get("config") or {}).get("steps") or []
+        for position, step in enumerate(steps):
+            if isinstance(step, dict) and step.get("id") is not None:
+                aggregate.step_order[str(step["id"])] = position
+
+        # Les colonnes views/conversions sont des totaux : ils ne font que croître.
+        # Compteur séparé : les soumissions ingérées sont déjà incluses dans ces totaux
+        views, conversions = funnel.get("views") or 0, funnel.get("conversions") or 0
+        if views > aggregate.reported[0] or conversions > aggregate.reported[1]:
+            aggregate.reported[0] = max(aggregate.reported[0], views)
+            aggregate.reported[1] = max(aggregate.reported[1], conversions)
+            aggregate.dirty.add(("reported", ""))
+
+        if user_id is not None:
+            owned = self._owned(str(user_id))
+            if funnel_id not in owned:
+                owned.add(funnel_id)
+                self._new_owners.add((str(user_id), funnel_id))
+
+    def ingest_submissions(self, submissions: Iterable[Dict]) -> int:
+        """Applique les nouvelles soumissions seulement (curseur created_at par funnel)
+
+        Chaque ligne est comparée au curseur chargé avant le lot : l'ordre du lot
+        est indifférent (l'API renvoie les soumissions des plus récentes aux plus
+        anciennes). Le curseur avance une seule fois, au max(created_at) du lot.
+        """
+        ingested = 0
+        newest: Dict[str, Tuple[str, set]] = {}
+        for submission in submissions:
+            funnel_id = submission.get("funnel_id") or submission.get("quiz_id")
+            if funnel_id is None:
+                continue
+            funnel_id = str(funnel_id)
+            created_at = submission.get("created_at") or ""
+            submission_id = str(submission.get("id", ""))
+            last_created_at, last_ids = self._cursor(funnel_id)
+            if created_at < last_created_at or (created_at == last_created_at and submission_id in last_ids):
+                continue
+            batch_created_at, batch_ids = newest.get(funnel_id, ("", set()))
+            if created_at == batch_created_at and submission_id in batch_ids:
+                continue
+
+            self.record("conversion", funnel_id, segment=segment_of(submission))
+            if created_at > batch_created_at:
+                newest[funnel_id] = (created_at, {submission_id})
+            else:
+                batch_ids.add(submission_id)
+            ingested += 1
+
+        for funnel_id, (batch_created_at, batch_ids) in newest.items():
+            last_created_at, last_ids = self._cursor(funnel_id)
+            if batch_created_at > last_created_at:
+                self.cursors[funnel_id] = (batch_created_at, batch_ids)
+            elif batch_created_at == last_created_at:
+                last_ids.update(batch_ids)
+            self._dirty_cursors.add(funnel_id)
+        return ingested
+
+    def ingest(self, user_data: Dict) -> int:
+        """Funnels, soumissions et événements transmis par l'API d'insights"""
+        user_id = user_data.get("user_id") or user_data.get("id")
+        for funnel in user_data.get("funnels") or []:
+            if isinstance(funnel, dict) and funnel.get("id") is not None:
+                self.observe_funnel(funnel, user_id)
+        for event in user_data.get("events") or []:
+            self.record_event(event)
+        return self.ingest_submissions(user_data.get("submissions") or [])
+
+    # ------------------------------------------------------------------
+    # Insights (lecture des agrégats uniquement)
+    # ------------------------------------------------------------------
+
+    def insights(self, funnel_ids: Optional[Iterable[str]] = None, user_id: Optional[str] = None) -> List[Dict]:
+        """Insights des funnels demandés, en O(étapes + segments) par funnel"""
+        if funnel_ids is None:
+            funnel_ids = self._owned(str(user_id)) if user_id is not None else list(self.funnels)
+        funnel_ids = sorted(str(funnel_id) for funnel_id in funnel_ids)
+        aggregates = {funnel_id: self._funnel(funnel_id) for funnel_id in funnel_ids}
+
+        insights = []
+        for funnel_id, aggregate in aggregates.items():
+            insight = self._drop_off_insight(funnel_id, aggregate)
+            if insight:
+                insights.append(insight)
+        insights.extend(self._segment_insights(aggregates))
+        insights.extend(self._funnel_comparison_insights(aggregates))
+
+        order = {"high": 0, "medium": 1, "info": 2}
+        insights.sort(key=lambda insight: (order.get(insight["priority"], 3), -insight["confidence"]))
+        return insights
+
+    def _drop_off_insight(self, funnel_id: str, aggregate: FunnelAggregate) -> Optional[Dict]:
+        rates = [
+            (step_id, drop_offs / views, views)
+            for step_id, (views, drop_offs) in aggregate.steps.items() if views >= MIN_STEP_VIEWS
+        ]
+        if len(rates) < 2:
+            return None
+        average = sum(rate for _, rate, _ in rates) / len(rates)
+        step_id, rate, views = max(rates, key=lambda item: item[1])
+        if average <= 0 or rate < DROP_OFF_RATIO * average:
+            return None
+
+        position = aggregate.step_order.get(step_id)
+        label = f"l'étape {position + 1}" if position is not None else f"l'étape {step_id}"
+        recoverable = (rate - average) * views
+        conversions = aggregate.measured()[1]
+        lift = recoverable / conversions if conversions else rate - average
+        return {
+            "type": "optimization",
+            "title": "Abandon Anormal Détecté",
+            "message": f"{rate:.0%} des visiteurs quittent {label} (moyenne du funnel : {average:.0%})",
+            "priority": "high",
+            "impact": f"+{min(lift, 1.0):.0%}",
+            "action_required": f"Simplifier {label} ou la déplacer plus loin dans le funnel",
+            "confidence": _confidence(views),
+            "funnel_id": funnel_id,
+            "step_id": step_id,
+        }
+
+    def _segment_insights(self, aggregates: Dict[str, FunnelAggregate]) -> List[Dict]:
+        segments: Dict[str, List[int]] = {}
+        for aggregate in aggregates.values():
+            for segment, (views, conversions) in aggregate.segments.items():
+                totals = segments.setdefault(segment, [0, 0])
+                totals[0] += views
+                totals[1] += conversions
+
+        measured = {segment: totals for segment, totals in segments.items() if totals[0] >= MIN_SEGMENT_VIEWS}
+        views = sum(totals[0] for totals in measured.values())
+        if len(measured) < 2 or not views:
+            return []
+        overall = sum(totals[1] for totals in measured.values()) / views
+        if overall <= 0:
+            return []
+
+        insights = []
+        for segment, (segment_views, conversions) in measured.items():
+            delta = conversions / segment_views / overall - 1
+            if abs(delta) < SEGMENT_DELTA:
+                continue
+            better = delta > 0
+            insights.append({
+                "type": "trend",
+                "title": "Tendance Positive" if better else "Segment en Retrait",
+                "message": f"Le segment {segment} convertit {abs(delta):.0%} "
+                           f"{'mieux' if better else 'moins bien'} que la moyenne",
+                "priority": "info" if better else "medium",
+                "impact": f"{delta:+.0%}",
+                "action_required": "Continuer cette stratégie" if better else f"Adapter le message au segment {segment}",
+                "confidence": _confidence(segment_views),
+                "segment": segment,
+            })
+        return insights
+
+    def _funnel_comparison_insights(self, aggregates: Dict[str, FunnelAggregate]) -> List[Dict]:
+        totals = {funnel_id: aggregate.measured() for funnel_id, aggregate in aggregates.items()}
+        measured = {
+            funnel_id: conversions / views
+            for funnel_id, (views, conversions) in totals.items() if views >= MIN_FUNNEL_VIEWS
+        }
+        if len(measured) < 2:
+            return []
+        worst = min(measured, key=measured.get)
+        average = (sum(measured.values()) - measured[worst]) / (len(measured) - 1)
+        if average <= 0 or measured[worst] >= average * (1 - SEGMENT_DELTA):
+            return []
+        gap = average / max(measured[worst], 1e-9) - 1
+        return [{
+            "type": "recommendation",
+            "title": "Funnel Sous-Performant",
+            "message": f"Ce funnel convertit à {measured[worst]:.1%} contre {average:.1%} pour vos autres funnels",
+            "priority": "medium",
+            "impact": f"+{min(gap, 1.0):.0%}",
+            "action_required": "Reprendre la structure de votre meilleur funnel",
+            "confidence": _confidence(totals[worst][0]),
+            "funnel_id": worst,
+        }]
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Écrit les compteurs modifiés depuis le dernier flush (upsert)"""
+        return self.write(self.pending_writes())
+
+    def pending_writes(self) -> Optional[Tuple[List[tuple], List[tuple], List[tuple]]]:
+        """Compteurs, curseurs et propriétaires modifiés (copiés et marqués propres)"""
+        if self._conn is None:
+            return None
+        rows = []
+        for funnel_id, aggregate in self.funnels.items():
+            for scope, key in aggregate.dirty:
+                if scope == "funnel":
+                    views, outcomes = aggregate.totals
+                elif scope == "reported":
+                    views, outcomes = aggregate.reported
+                else:
+                    views, outcomes = (aggregate.steps if scope == "step" else aggregate.segments)[key]
+                rows.append((funnel_id, scope, key, views, outcomes))
+            aggregate.dirty.clear()
+        cursors = [
+            (funnel_id, self.cursors[funnel_id][0], "\n".join(sorted(self.cursors[funnel_id][1])))
+            for funnel_id in self._dirty_cursors
+        ]
+        owners = list(self._new_owners)
+        self._dirty_cursors.clear()
+        self._new_owners.clear()
+        return rows, cursors, owners
+
+    def write(self, pending: Optional[Tuple[List[tuple], List[tuple], List[tuple]]]) -> int:
+        """Écrit un lot de pending_writes() en une transaction (appelable hors boucle asyncio)"""
+        if pending is None or self._conn is None:
+            return 0
+        rows, cursors, owners = pending
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO insight_aggregates (funnel_id, scope, key, views, outcomes) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(funnel_id, scope, key) DO UPDATE SET views = excluded.views, outcomes = excluded.outcomes",
+                    rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO insight_cursors (funnel_id, last_created_at, last_ids) VALUES (?, ?, ?)",
+                    cursors,
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO insight_owners (user_id, funnel_id) VALUES (?, ?)", owners
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def close(self):
+        """Flush puis fermeture de la connexion SQLite"""
+        if self._conn is not None:
+            self.flush()
+            with self._lock:
+                self._conn.close()
+            self._conn = None
+
+    def _funnel(self, funnel_id: str) -> FunnelAggregate:
+        aggregate = self.funnels.get(funnel_id)
+        if aggregate is not None:
+            return aggregate
+        aggregate = self.funnels[funnel_id] = FunnelAggregate()
+        if self._conn is not None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT scope, key, views, outcomes FROM insight_aggregates WHERE funnel_id = ?", (funnel_id,)
+                ).fetchall()
+            for scope, key, views, outcomes in rows:
+                if scope == "funnel":
+                    aggregate.totals = [views, outcomes]
+                elif scope == "reported":
+                    aggregate.reported = [views, outcomes]
+                elif scope == "step":
+                    aggregate.steps[key] = [views, outcomes]
+                else:
+                    aggregate.segments[key] = [views, outcomes]
+        return aggregate
+
+    def _counter(self, aggregate: FunnelAggregate, scope: str, key: str) -> List[int]:
+        counters = aggregate.steps if scope == "step" else aggregate.segments
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = [0, 0]
+        aggregate.dirty.add((scope, key))
+        return counter
+
+    def _cursor(self, funnel_id: str) -> Tuple[str, set]:
+        cursor = self.cursors.get(funnel_id)
+        if cursor is None:
+            row = None
+            if self._conn is not None:
+                with self._lock:
+                    row = self._conn.execute(
+                        "SELECT last_created_at, last_ids FROM insight_cursors WHERE funnel_id = ?", (funnel_id,)
+                    ).fetchone()
+            cursor = (row[0], set(row[1].split("\n"))) if row else ("", set())
+            self.cursors[funnel_id] = cursor
+        return cursor
+
+    def _owned(self, user_id: str) -> set:
+        owned = self.user_funnels.get(user_id)
+        if owned is None:
+            owned = set()
+            if self._conn is not None:
+                with self._lock:
+                    owned = {
+                        funnel_id for (funnel_id,) in self._conn.execute(
+                            "SELECT funnel_id FROM insight_owners WHERE user_id = ?", (user_id,)
+                        )
+                    }
+            self.user_funnels[user_id] = owned
+        return owned
+
+
+def segment_of(submission: Dict) -> str:
+    """Segment d'une soumission : explicite, sinon B2B si une entreprise est renseignée"""
+    if submission.get("segment"):
+        return str(submission["segment"])
+    contact = submission.get("contact_info") or {}
+    return "B2B" if contact.get("company") else "B2C"
+
+
+def _confidence(samples: int) -> float:
+    """Confiance croissante avec l'échantillon (0,5 → 0,99)"""
+    return round(min(0.99, 1 - 0.5 / math.sqrt(1 + samples / 30)), 2)
+
+
+def timestamped(insights: List[Dict], agent: str) -> List[Dict]:
+    """Ajoute agent et timestamp au format des insights de l'API"""
+    now = datetime.now().isoformat()
+    for insight in insights:
+        insight["agent"] = agent
+        insight["timestamp"] = now
+    return insights
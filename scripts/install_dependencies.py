@@ -2,6 +2,15 @@ import subprocess
 import sys
 import os
 
+# Liste des packages requis (fusionnée dans le verrou de auto_installer.py build-wheelhouse)
+PACKAGES = [
+    "google-generativeai==0.8.3",
+    "python-dotenv==1.0.0",
+    "asyncio",
+    "aiofiles",
+    "requests"
+]
+
 def install_package(package):
     """Installe un package Python"""
     try:
@@ -16,14 +25,7 @@ def main():
     """Installation des dépendances Agent Morphius"""
     print("🔧 Installation des dépendances Agent Morphius...")
     
-    # Liste des packages requis
-    packages = [
-        "google-generativeai==0.8.3",
-        "python-dotenv==1.0.0",
-        "asyncio",
-        "aiofiles",
-        "requests"
-    ]
+    packages = PACKAGES
     
     success_count = 0
     for package in packages:
@@ -0,0 +1,324 @@
+"""
+Agent Morphius - File de Tâches Durable (SQLite)
+Nümtema AGENCY - Framework Exclusif
+
+Les analyses longues sont mises en file au lieu d'être attendues par la
+requête : enqueue renvoie un identifiant, get/result permettent de suivre
+la tâche. Un pool de workers asyncio réclame les tâches par priorité sous
+bail (visibility timeout, prolongé tant que le handler tourne) : une tâche
+dont le worker a été tué redevient disponible à l'expiration du bail.
+Échecs rejoués avec backoff exponentiel à jitter complet, clés
+d'idempotence uniques, aucun service externe.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    lease_token TEXT,
+    lease_until REAL,
+    idempotency_key TEXT UNIQUE,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority DESC, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(status, lease_until);
+"""
+
+JOB_COLUMNS = ("id", "kind", "payload", "priority", "status", "attempts", "max_attempts", "run_after",
+               "lease_until", "idempotency_key", "result", "error", "created_at", "updated_at")
+
+
+class JobFailedError(Exception):
+    """La tâche a épuisé ses tentatives"""
+
+
+class JobQueue:
+    """File de tâches persistante en mode WAL, partageable entre processus"""
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Autres processus (workers, API) : attendre le verrou d'écriture plutôt qu'échouer
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+
+    def enqueue(self, kind: str, payload: Dict, priority: int = 0, idempotency_key: Optional[str] = None,
+                max_attempts: Optional[int] = None, delay: float = 0.0) -> str:
+        """Ajoute une tâche ; avec une clé d'idempotence déjà connue, renvoie la tâche existante"""
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, payload, priority, status, max_attempts, run_after, "
+                "idempotency_key, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload, ensure_ascii=False, default=str), priority, QUEUED,
+                 max_attempts or self.max_attempts, now + delay, idempotency_key, now, now),
+            )
+            if cursor.rowcount == 0:
+                job_id = self._conn.execute(
+                    "SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)
+                ).fetchone()[0]
+        return job_id
+
+    def claim(self, kinds: Iterable[str], visibility_timeout: float) -> Optional[Dict]:
+        """Réclame la tâche prête la plus prioritaire sous un bail de visibility_timeout secondes"""
+        kinds = list(kinds)
+        placeholders = ",".join("?" * len(kinds))
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire_leases(now)
+                row = self._conn.execute(
+                    f"SELECT id FROM jobs WHERE status = ? AND kind IN ({placeholders}) AND run_after <= ? "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED, *kinds, now),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_token = ?, lease_until = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (RUNNING, token, now + visibility_timeout, now, row[0]),
+                )
+                job = self._fetch(row[0])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        job["lease_token"] = token
+        return job
+
+    def heartbeat(self, job_id: str, token: str, visibility_timeout: float) -> bool:
+        """Prolonge le bail ; False si la tâche a été réattribuée entre-temps"""
+        return self._update_leased(job_id, token, "lease_until = ?", (time.time() + visibility_timeout,))
+
+    def complete(self, job_id: str, token: str, result: Any) -> bool:
+        """Enregistre le résultat ; False si le bail a été perdu (résultat ignoré)"""
+        return self._update_leased(
+            job_id, token, "status = ?, result = ?, error = NULL, lease_token = NULL, lease_until = NULL",
+            (DONE, json.dumps(result, ensure_ascii=False, default=str)),
+        )
+
+    def fail(self, job_id: str, token: str, error: str, backoff_base: float = 2.0,
+             backoff_max: float = 60.0) -> Optional[str]:
+        """Échec d'une tentative : remise en file après backoff jitteré, ou échec définitif"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_token = ?", (job_id, token)
+            ).fetchone()
+            if row is None:
+                return None
+            attempts, max_attempts = row
+            now = time.time()
+            if attempts >= max_attempts:
+                status, run_after = FAILED, now
+            else:
+                # Jitter complet : des workers en échec simultané ne réessaient pas ensemble
+                status = QUEUED
+                run_after = now + random.uniform(0, min(backoff_max, backoff_base * 2 ** (attempts - 1)))
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, run_after = ?, error = ?, lease_token = NULL, lease_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (status, run_after, error, now, job_id),
+            )
+        return status
+
+    def release(self, job_id: str, token: str) -> bool:
+        """Rend la tâche sans compter la tentative (arrêt propre d'un worker)"""
+        return self._update_leased(
+            job_id, token, "status = ?, attempts = attempts - 1, lease_token = NULL, lease_until = NULL",
+            (QUEUED,),
+        )
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """État courant de la tâche (résultat inclus une fois terminée)"""
+        with self._lock:
+            return self._fetch(job_id)
+
+    def result(self, job_id: str) -> Optional[Any]:
+        """Résultat si terminée, None si en attente ; JobFailedError si définitivement échouée"""
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job["status"] == FAILED:
+            raise JobFailedError(f"Tâche {job_id} échouée après {job['attempts']} tentatives: {job['error']}")
+        return job["result"] if job["status"] == DONE else None
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None, poll_interval: float = 0.2) -> Any:
+        """Attend le résultat (scrutation de la base, utilisable depuis un autre processus)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            result = self.result(job_id)
+            if result is not None:
+                return result
+            if deadline is not None and time.monotonic() >= deadline:
+                raise asyncio.TimeoutError(job_id)
+            await asyncio.sleep(poll_interval)
+
+    def counts(self, kinds: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Nombre de tâches par statut"""
+        query, params = "SELECT status, COUNT(*) FROM jobs", ()
+        if kinds is not None:
+            kinds = list(kinds)
+            query += f" WHERE kind IN ({','.join('?' * len(kinds))})"
+            params = tuple(kinds)
+        with self._lock:
+            counts = dict(self._conn.execute(query + " GROUP BY status", params).fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _expire_leases(self, now: float):
+        """Baux expirés (worker tué ou bloqué) : remise en file, ou échec si plus de tentatives"""
+        self._conn.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, "
+            "error = 'Bail expiré (worker interrompu)', lease_token = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE status = ? AND lease_until < ?",
+            (FAILED, QUEUED, now, RUNNING, now),
+        )
+
+    def _update_leased(self, job_id: str, token: str, assignments: str, params: tuple) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE id = ? AND lease_token = ?",
+                (*params, time.time(), job_id, token),
+            )
+        return cursor.rowcount == 1
+
+    def _fetch(self, job_id: str) -> Optional[Dict]:
+        row = self._conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+
+JobHandler = Callable[[Dict], Awaitable[Any]]
+
+
+class JobWorkerPool:
+    """`concurrency` workers asyncio qui exécutent les handlers par type de tâche
+
+    Les accès SQLite (verrou d'écriture attendu jusqu'à busy_timeout) passent
+    par asyncio.to_thread : une base occupée ne bloque pas la boucle.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler], concurrency: int = 4,
+                 visibility_timeout: float = 300.0, poll_interval: float = 0.2,
+                 backoff_base: float = 2.0, backoff_max: float = 60.0):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.visibility_timeout = visibility_timeout
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = {"completed": 0, "retried": 0, "failed": 0, "lost_leases": 0}
+        self._stopping = asyncio.Event()
+
+    async def run(self, stop_when_idle: bool = False):
+        """Exécute les tâches jusqu'à stop() (ou jusqu'à ce que la file soit vide)"""
+        self._stopping.clear()
+        await asyncio.gather(*[self._worker(stop_when_idle) for _ in range(self.concurrency)])
+
+    def stop(self):
+        """Arrêt propre : les tâches en cours se terminent, aucune nouvelle n'est réclamée"""
+        self._stopping.set()
+
+    async def _worker(self, stop_when_idle: bool):
+        while not self._stopping.is_set():
+            job = await asyncio.to_thread(self.queue.claim, self.handlers, self.visibility_timeout)
+            if job is None:
+                if stop_when_idle and not await asyncio.to_thread(self._pending):
+                    return
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._execute(job)
+
+    def _pending(self) -> bool:
+        counts = self.queue.counts(self.handlers)
+        return bool(counts[QUEUED] or counts[RUNNING])
+
+    async def _execute(self, job: Dict):
+        heartbeat = asyncio.ensure_future(self._heartbeat(job))
+        try:
+            result = await self.handlers[job["kind"]](job)
+        except asyncio.CancelledError:
+            # Arrêt en cours : libération synchrone, la tâche annulée ne doit plus rien attendre
+            self.queue.release(job["id"], job["lease_token"])
+            raise
+        except Exception as e:
+            status = await asyncio.to_thread(self.queue.fail, job["id"], job["lease_token"],
+                                             f"{type(e).__name__}: {e}", self.backoff_base, self.backoff_max)
+            if status == FAILED:
+                self.stats["failed"] += 1
+                logger.error(f"❌ Tâche {job['kind']} {job['id']} échouée définitivement: {e}")
+            elif status == QUEUED:
+                self.stats["retried"] += 1
+                logger.warning(f"🔁 Tâche {job['kind']} {job['id']} remise en file (tentative {job['attempts']}): {e}")
+            else:
+                self.stats["lost_leases"] += 1
+        else:
+            if await asyncio.to_thread(self.queue.complete, job["id"], job["lease_token"], result):
+                self.stats["completed"] += 1
+            else:
+                self.stats["lost_leases"] += 1
+                logger.warning(f"⚠️ Bail perdu pour la tâche {job['id']} : résultat ignoré")
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job: Dict):
+        """Prolonge le bail tant que le handler tourne (tâches plus longues que le timeout)"""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            if not await asyncio.to_thread(self.queue.heartbeat, job["id"], job["lease_token"],
+                                           self.visibility_timeout):
+                return
+
+
+def is_last_attempt(job: Dict) -> bool:
+    """Dernière tentative : le handler doit rendre un résultat, même dégradé"""
+    return job["attempts"] >= job["max_attempts"]
+
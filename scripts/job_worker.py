@@ -0,0 +1,39 @@
+"""
+Agent Morphius - Worker de la File de Tâches
+Nümtema AGENCY - Framework Exclusif
+
+Exécute les analyses mises en file par enqueue_funnel_analysis /
+enqueue_step_optimization. Plusieurs workers (processus) peuvent partager
+la même base : les baux SQLite évitent les doubles exécutions.
+
+    python scripts/job_worker.py [--concurrency 8] [--until-idle]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agent_morphius_fixed import run_job_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker de la file de tâches Agent Morphius")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--until-idle", action="store_true", help="s'arrêter quand la file est vide")
+    args = parser.parse_args()
+
+    print(f"🧠 Worker Agent Morphius démarré (pid {os.getpid()})", file=sys.stderr)
+    try:
+        stats = asyncio.run(run_job_worker(args.concurrency, stop_when_idle=args.until_idle))
+    except KeyboardInterrupt:
+        # Les tâches interrompues sont rendues à la file (ou reprises à l'expiration du bail)
+        return
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
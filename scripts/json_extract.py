@@ -0,0 +1,255 @@
+"""
+Agent Morphius - Extraction JSON des Réponses LLM
+Nümtema AGENCY - Framework Exclusif
+
+Remplace re.search(r'\\{.*\\}', text, re.DOTALL). Chemin rapide d'abord, au
+même coût que cette regex : de la première accolade à la dernière, json.loads.
+Sinon (prose avec accolades, objets multiples, réponse abîmée), un passage
+linéaire qui respecte chaînes et accolades, gère les blocs ```json, répare
+les défauts courants (virgules finales, réponse tronquée) et valide le schéma.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+NUMBER = (int, float)
+
+# Champ -> (types acceptés, obligatoire)
+ANALYSIS_SCHEMA = {
+    "overall_score": (NUMBER, True),
+    "conversion_prediction": (NUMBER, False),
+    "strengths": (list, False),
+    "issues": (list, False),
+    "recommendations": (list, False),
+    "psychological_analysis": (dict, False),
+    "ab_test_suggestions": (list, False),
+    "confidence_level": (NUMBER, False),
+}
+
+OPTIMIZATION_SCHEMA = {
+    "optimized_title": (str, True),
+    "optimized_content": (str, False),
+    "optimized_options": (list, False),
+    "visual_suggestions": (list, False),
+    "expected_improvement": ((str, int, float), False),
+    "confidence": (NUMBER, False),
+}
+
+STEPS_OPTIMIZATION_SCHEMA = {
+    "steps": (list, True),
+}
+
+PREDICTION_SCHEMA = {
+    "predicted_conversion_rate": (NUMBER, True),
+    "confidence_interval": (dict, False),
+    "scenarios": (dict, False),
+    "model_confidence": (NUMBER, False),
+}
+
+STRUCTURAL_PATTERN = re.compile(r'[{}\[\]",]')
+STRING_PATTERN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)```", re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r",(\s*[}\]])")
+# Un objet JSON commence par { suivi d'une clé ou de } : "{ dans la prose" est ignoré
+OPENER_PATTERNS = {
+    "{": re.compile(r'\{(?=\s*["}])'),
+    "[": re.compile(r'\[(?=\s*[\[{"\d\-tfn\]])'),
+}
+CLOSERS = {"{": "}", "[": "]"}
+MAX_TRUNCATION_RETRIES = 4
+MAX_RESTARTS = 8
+
+
+class JSONExtractionError(ValueError):
+    """Aucun objet JSON valide dans la réponse"""
+
+
+def extract_json(text: str, schema: Optional[Dict] = None) -> Dict:
+    """Retourne le premier objet JSON de `text` valide pour `schema`"""
+    if not text:
+        raise JSONExtractionError("Réponse vide")
+
+    return _extract(text, "{", lambda candidate: validate(candidate, schema) if schema else candidate)
+
+
+def extract_json_array(text: str, item_schema: Optional[Dict] = None) -> List:
+    """Retourne le premier tableau JSON de `text` (éléments validés par `item_schema`)"""
+    if not text:
+        raise JSONExtractionError("Réponse vide")
+
+    def check(candidate: Any) -> List:
+        if not isinstance(candidate, list):
+            raise JSONExtractionError("La réponse n'est pas un tableau JSON")
+        return [validate(item, item_schema) for item in candidate] if item_schema else candidate
+
+    return _extract(text, "[", check)
+
+
+def _extract(text: str, opener: str, check) -> Any:
+    # Chemin rapide avant toute recherche de bloc ```json : les marqueurs sont
+    # hors des accolades, une réponse bien formée est extraite directement
+    result = _whole(text, opener, check)
+    if result is not None:
+        return result
+
+    errors = []
+    fences = [match.group(1) for match in FENCE_PATTERN.finditer(text)]
+    for source in fences + [text]:
+        if source is not text:
+            result = _whole(source, opener, check)
+            if result is not None:
+                return result
+
+        for candidate in _candidates(source, opener):
+            try:
+                return check(candidate)
+            except JSONExtractionError as e:
+                errors.append(str(e))
+
+    detail = f": {errors[-1]}" if errors else ""
+    raise JSONExtractionError(f"Impossible de parser la réponse JSON{detail}")
+
+
+def _whole(source: str, opener: str, check) -> Optional[Any]:
+    """Valeur JSON bien formée de la première ouvrante à la dernière fermante, sinon None"""
+    first, last = source.find(opener), source.rfind(CLOSERS[opener])
+    if 0 <= first < last:
+        try:
+            return check(json.loads(source[first:last + 1]))
+        except ValueError:
+            pass
+    return None
+
+
+def validate(data: Any, schema: Dict) -> Dict:
+    """Vérifie types et champs obligatoires (les nombres en texte sont convertis)"""
+    if not isinstance(data, dict):
+        raise JSONExtractionError("La réponse n'est pas un objet JSON")
+
+    for field, (types, required) in schema.items():
+        if data.get(field, ...) is None and not required:
+            # null sur un champ optionnel : traité comme absent
+            del data[field]
+        if field not in data:
+            if required:
+                raise JSONExtractionError(f"Champ obligatoire manquant: {field}")
+            continue
+        value = data[field]
+        if types is NUMBER and isinstance(value, str):
+            try:
+                value = data[field] = float(value.strip().rstrip("%"))
+            except ValueError:
+                pass
+        if not isinstance(value, types) or (types is NUMBER and isinstance(value, bool)):
+            raise JSONExtractionError(f"Type invalide pour {field}: {type(value).__name__}")
+    return data
+
+
+def _candidates(text: str, opener: str = "{") -> Iterator[Any]:
+    """Valeurs de premier niveau de `text`, dans l'ordre, réparées si nécessaire"""
+    position, restarts = 0, 0
+    while position is not None:
+        resume = None
+        for start, segment, stack, commas, in_string in _scan(text, opener, position):
+            if not stack:
+                parsed = _loads(segment)
+            else:
+                parsed = _close_truncated(segment, stack, commas, in_string)
+            if parsed is not None:
+                yield parsed
+            elif restarts < MAX_RESTARTS:
+                # Faux départ (accolade dans la prose) : on repart juste après
+                restarts += 1
+                resume = start + 1
+                break
+        position = resume
+
+
+def _scan(text: str, opener: str = "{", position: int = 0) -> Iterator[Tuple[int, str, List[str], List, bool]]:
+    """Passage unique : découpe les valeurs équilibrées (chaînes et échappements respectés)"""
+    stack: List[str] = []
+    commas: List[Tuple[int, Tuple[str, ...]]] = []
+    start = position
+    start_pattern = OPENER_PATTERNS[opener]
+
+    while True:
+        if not stack:
+            opening = start_pattern.search(text, position)
+            if opening is None:
+                return
+            start = position = opening.start()
+            stack.append(opener)
+            commas = []
+            position += 1
+            continue
+
+        # Saut direct au prochain caractère structurel (recherche en C)
+        match = STRUCTURAL_PATTERN.search(text, position)
+        if match is None:
+            break
+        char, position = match.group(), match.start()
+
+        if char == '"':
+            string = STRING_PATTERN.match(text, position)
+            if string is None:
+                # Chaîne jamais refermée : réponse tronquée
+                yield start, text[start:], stack, commas, True
+                return
+            position = string.end()
+            continue
+
+        if char in "{[":
+            stack.append(char)
+        elif char in "}]":
+            if CLOSERS[stack[-1]] == char:
+                stack.pop()
+            if not stack:
+                yield start, text[start:position + 1], [], [], False
+        else:
+            commas.append((position - start, tuple(stack)))
+        position += 1
+
+    # Réponse tronquée : l'objet ouvert est retourné pour réparation
+    yield start, text[start:], stack, commas, False
+
+
+def _loads(segment: str) -> Optional[Any]:
+    try:
+        return json.loads(segment)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_strip_trailing_commas(segment))
+    except ValueError:
+        return None
+
+
+def _strip_trailing_commas(segment: str) -> str:
+    """Supprime les virgules avant } ou ] hors des chaînes"""
+    if "," not in segment:
+        return segment
+    parts = re.split(f"({STRING_PATTERN.pattern})", segment, flags=re.DOTALL)
+    return "".join(
+        part if index % 2 else TRAILING_COMMA_PATTERN.sub(r"\1", part)
+        for index, part in enumerate(parts)
+    )
+
+
+def _close_truncated(segment: str, stack: List[str], commas, in_string: bool) -> Optional[Any]:
+    """Ferme un objet tronqué ; à défaut, recule jusqu'aux dernières virgules"""
+    if in_string:
+        # Un échappement coupé en fin de flux (\) est retiré avant de fermer la chaîne
+        backslashes = len(segment) - len(segment.rstrip("\\"))
+        tail = (segment[:-1] if backslashes % 2 else segment) + '"'
+    else:
+        tail = segment.rstrip()
+    parsed = _loads(tail.rstrip(",") + "".join(CLOSERS[c] for c in reversed(stack)))
+    if parsed is not None:
+        return parsed
+
+    for offset, comma_stack in reversed(commas[-MAX_TRUNCATION_RETRIES:]):
+        parsed = _loads(segment[:offset] + "".join(CLOSERS[c] for c in reversed(comma_stack)))
+        if parsed is not None:
+            return parsed
+    return None
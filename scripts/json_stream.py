@@ -0,0 +1,79 @@
+"""
+Agent Morphius - Parsing JSON Incrémental
+Nümtema AGENCY - Framework Exclusif
+
+Consomme une réponse LLM par morceaux et restitue chaque champ de premier
+niveau de l'objet JSON dès qu'il est complet.
+"""
+
+import json
+from typing import Any, Dict, Iterator, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """Analyse un flux texte et émet les paires (clé, valeur) de premier niveau"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.field_start = None   # début du champ courant (profondeur 1)
+        self.done = False
+        self.fields: Dict[str, Any] = {}
+
+    def feed(self, chunk: str) -> Iterator[Tuple[str, Any]]:
+        """Ajoute un morceau et émet les champs devenus complets"""
+        if self.done:
+            return
+        self.buffer += chunk
+
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            index = self.position
+            self.position += 1
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+                continue
+
+            if self.depth == 0:
+                # Texte avant l'objet (prose, ```json) ignoré
+                if char == "{":
+                    self.depth = 1
+                    self.field_start = index + 1
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "{[":
+                self.depth += 1
+            elif char in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    yield from self._emit(index)
+                    self.done = True
+                    return
+            elif char == "," and self.depth == 1:
+                yield from self._emit(index)
+                self.field_start = index + 1
+
+    def _emit(self, end: int) -> Iterator[Tuple[str, Any]]:
+        segment = self.buffer[self.field_start:end].strip()
+        if not segment:
+            return
+        try:
+            field = json.loads("{" + segment + "}")
+        except ValueError:
+            # Champ invalide (virgule finale, texte parasite) : ignoré ici,
+            # l'objet complet sera revalidé par l'appelant
+            return
+        for key, value in field.items():
+            self.fields[key] = value
+            yield key, value
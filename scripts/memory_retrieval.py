@@ -0,0 +1,66 @@
+"""
+Agent Morphius - Récupération de Mémoire Pertinente
+Nümtema AGENCY - Framework Exclusif
+
+Classement BM25 sur l'index FTS5 de la base de mémoire, interrogé à chaque
+appel : seules les expériences les plus proches du funnel analysé sont
+injectées dans le prompt, sous un budget de tokens. Rien n'est rechargé ni
+réindexé au démarrage de l'agent.
+"""
+
+import json
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from memory_store import MEMORY_KINDS
+from prompt_templates import estimate_tokens
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "les", "des", "une", "est", "pour", "dans", "par", "sur", "avec", "que", "qui",
+    "the", "and", "for", "with", "this", "that", "true", "false", "null", "none",
+}
+
+
+def tokenize(value: Any) -> List[str]:
+    """Extrait les termes d'une structure JSON (clés et valeurs texte)"""
+    text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if len(token) > 2 and token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+class MemoryIndex:
+    """Recherche BM25 dans l'index FTS5 persistant de la mémoire (agent_memory.db)"""
+
+    def __init__(self, store, max_query_terms: int = 64, window: int = 2000):
+        self.store = store
+        self.max_query_terms = max_query_terms
+        # Seules les `window` expériences les plus récentes sont classées :
+        # la latence reste bornée quand l'historique grandit.
+        self.window = window
+
+    def search(self, query: Any, top_k: int = 5) -> List[Tuple[float, str, Dict]]:
+        """Retourne les (score, kind, entrée) les plus pertinents, top_k par type"""
+        return [
+            (score, kind, json.loads(payload))
+            for score, kind, payload in self._search(query, top_k)
+        ]
+
+    def _search(self, query: Any, top_k: int) -> List[Tuple[float, str, str]]:
+        terms = [term for term, _ in Counter(tokenize(query)).most_common(self.max_query_terms)]
+        return self.store.search(terms, top_k=top_k, window=self.window)
+
+    def build_context(self, query: Any, top_k: int = 5, token_budget: int = 1500) -> Dict:
+        """Sélectionne le top-k par type de mémoire sans dépasser le budget de tokens"""
+        context = {kind: [] for kind in MEMORY_KINDS}
+        used = 0
+        for _, kind, payload in self._search(query, top_k):
+            cost = estimate_tokens(payload)
+            if used + cost > token_budget:
+                continue
+            context[kind].append(json.loads(payload))
+            used += cost
+        return context
@@ -0,0 +1,262 @@
+"""
+Agent Morphius - Mémoire Expérientielle Persistante (SQLite)
+Nümtema AGENCY - Framework Exclusif
+
+Stockage append-only de la mémoire de l'agent : chaque analyse est une
+ligne insérée, jamais une réécriture complète du fichier. Un index plein
+texte FTS5 (experiences_fts), alimenté dans la même transaction que
+l'INSERT, permet de retrouver les expériences pertinentes sans recharger
+l'historique au démarrage.
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+MEMORY_KINDS = ("optimizations", "patterns", "best_practices")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiences (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    funnel_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_experiences_funnel_id ON experiences(funnel_id);
+CREATE INDEX IF NOT EXISTS idx_experiences_timestamp ON experiences(timestamp);
+CREATE INDEX IF NOT EXISTS idx_experiences_kind ON experiences(kind, id);
+
+CREATE TABLE IF NOT EXISTS imports (
+    source TEXT PRIMARY KEY,
+    imported_at TEXT NOT NULL,
+    entries INTEGER NOT NULL
+);
+
+-- Index plein texte sans contenu (le JSON reste dans experiences), rowid = experiences.id
+CREATE VIRTUAL TABLE IF NOT EXISTS experiences_fts USING fts5(payload, content='');
+CREATE TRIGGER IF NOT EXISTS experiences_fts_insert AFTER INSERT ON experiences BEGIN
+    INSERT INTO experiences_fts (rowid, payload) VALUES (new.id, new.payload);
+END;
+"""
+
+# Classement BM25 (bm25() : plus petit = plus pertinent), top-k par type de
+# mémoire, limité aux `window` entrées les plus récentes
+SEARCH_QUERY = """
+SELECT kind, payload, score FROM (
+    SELECT e.kind, e.payload, matches.score,
+           ROW_NUMBER() OVER (PARTITION BY e.kind ORDER BY matches.score) AS position
+    FROM (
+        SELECT rowid, bm25(experiences_fts) AS score FROM experiences_fts
+        WHERE experiences_fts MATCH ? AND rowid > ?
+    ) AS matches
+    JOIN experiences e ON e.id = matches.rowid
+)
+WHERE position <= ?
+ORDER BY score
+"""
+
+
+class ExperienceStore:
+    """Mémoire expérientielle append-only en mode WAL"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Une seule connexion partagée, protégée par un verrou : les tâches
+        # concurrentes sérialisent leurs INSERT au lieu d'écraser un fichier.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._index_backlog()
+
+    def append(self, kind: str, entry: Dict) -> int:
+        """Ajoute une entrée (O(1)) et retourne son identifiant"""
+        return self.append_many(kind, [entry])[-1]
+
+    def append_many(self, kind: str, entries: List[Dict]) -> List[int]:
+        """Ajoute plusieurs entrées dans une seule transaction"""
+        return self.append_batch([(kind, entry) for entry in entries])
+
+    def append_batch(self, items: List[Tuple[str, Dict]]) -> List[int]:
+        """Ajoute des (kind, entrée) de types mélangés dans une seule transaction"""
+        for kind, _ in items:
+            if kind not in MEMORY_KINDS:
+                raise ValueError(f"Type de mémoire inconnu: {kind}")
+
+        rows = [self._to_row(kind, entry) for kind, entry in items]
+        ids = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    cursor = self._conn.execute(
+                        "INSERT INTO experiences (kind, timestamp, funnel_id, payload) VALUES (?, ?, ?, ?)",
+                        row,
+                    )
+                    ids.append(cursor.lastrowid)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return ids
+
+    def load_memory(self, limit: Optional[int] = None) -> Dict:
+        """Reconstruit la mémoire au format historique (les `limit` plus récentes par type)"""
+        memory = {kind: [] for kind in MEMORY_KINDS}
+        with self._lock:
+            for kind in MEMORY_KINDS:
+                if limit is None:
+                    rows = self._conn.execute(
+                        "SELECT payload FROM experiences WHERE kind = ? ORDER BY id", (kind,)
+                    ).fetchall()
+                else:
+                    rows = self._conn.execute(
+                        "SELECT payload FROM (SELECT id, payload FROM experiences WHERE kind = ? "
+                        "ORDER BY id DESC LIMIT ?) ORDER BY id",
+                        (kind, limit),
+                    ).fetchall()
+                memory[kind] = [json.loads(payload) for (payload,) in rows]
+        return memory
+
+    def history_for_funnel(self, funnel_id: str, limit: int = 20) -> List[Dict]:
+        """Dernières analyses d'un funnel (via l'index funnel_id)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM experiences WHERE kind = 'optimizations' AND funnel_id = ? "
+                "ORDER BY id DESC LIMIT ?",
+                (str(funnel_id), limit),
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows]
+
+    def search(self, terms: List[str], top_k: int = 5, window: int = 2000) -> List[Tuple[float, str, str]]:
+        """(score, kind, payload JSON) des entrées récentes contenant au moins un des termes"""
+        if not terms or top_k <= 0:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self._lock:
+            last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM experiences").fetchone()[0]
+            rows = self._conn.execute(SEARCH_QUERY, (match, last_id - window, top_k)).fetchall()
+        return [(-score, kind, payload) for kind, payload, score in rows]
+
+    def count(self, kind: Optional[str] = None) -> int:
+        """Nombre d'entrées stockées"""
+        with self._lock:
+            if kind is None:
+                return self._conn.execute("SELECT COUNT(*) FROM experiences").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM experiences WHERE kind = ?", (kind,)
+            ).fetchone()[0]
+
+    def import_json(self, json_path: str) -> int:
+        """Importe une seule fois un ancien fichier agent_experience.json"""
+        if not os.path.exists(json_path):
+            return 0
+
+        source = os.path.abspath(json_path)
+        with self._lock:
+            already = self._conn.execute(
+                "SELECT 1 FROM imports WHERE source = ?", (source,)
+            ).fetchone()
+        if already:
+            return 0
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+
+        rows = []
+        for kind in MEMORY_KINDS:
+            for entry in legacy.get(kind, []):
+                rows.append(self._to_row(kind, entry))
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO experiences (kind, timestamp, funnel_id, payload) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute(
+                    "INSERT INTO imports (source, imported_at, entries) VALUES (?, ?, ?)",
+                    (source, datetime.now().isoformat(), len(rows)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def export_json(self, json_path: str) -> int:
+        """Exporte la mémoire au format agent_experience.json (fichier temporaire + os.replace)"""
+        memory = self.load_memory()
+        atomic_write_json(json_path, memory)
+        return sum(len(entries) for entries in memory.values())
+
+    def close(self):
+        """Ferme la connexion SQLite"""
+        with self._lock:
+            self._conn.close()
+
+    def _index_backlog(self):
+        """Indexe les entrées antérieures à l'index FTS5 (bases créées avant lui, une seule fois)"""
+        with self._lock:
+            indexed = self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM experiences_fts").fetchone()[0]
+            last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM experiences").fetchone()[0]
+            if last_id > indexed:
+                self._conn.execute(
+                    "INSERT INTO experiences_fts (rowid, payload) SELECT id, payload FROM experiences WHERE id > ?",
+                    (indexed,),
+                )
+
+    @staticmethod
+    def _to_row(kind: str, entry: Dict) -> tuple:
+        if isinstance(entry, dict):
+            timestamp = entry.get("timestamp") or datetime.now().isoformat()
+            funnel_id = entry.get("funnel_id")
+        else:
+            timestamp = datetime.now().isoformat()
+            funnel_id = None
+        return (
+            kind,
+            timestamp,
+            str(funnel_id) if funnel_id is not None else None,
+            json.dumps(entry, ensure_ascii=False),
+        )
+
+
+def atomic_write_json(path: str, data) -> None:
+    """Écrit un JSON sans jamais laisser de fichier à moitié écrit (tmp + fsync + os.replace)"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+if __name__ == "__main__":
+    # Import manuel : python memory_store.py logs/agent_experience.json [logs/agent_memory.db]
+    if len(sys.argv) < 2:
+        print("Usage: python memory_store.py <agent_experience.json> [agent_memory.db]")
+        sys.exit(1)
+
+    store = ExperienceStore(sys.argv[2] if len(sys.argv) > 2 else "logs/agent_memory.db")
+    imported = store.import_json(sys.argv[1])
+    print(f"✅ {imported} entrées importées ({store.count()} au total)")
+    store.close()
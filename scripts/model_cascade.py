@@ -0,0 +1,58 @@
+"""
+Agent Morphius - Cascade Brouillon Rapide puis Modèle d'Analyse
+Nümtema AGENCY - Framework Exclusif
+
+Le modèle fast_draft répond d'abord ; on ne passe au modèle analysis que
+si le brouillon est invalide (JSON illisible ou schéma non respecté), peu
+confiant, ou si le funnel dépasse le seuil de complexité (dans ce cas le
+brouillon n'est même pas demandé). Seuils et tarifs : GLOBAL_CONFIG["cascade"].
+"""
+
+from typing import Dict, Optional
+
+# Raisons d'escalade (libellés de télémétrie et du champ "cascade" de l'analyse)
+REASON_COMPLEXITY = "complexity"
+REASON_INVALID_DRAFT = "invalid_draft"
+REASON_DRAFT_ERROR = "draft_error"
+REASON_LOW_CONFIDENCE = "low_confidence"
+
+
+def funnel_complexity(funnel_data: Dict) -> int:
+    """Étapes + champs + options : proxy de la difficulté d'analyse"""
+    steps = funnel_data.get("steps") or []
+    complexity = len(steps)
+    for step in steps:
+        if isinstance(step, dict):
+            complexity += len(step.get("fields") or []) + len(step.get("options") or [])
+    return complexity
+
+
+def draft_confidence(draft: Dict) -> float:
+    """confidence_level du brouillon ramené dans [0, 1] (absent = 0)"""
+    confidence = draft.get("confidence_level")
+    if not isinstance(confidence, (int, float)):
+        return 0.0
+    # Certains modèles répondent en pourcentage malgré le format demandé
+    return confidence / 100 if confidence > 1 else float(confidence)
+
+
+def pre_escalation_reason(funnel_data: Dict, settings: Dict) -> Optional[str]:
+    """Escalade décidée avant tout appel (funnel trop complexe pour le brouillon)"""
+    if funnel_complexity(funnel_data) > settings["max_complexity"]:
+        return REASON_COMPLEXITY
+    return None
+
+
+def draft_escalation_reason(draft: Dict, settings: Dict) -> Optional[str]:
+    """Escalade décidée sur le brouillon validé (None : le brouillon est retenu)"""
+    if draft_confidence(draft) < settings["min_confidence"]:
+        return REASON_LOW_CONFIDENCE
+    return None
+
+
+def call_cost(model: str, prompt_tokens: int, response_tokens: int, prices: Dict[str, Dict]) -> float:
+    """Coût d'un appel en dollars (tarifs par million de tokens)"""
+    price = prices.get(model)
+    if price is None:
+        return 0.0
+    return (prompt_tokens * price["input"] + response_tokens * price["output"]) / 1_000_000
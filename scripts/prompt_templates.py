@@ -0,0 +1,281 @@
+"""
+Agent Morphius - Templates de Prompt Précompilés
+Nümtema AGENCY - Framework Exclusif
+
+Chaque template est versionné et compilé une seule fois : texte dédenté,
+format de réponse sérialisé d'avance, puis découpé en parties littérales et
+emplacements. Les données sont sérialisées en JSON canonique compact (clés
+triées, sans espaces). La partie statique est toujours placée en tête du
+prompt : ce préfixe stable permet au cache de prompt des providers de servir.
+"""
+
+import hashlib
+import json
+import re
+import textwrap
+from typing import Any, Dict, List, NamedTuple, Optional
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{(\w+)\}\}")
+# Mots, ponctuation, et blocs d'espaces (sauts de ligne, indentation) : une espace
+# simple est fusionnée avec le mot suivant par les tokenizers BPE, pas une indentation
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\n\s*|\s{2,}")
+
+
+def canonical_json(value: Any) -> str:
+    """JSON canonique compact : clés triées, aucun espace superflu"""
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation locale du nombre de tokens (mots découpés par ~4 caractères, ponctuation, indentation)"""
+    tokens = 0
+    for match in TOKEN_PATTERN.finditer(text or ""):
+        length = match.end() - match.start()
+        tokens += 1 if length <= 4 else (length + 3) // 4
+    return tokens
+
+
+def _compact(text: str) -> str:
+    """Dédente et retire l'indentation et les lignes vides en double"""
+    lines = [line.strip() for line in textwrap.dedent(text).strip().splitlines()]
+    compacted: List[str] = []
+    for line in lines:
+        if line or (compacted and compacted[-1]):
+            compacted.append(line)
+    return "\n".join(compacted)
+
+
+class RenderedPrompt(NamedTuple):
+    """Prompt prêt à l'envoi : préfixe stable + partie variable"""
+    prefix: str
+    suffix: str
+    prefix_hash: str
+
+    @property
+    def text(self) -> str:
+        return f"{self.prefix}\n\n{self.suffix}"
+
+
+class PromptTemplate:
+    """Template versionné : préfixe statique (mis en cache) + corps à emplacements {{nom}}"""
+
+    def __init__(self, name: str, version: str, prefix: str, body: str,
+                 constants: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.version = version
+        # Les constantes (formats de réponse) sont sérialisées une seule fois, ici
+        static = {key: canonical_json(value) for key, value in (constants or {}).items()}
+        self.prefix = PLACEHOLDER_PATTERN.sub(lambda match: static[match.group(1)], _compact(prefix))
+        self.prefix_hash = hashlib.sha256(f"{name}:{version}:{self.prefix}".encode("utf-8")).hexdigest()[:16]
+        self.prefix_tokens = estimate_tokens(self.prefix)
+        self._parts = PLACEHOLDER_PATTERN.split(_compact(body))
+        self.fields = tuple(self._parts[1::2])
+
+    def render(self, **values: Any) -> RenderedPrompt:
+        """Remplit les emplacements (str insérée telle quelle, sinon JSON canonique)"""
+        parts = self._parts
+        out = [parts[0]]
+        for index in range(1, len(parts), 2):
+            value = values[parts[index]]
+            out.append(value if isinstance(value, str) else canonical_json(value))
+            out.append(parts[index + 1])
+        return RenderedPrompt(self.prefix, "".join(out), self.prefix_hash)
+
+
+ANALYSIS_RESPONSE_FORMAT = {
+    "overall_score": "0-100",
+    "conversion_prediction": "0.0-100.0",
+    "strengths": ["point fort 1", "point fort 2"],
+    "issues": [{
+        "problem": "description du problème",
+        "solution": "solution recommandée",
+        "impact": "impact estimé en %",
+        "priority": "high|medium|low",
+    }],
+    "recommendations": [{
+        "type": "optimization|design|content|flow",
+        "description": "description de la recommandation",
+        "expected_improvement": "amélioration attendue",
+        "implementation_difficulty": "easy|medium|hard",
+    }],
+    "psychological_analysis": {
+        "user_journey_flow": "analyse du parcours",
+        "friction_points": ["point de friction 1"],
+        "engagement_factors": ["facteur d'engagement 1"],
+    },
+    "ab_test_suggestions": [{
+        "element": "élément à tester",
+        "variant_a": "version actuelle",
+        "variant_b": "version proposée",
+        "hypothesis": "hypothèse du test",
+    }],
+    "confidence_level": "0.0-1.0",
+}
+
+OPTIMIZATION_RESPONSE_FORMAT = {
+    "optimized_title": "nouveau titre optimisé",
+    "optimized_content": "nouveau contenu optimisé",
+    "optimized_options": ["option 1 optimisée", "option 2 optimisée"],
+    "visual_suggestions": [{
+        "element": "élément visuel",
+        "suggestion": "suggestion d'amélioration",
+        "reasoning": "justification psychologique",
+    }],
+    "expected_improvement": "pourcentage d'amélioration attendu",
+    "confidence": "0.0-1.0",
+}
+
+ANALYSIS_PROMPT = PromptTemplate(
+    "analysis", "3.0",
+    prefix="""
+        🧠 AGENT MORPHIUS - ANALYSE FUNNEL
+        Framework: Nümtema AGENCY
+
+        Analysez le funnel fourni de manière approfondie.
+        Les données sont en JSON compact.
+
+        ANALYSE DEMANDÉE:
+        1. Score global (/100)
+        2. Prédiction taux de conversion
+        3. Points forts identifiés
+        4. Problèmes détectés avec solutions
+        5. Recommandations d'optimisation
+        6. Analyse psychologique du parcours
+        7. Suggestions d'A/B testing
+
+        RÉPONDEZ EN JSON STRUCTURÉ (même structure, valeurs réelles):
+        {{response_format}}
+    """,
+    body="""
+        MÉMOIRE EXPÉRIENTIELLE (expériences les plus pertinentes):
+        {{memory}}
+
+        DONNÉES FUNNEL:
+        {{funnel}}
+    """,
+    constants={"response_format": ANALYSIS_RESPONSE_FORMAT},
+)
+
+OPTIMIZE_STEP_PROMPT = PromptTemplate(
+    "optimize_step", "3.0",
+    prefix="""
+        🧠 AGENT MORPHIUS - OPTIMISATION ÉTAPE
+        Framework: Nümtema AGENCY
+
+        OPTIMISATION DEMANDÉE:
+        1. Titre optimisé (plus engageant)
+        2. Contenu amélioré (psychologie persuasive)
+        3. Options de réponse optimisées
+        4. Suggestions visuelles
+        5. Micro-copy amélioré
+
+        RÉPONDEZ EN JSON (même structure, valeurs réelles):
+        {{response_format}}
+    """,
+    body="""
+        CONTEXTE FUNNEL:
+        {{context}}
+
+        ÉTAPE À OPTIMISER:
+        {{step}}
+    """,
+    constants={"response_format": OPTIMIZATION_RESPONSE_FORMAT},
+)
+
+OPTIMIZE_STEPS_PROMPT = PromptTemplate(
+    "optimize_funnel_steps", "3.0",
+    prefix="""
+        🧠 AGENT MORPHIUS - OPTIMISATION DES ÉTAPES DU FUNNEL
+        Framework: Nümtema AGENCY
+
+        POUR CHAQUE ÉTAPE:
+        1. Titre optimisé (plus engageant)
+        2. Contenu amélioré (psychologie persuasive)
+        3. Options de réponse optimisées
+        4. Suggestions visuelles
+        5. Micro-copy amélioré
+
+        RÉPONDEZ EN JSON (une entrée par step_index, même structure, valeurs réelles):
+        {{response_format}}
+    """,
+    body="""
+        CONTEXTE FUNNEL:
+        {{context}}
+
+        ÉTAPES À OPTIMISER:
+        {{steps}}
+    """,
+    constants={"response_format": {"steps": [{"step_index": 0, **OPTIMIZATION_RESPONSE_FORMAT}]}},
+)
+
+ANALYSIS_CHUNK_PROMPT = PromptTemplate(
+    "analysis_chunk", "1.0",
+    prefix="""
+        🧠 AGENT MORPHIUS - ANALYSE FUNNEL (SEGMENT)
+        Framework: Nümtema AGENCY
+
+        Le funnel est trop long pour un seul passage : analysez uniquement
+        les étapes fournies, dans le contexte du résumé global.
+        Les données sont en JSON compact ; step_number suit le plan du résumé.
+
+        ANALYSE DEMANDÉE:
+        1. Score de ce segment (/100)
+        2. Prédiction du taux de conversion du funnel complet
+        3. Points forts et problèmes du segment (citez les numéros d'étape)
+        4. Recommandations d'optimisation
+        5. Analyse psychologique du segment
+        6. Suggestions d'A/B testing
+
+        RÉPONDEZ EN JSON STRUCTURÉ (même structure, valeurs réelles):
+        {{response_format}}
+    """,
+    body="""
+        RÉSUMÉ GLOBAL DU FUNNEL:
+        {{summary}}
+
+        ÉTAPES {{first_step}} À {{last_step}}:
+        {{steps}}
+    """,
+    constants={"response_format": ANALYSIS_RESPONSE_FORMAT},
+)
+
+ANALYSIS_MERGE_PROMPT = PromptTemplate(
+    "analysis_merge", "1.0",
+    prefix="""
+        🧠 AGENT MORPHIUS - SYNTHÈSE ANALYSE FUNNEL
+        Framework: Nümtema AGENCY
+
+        Des segments consécutifs du funnel ont été analysés séparément.
+        Produisez l'analyse unique du funnel complet : score global cohérent
+        avec le parcours entier, problèmes dédupliqués et priorisés,
+        recommandations transverses, analyse psychologique de bout en bout.
+        Les données sont en JSON compact.
+
+        RÉPONDEZ EN JSON STRUCTURÉ (même structure, valeurs réelles):
+        {{response_format}}
+    """,
+    body="""
+        MÉMOIRE EXPÉRIENTIELLE (expériences les plus pertinentes):
+        {{memory}}
+
+        RÉSUMÉ GLOBAL DU FUNNEL:
+        {{summary}}
+
+        SCORES PAR SEGMENT:
+        {{segments}}
+
+        ANALYSES PARTIELLES RÉDUITES:
+        {{partial}}
+    """,
+    constants={"response_format": ANALYSIS_RESPONSE_FORMAT},
+)
+
+TEMPLATES = {
+    template.name: template
+    for template in (ANALYSIS_PROMPT, OPTIMIZE_STEP_PROMPT, OPTIMIZE_STEPS_PROMPT, ANALYSIS_CHUNK_PROMPT, ANALYSIS_MERGE_PROMPT)
+}
+
+
+def templates_version() -> str:
+    """Version combinée des templates (à inclure dans les clés de cache)"""
+    return "+".join(f"{name}@{template.version}" for name, template in sorted(TEMPLATES.items()))
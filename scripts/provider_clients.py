@@ -0,0 +1,109 @@
+"""
+Agent Morphius - Pool de Clients IA Réutilisables
+Nümtema AGENCY - Framework Exclusif
+
+Un client longue durée par (provider, clé API, modèle) : le pool de
+connexions HTTP (keep-alive, TLS) est conservé d'un appel à l'autre.
+"""
+
+import hashlib
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import google.generativeai as genai
+except ImportError:
+    genai = None
+
+try:
+    import openai
+except ImportError:
+    openai = None
+
+try:
+    import anthropic
+except ImportError:
+    anthropic = None
+
+
+def _gemini_client(api_key: str, model: str, base_url: Optional[str]):
+    # genai.configure est global : il n'est rappelé que si la clé change
+    if getattr(_gemini_client, "configured_key", None) != api_key:
+        genai.configure(api_key=api_key)
+        _gemini_client.configured_key = api_key
+    return genai.GenerativeModel(model)
+
+
+def _openai_client(api_key: str, model: str, base_url: Optional[str]):
+    options = {"api_key": api_key}
+    if base_url:
+        options["base_url"] = base_url
+    return openai.AsyncOpenAI(**options)
+
+
+def _anthropic_client(api_key: str, model: str, base_url: Optional[str]):
+    options = {"api_key": api_key}
+    if base_url:
+        options["base_url"] = base_url
+    return anthropic.AsyncAnthropic(**options)
+
+
+DEFAULT_FACTORIES: Dict[str, Callable[[str, str, Optional[str]], Any]] = {
+    "gemini": _gemini_client,
+    "openai": _openai_client,
+    "anthropic": _anthropic_client,
+}
+
+
+class ProviderClientPool:
+    """Clients asynchrones partagés, reconstruits quand les paramètres changent"""
+
+    def __init__(self, factories: Optional[Dict[str, Callable]] = None):
+        self.factories = factories or DEFAULT_FACTORIES
+        self._clients: Dict[Tuple, Any] = {}
+        self._retired: List[Any] = []
+        self.stats = {"created": 0, "reused": 0, "retired": 0}
+
+    def get(self, provider_id: str, api_key: str, model: str, base_url: Optional[str] = None) -> Any:
+        """Retourne le client de (provider, clé, modèle), créé au premier appel"""
+        fingerprint = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+        key = (provider_id, fingerprint, model, base_url)
+
+        client = self._clients.get(key)
+        if client is not None:
+            self.stats["reused"] += 1
+            return client
+
+        # Nouvelle clé API ou nouvelle URL : les anciens clients du provider sont retirés.
+        # Ils sont fermés à l'arrêt, pour ne pas couper une requête encore en vol.
+        stale_keys = [
+            k for k in self._clients
+            if k[0] == provider_id and (k[1], k[3]) != (fingerprint, base_url)
+        ]
+        for stale in stale_keys:
+            self._retired.append(self._clients.pop(stale))
+            self.stats["retired"] += 1
+
+        if provider_id not in self.factories:
+            raise ValueError(f"Provider {provider_id} non supporté")
+        client = self.factories[provider_id](api_key, model, base_url)
+        self._clients[key] = client
+        self.stats["created"] += 1
+        return client
+
+    def for_provider(self, provider) -> Any:
+        """Client pour un AIProviderConfig"""
+        return self.get(provider.id, provider.api_key, provider.model, getattr(provider, "base_url", None))
+
+    async def aclose(self):
+        """Ferme tous les clients (actifs et retirés)"""
+        clients = list(self._clients.values()) + self._retired
+        self._clients.clear()
+        self._retired = []
+        for client in clients:
+            close = getattr(client, "close", None) or getattr(client, "aclose", None)
+            if close is None:
+                continue
+            result = close()
+            if inspect.isawaitable(result):
+                await result
@@ -0,0 +1,282 @@
+"""
+Agent Morphius - Limitation de Débit par Modèle
+Nümtema AGENCY - Framework Exclusif
+
+TokenBucket borne le débit émis par clé de modèle. AdaptiveLimiter borne
+la concurrence par provider / modèle et l'ajuste en AIMD selon les réponses
+du provider (429 / 503, Retry-After) ; les appels idempotents sont rejoués
+avec backoff jitteré tant que l'échéance n'est pas atteinte. Les limiteurs
+adaptatifs sont partagés par tous les agents du processus ; leurs verrous
+asyncio sont recréés pour chaque boucle (plusieurs asyncio.run successifs).
+"""
+
+import asyncio
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from telemetry import METRICS
+
+
+class LoopLocal:
+    """Primitive asyncio (Lock, Condition) propre à la boucle courante
+
+    Un Lock ou une Condition se lie à la première boucle qui l'attend : réutilisé
+    dans un asyncio.run suivant, il lève RuntimeError. L'état du limiteur reste
+    partagé, seule la primitive est recréée quand la boucle change.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self._loop = None
+        self._primitive = None
+
+    def get(self) -> Any:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._primitive = loop, self.factory()
+        return self._primitive
+
+
+class TokenBucket:
+    """Token bucket asynchrone : `rate` jetons/seconde, rafale max `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self._lock = LoopLocal(asyncio.Lock)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Attend qu'un jeton soit disponible (les appelants sont servis dans l'ordre)"""
+        async with self._lock.get():
+            self._refill()
+            while self.tokens < tokens:
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= tokens
+
+
+def build_rate_limiters(model_configs: Dict[str, str], limits: Dict[str, Dict]) -> Dict[str, TokenBucket]:
+    """Un token bucket par clé de modèle de llm_model_configs"""
+    default = limits.get("default", {"rate": 1.0, "burst": 1})
+    return {
+        model_key: TokenBucket(**limits.get(model_key, default))
+        for model_key in model_configs
+    }
+
+
+# Erreurs HTTP rejouables ; 429 / 503 signalent un quota et réduisent la concurrence
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+THROTTLE_STATUS = (429, 503)
+RETRY_DELAY_PATTERN = re.compile(r"retry_delay\s*\{\s*seconds:\s*(\d+)")
+
+
+class QuotaExceededError(Exception):
+    """Quota provider toujours dépassé à l'échéance des retries"""
+
+    def __init__(self, message: str, last_error: Optional[BaseException] = None):
+        super().__init__(message)
+        self.last_error = last_error
+
+
+def error_status(error: BaseException) -> Optional[int]:
+    """Code HTTP d'une erreur SDK (Gemini : code, OpenAI / Anthropic : status_code)"""
+    for attribute in ("status_code", "code", "http_status"):
+        value = getattr(error, attribute, None)
+        if isinstance(value, int):
+            return int(value)
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status
+    # Certains SDK ne remontent que le message ("429 Resource has been exhausted")
+    message = str(error)
+    if message.startswith("429") or "Resource has been exhausted" in message:
+        return 429
+    return None
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Délai demandé par le provider (en-tête Retry-After ou RetryInfo Gemini), en secondes"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        match = RETRY_DELAY_PATTERN.search(str(error))
+        value = match.group(1) if match else None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+        return True
+    return error_status(error) in RETRYABLE_STATUS
+
+
+class AdaptiveLimiter:
+    """Concurrence AIMD par provider / modèle, pilotée par les 429 / 503 et Retry-After
+
+    Chaque succès ajoute increase / limit à la limite (+increase par fenêtre
+    complète), chaque 429 / 503 la multiplie par decrease (au plus une fois
+    par decrease_cooldown : une rafale de refus ne compte qu'une fois).
+    Retry-After suspend tous les appels du couple provider / modèle.
+    """
+
+    def __init__(self, provider: str, model: str, initial_limit: float = 4, min_limit: float = 1,
+                 max_limit: float = 32, increase: float = 1.0, decrease: float = 0.5,
+                 decrease_cooldown: float = 1.0, deadline: float = 30.0, max_attempts: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.provider = provider
+        self.model = model
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_cooldown = decrease_cooldown
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.in_flight = 0
+        self.waiting = 0
+        self.paused_until = 0.0
+        self.decreased_at = 0.0
+        self.stats = {"throttled": 0, "retried": 0, "decreases": 0}
+        self._condition = LoopLocal(asyncio.Condition)
+
+    async def acquire(self, method: str = "call") -> float:
+        """Attend une place libre (et la fin d'un Retry-After) ; renvoie l'attente en secondes"""
+        start = time.monotonic()
+        condition = self._condition.get()
+        async with condition:
+            self.waiting += 1
+            try:
+                while True:
+                    pause = self.paused_until - time.monotonic()
+                    if pause > 0:
+                        try:
+                            await asyncio.wait_for(condition.wait(), pause)
+                        except asyncio.TimeoutError:
+                            pass
+                    elif self.in_flight < max(self.min_limit, int(self.limit)):
+                        break
+                    else:
+                        await condition.wait()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+        waited = time.monotonic() - start
+        METRICS.record_wait(self.provider, self.model, method, waited)
+        return waited
+
+    async def release(self, error: Optional[BaseException] = None):
+        """Libère la place ; ajuste la limite selon l'issue de l'appel"""
+        condition = self._condition.get()
+        async with condition:
+            self.in_flight -= 1
+            if error is not None and error_status(error) in THROTTLE_STATUS:
+                self._throttled(retry_after(error))
+            elif error is None:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            condition.notify(max(1, int(self.limit) - self.in_flight))
+
+    def _throttled(self, delay: Optional[float]):
+        now = time.monotonic()
+        self.stats["throttled"] += 1
+        if now - self.decreased_at >= self.decrease_cooldown:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+            self.decreased_at = now
+            self.stats["decreases"] += 1
+        if delay:
+            self.paused_until = max(self.paused_until, now + delay)
+
+    @asynccontextmanager
+    async def slot(self, method: str = "call", timeout: Optional[float] = None):
+        """async with limiter.slot(): ... (sans retry : appels non idempotents, streaming)"""
+        try:
+            await asyncio.wait_for(self.acquire(method), timeout)
+        except asyncio.TimeoutError:
+            raise QuotaExceededError(f"{self.provider}/{self.model} : aucune place libre avant l'échéance")
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            await self.release(None if isinstance(error, asyncio.CancelledError) else error)
+
+    async def call(self, attempt: Callable[[], Awaitable[Any]], method: str = "call",
+                   idempotent: bool = True) -> Any:
+        """Exécute attempt() dans une place ; 429 / 5xx rejoués avec backoff jitteré avant l'échéance"""
+        deadline = time.monotonic() + self.deadline
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                async with self.slot(method, timeout=max(deadline - time.monotonic(), 0.001)):
+                    return await attempt()
+            except QuotaExceededError:
+                raise
+            except Exception as e:
+                status = error_status(e)
+                if status in THROTTLE_STATUS:
+                    METRICS.record_event("throttled", self.provider, self.model, method)
+                if not idempotent or not is_retryable(e) or attempts >= self.max_attempts:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+                if max(time.monotonic() + delay, self.paused_until) >= deadline:
+                    raise QuotaExceededError(
+                        f"{self.provider}/{self.model} : erreur {status} persistante, "
+                        f"échéance de {self.deadline:.0f}s atteinte", e
+                    ) from e
+                self.stats["retried"] += 1
+                METRICS.record_event("retry", self.provider, self.model, method)
+                await asyncio.sleep(delay)
+
+    def snapshot(self) -> Dict:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            **self.stats,
+        }
+
+
+# Un limiteur par (provider, modèle) pour tout le processus
+_ADAPTIVE_LIMITERS: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+
+
+def adaptive_limiter(provider: str, model: str, settings: Dict) -> AdaptiveLimiter:
+    """Limiteur partagé du couple provider / modèle (créé au premier appel avec `settings`)"""
+    key = (provider, model)
+    if key not in _ADAPTIVE_LIMITERS:
+        _ADAPTIVE_LIMITERS[key] = AdaptiveLimiter(provider, model, **settings)
+    return _ADAPTIVE_LIMITERS[key]
+
+
+def adaptive_limiters_snapshot() -> List[Dict]:
+    """État courant (limite, en vol, en attente, refus) de chaque limiteur adaptatif"""
+    return [limiter.snapshot() for limiter in _ADAPTIVE_LIMITERS.values()]
@@ -0,0 +1,293 @@
+"""
+Agent Morphius - Disjoncteurs et Requêtes Couvertes (hedging)
+Nümtema AGENCY - Framework Exclusif
+
+Chaque provider a son disjoncteur (fermé / ouvert / semi-ouvert) basé sur
+le taux d'échec d'une fenêtre glissante. En option, si le provider principal
+n'a pas répondu après son p95 observé, le suivant est lancé en parallèle :
+la première réponse valide gagne, l'autre appel est annulé.
+
+Avec persist_path, l'état des disjoncteurs et les latences récentes sont
+partagés via SQLite : un processus lancé pour une seule requête hérite
+d'un disjoncteur ouvert par les précédents au lieu de repartir à zéro.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class AllProvidersFailedError(Exception):
+    """Aucun provider n'a pu répondre"""
+
+
+class CircuitBreaker:
+    """Disjoncteur à fenêtre glissante de taux d'échec"""
+
+    def __init__(self, window_size: int = 20, failure_rate_threshold: float = 0.5,
+                 min_calls: int = 5, open_seconds: float = 30.0, half_open_max_calls: int = 1):
+        self.window = deque(maxlen=window_size)
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+
+    def allow_request(self) -> bool:
+        """True si un appel peut être tenté maintenant"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def record_success(self):
+        if self.state == HALF_OPEN:
+            self._close()
+        self.window.append(True)
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self._open()
+            return
+        self.window.append(False)
+        failures = self.window.count(False)
+        if len(self.window) >= self.min_calls and failures / len(self.window) >= self.failure_rate_threshold:
+            self._open()
+
+    def release(self):
+        """Appel abandonné sans verdict : libère la place semi-ouverte"""
+        if self.state == HALF_OPEN and self.half_open_calls > 0:
+            self.half_open_calls -= 1
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def _close(self):
+        self.state = CLOSED
+        self.window.clear()
+
+    def snapshot(self) -> Dict:
+        """État sérialisable (opened_at en heure murale, comparable d'un processus à l'autre)"""
+        return {
+            # Semi-ouvert enregistré comme ouvert : l'essai en cours appartient à ce processus
+            "state": OPEN if self.state == HALF_OPEN else self.state,
+            "opened_at": time.time() - (time.monotonic() - self.opened_at) if self.state != CLOSED else 0.0,
+            "outcomes": "".join("1" if success else "0" for success in self.window),
+        }
+
+    def restore(self, snapshot: Dict):
+        """Reprend un état enregistré par snapshot()"""
+        self.state = snapshot["state"]
+        self.opened_at = time.monotonic() - (time.time() - snapshot["opened_at"]) if self.state != CLOSED else 0.0
+        self.half_open_calls = 0
+        self.window.clear()
+        self.window.extend(outcome == "1" for outcome in snapshot["outcomes"])
+
+
+class LatencyTracker:
+    """Latences récentes d'un provider (pour le délai de hedging)"""
+
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class BreakerStore:
+    """État des disjoncteurs et latences par provider, partagé entre processus (SQLite, WAL)"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS provider_health ("
+            "provider_id TEXT PRIMARY KEY, state TEXT NOT NULL, opened_at REAL NOT NULL, "
+            "outcomes TEXT NOT NULL, latencies TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def load(self, provider_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, opened_at, outcomes, latencies FROM provider_health WHERE provider_id = ?",
+                (provider_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        state, opened_at, outcomes, latencies = row
+        return {"state": state, "opened_at": opened_at, "outcomes": outcomes, "latencies": json.loads(latencies)}
+
+    def save(self, provider_id: str, snapshot: Dict, latencies: List[float]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO provider_health "
+                "(provider_id, state, opened_at, outcomes, latencies, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (provider_id, snapshot["state"], snapshot["opened_at"], snapshot["outcomes"],
+                 json.dumps([round(seconds, 4) for seconds in latencies]), time.time()),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ResilientExecutor:
+    """Exécute une chaîne de fallback avec disjoncteurs et hedging optionnel"""
+
+    def __init__(self, breaker_options: Optional[Dict] = None, hedge: bool = False,
+                 hedge_percentile: float = 0.95, hedge_min_samples: int = 20,
+                 hedge_default_delay: float = 2.0, persist_path: Optional[str] = None):
+        self.breaker_options = breaker_options or {}
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay = hedge_default_delay
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.latencies: Dict[str, LatencyTracker] = {}
+        self.stats = {"hedged": 0, "backup_wins": 0, "short_circuited": 0}
+        self.store = BreakerStore(persist_path) if persist_path else None
+
+    def breaker(self, provider_id: str) -> CircuitBreaker:
+        if provider_id not in self.breakers:
+            breaker = CircuitBreaker(**self.breaker_options)
+            saved = self._load(provider_id)
+            if saved is not None:
+                breaker.restore(saved)
+                self.latencies.setdefault(provider_id, LatencyTracker()).samples.extend(saved["latencies"])
+            self.breakers[provider_id] = breaker
+        return self.breakers[provider_id]
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _load(self, provider_id: str) -> Optional[Dict]:
+        if self.store is None:
+            return None
+        try:
+            return self.store.load(provider_id)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            logger.warning(f"État du disjoncteur {provider_id} illisible: {e}")
+            return None
+
+    def _persist(self, provider_id: str):
+        """Enregistre le verdict : les processus suivants repartent de cet état"""
+        if self.store is None:
+            return
+        tracker = self.latencies.get(provider_id)
+        try:
+            self.store.save(provider_id, self.breaker(provider_id).snapshot(), list(tracker.samples) if tracker else [])
+        except sqlite3.Error as e:
+            logger.warning(f"État du disjoncteur {provider_id} non enregistré: {e}")
+
+    def hedge_delay(self, provider_id: str) -> float:
+        """p95 observé du provider (délai par défaut tant que l'échantillon est trop petit)"""
+        tracker = self.latencies.get(provider_id)
+        if tracker is None or len(tracker.samples) < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return tracker.percentile(self.hedge_percentile)
+
+    async def run(self, providers: List[Any], call: Callable[[Any], Awaitable[Any]],
+                  on_error: Optional[Callable[[Any, BaseException], None]] = None) -> Any:
+        """Retourne le premier résultat valide de la chaîne `providers`"""
+        queue = list(providers)
+        pending: Dict[asyncio.Task, Any] = {}
+
+        def launch() -> bool:
+            while queue:
+                provider = queue.pop(0)
+                if not self.breaker(provider.id).allow_request():
+                    self.stats["short_circuited"] += 1
+                    continue
+                pending[asyncio.ensure_future(self._timed_call(provider, call))] = provider
+                return True
+            return False
+
+        launch()
+        launched_first = next(iter(pending.values()), None)
+        try:
+            while pending:
+                timeout = None
+                if self.hedge and queue:
+                    newest = list(pending.values())[-1]
+                    timeout = self.hedge_delay(newest.id)
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Le provider en cours dépasse son p95 : on couvre avec le suivant
+                    if launch():
+                        self.stats["hedged"] += 1
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if provider is not launched_first:
+                            self.stats["backup_wins"] += 1
+                        return task.result()
+                    if on_error:
+                        on_error(provider, error)
+
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                if task.done() and not task.cancelled():
+                    task.exception()
+                else:
+                    task.cancel()
+
+        raise AllProvidersFailedError("Tous les providers ont échoué ou sont en disjonction")
+
+    async def _timed_call(self, provider: Any, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        breaker = self.breaker(provider.id)
+        start = time.monotonic()
+        try:
+            result = await call(provider)
+        except asyncio.CancelledError:
+            # Perdant d'un hedging : ni succès ni échec
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record_failure()
+            self._persist(provider.id)
+            raise
+        breaker.record_success()
+        self.latencies.setdefault(provider.id, LatencyTracker()).record(time.monotonic() - start)
+        self._persist(provider.id)
+        return result
@@ -0,0 +1,150 @@
+"""
+Agent Morphius - Cache de Réponses LLM (LRU + TTL)
+Nümtema AGENCY - Framework Exclusif
+
+Cache adressé par contenu : la clé est un hash canonique de
+(modèle, version du template de prompt, payload).
+"""
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def cache_key(model: str, template_version: str, payload: Any) -> str:
+    """Hash canonique (clés triées, sans espaces) d'une requête LLM"""
+    canonical = json.dumps(
+        [model, template_version, payload],
+        ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache LRU borné avec TTL par entrée et persistance disque optionnelle"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600,
+                 persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        self._conn = None
+        if persist_path:
+            directory = os.path.dirname(persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(persist_path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_expires_at ON response_cache(expires_at)"
+            )
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Retourne une copie de la réponse en cache, ou None"""
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None and self._conn is not None:
+                item = self._load(key)
+                if item is not None:
+                    self._store(key, item)
+
+            if item is None:
+                self.stats["misses"] += 1
+                return None
+
+            expires_at, value = item
+            if expires_at <= now:
+                self._entries.pop(key, None)
+                if self._conn is not None:
+                    self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict, ttl_seconds: Optional[float] = None):
+        """Ajoute une réponse (TTL par entrée, défaut: ttl_seconds du cache)"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        item = (time.time() + ttl, copy.deepcopy(value))
+        with self._lock:
+            self._store(key, item)
+            if self._conn is not None:
+                self._conn.execute("BEGIN")
+                try:
+                    # REPLACE réinsère la ligne : le rowid suit l'ordre d'écriture
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO response_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                        (key, item[0], json.dumps(value, ensure_ascii=False)),
+                    )
+                    self._prune()
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+
+    def clear(self):
+        """Vide le cache (mémoire et disque)"""
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM response_cache")
+
+    def snapshot(self) -> Dict:
+        """Compteurs hit/miss/éviction"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _store(self, key: str, item: Tuple[float, Dict]):
+        self._entries[key] = item
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (evicted,))
+            self.stats["evictions"] += 1
+
+    def _prune(self):
+        """Borne le fichier partagé par les processus : lignes expirées puis plus anciennes au-delà de max_entries"""
+        self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+        self._conn.execute(
+            "DELETE FROM response_cache WHERE rowid <= "
+            "(SELECT rowid FROM response_cache ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def _load(self, key: str) -> Optional[Tuple[float, Dict]]:
+        row = self._conn.execute(
+            "SELECT expires_at, value FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
@@ -0,0 +1,42 @@
+"""
+Agent Morphius - Coalescence des Requêtes Identiques (single-flight)
+Nümtema AGENCY - Framework Exclusif
+
+Les appels concurrents portant la même clé partagent une seule coroutine
+en vol : un seul appel LLM, le même résultat (ou la même exception) pour tous.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Partage une tâche en vol entre les appelants d'une même clé"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Exécute `factory()` une seule fois par clé tant qu'un appel est en vol"""
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats["calls"] += 1
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        else:
+            self.stats["shared"] += 1
+
+        # shield : l'annulation d'un appelant ne doit pas annuler l'appel partagé
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Marque l'exception comme récupérée même si tous les appelants ont été annulés
+        if not task.cancelled():
+            task.exception()
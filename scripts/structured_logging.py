@@ -0,0 +1,246 @@
+"""
+Agent Morphius - Journalisation JSONL Non Bloquante
+Nümtema AGENCY - Framework Exclusif
+
+Les appels de log ne font qu'empiler l'enregistrement dans une file bornée
+(QueueHandler) ; un thread QueueListener écrit les lignes JSON sur disque,
+avec rotation par taille et par durée. File pleine : les messages de faible
+sévérité sont abandonnés (et comptés) au lieu de bloquer la requête.
+
+Le journal est partagé par les processus lancés à chaque requête : la date
+de la dernière rotation est celle du fichier verrou `<journal>.lock`, et la
+rotation se fait sous verrou fcntl (sans verrou hors POSIX).
+"""
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : rotation sans verrou inter-processus
+    fcntl = None
+
+# Champs structurés acceptés via `extra=` (les autres attributs sont ignorés)
+STRUCTURED_FIELDS = (
+    "request_id", "method", "provider", "model", "latency",
+    "prompt_tokens", "response_tokens", "outcome", "funnel_id",
+)
+
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("morphius_request_id", default=None)
+
+_listener: Optional["LogWriterListener"] = None
+
+
+def bind_request_id(request_id: Optional[str] = None) -> str:
+    """Identifiant de la requête courante (créé s'il n'existe pas encore dans le contexte)"""
+    current = request_id_var.get()
+    if request_id is None and current is not None:
+        return current
+    request_id = request_id or uuid.uuid4().hex[:16]
+    request_id_var.set(request_id)
+    return request_id
+
+
+class RequestIdFilter(logging.Filter):
+    """Ajoute le request_id du contexte (exécuté dans le thread appelant)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        return True
+
+
+class JsonLineFormatter(logging.Formatter):
+    """Une ligne JSON par enregistrement"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Traceback déjà formaté par DroppingQueueHandler.prepare
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler qui ne bloque jamais : abandonne d'abord les logs de faible sévérité
+
+    Au-delà de `high_watermark` éléments en file, les enregistrements sous
+    `min_level_when_full` sont abandonnés ; la place restante est réservée
+    aux avertissements et erreurs. File totalement pleine : abandon compté.
+    """
+
+    def __init__(self, log_queue: queue.Queue, high_watermark: int,
+                 min_level_when_full: int = logging.WARNING):
+        super().__init__(log_queue)
+        self.high_watermark = high_watermark
+        self.min_level_when_full = min_level_when_full
+        self.dropped = {"low_severity": 0, "queue_full": 0}
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Message résolu et traceback formaté à part (exc_text) : le champ exception reste distinct"""
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if record.levelno < self.min_level_when_full and self.queue.qsize() >= self.high_watermark:
+            self.dropped["low_severity"] += 1
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped["queue_full"] += 1
+
+
+class LogWriterListener(logging.handlers.QueueListener):
+    """QueueListener dont l'arrêt attend une place en file au lieu d'échouer si elle est pleine"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotation dès que le fichier dépasse max_bytes OU que rotate_seconds est écoulé depuis la dernière
+
+    La date de la dernière rotation est le mtime du fichier verrou, commun à
+    tous les processus : un processus de courte durée tourne le journal si
+    l'échéance est passée, même s'il vient de démarrer. Un processus dont le
+    journal a été renommé par un autre rouvre le nouveau fichier.
+    """
+
+    def __init__(self, filename: str, max_bytes: int, backup_count: int, rotate_seconds: float = 0,
+                 encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding=encoding)
+        self.rotate_seconds = rotate_seconds
+        self.lock_path = f"{self.baseFilename}.lock"
+        self.next_rotation = self._next_rotation()
+
+    def _next_rotation(self) -> Optional[float]:
+        if not self.rotate_seconds:
+            return None
+        try:
+            return os.stat(self.lock_path).st_mtime + self.rotate_seconds
+        except FileNotFoundError:
+            # Premier démarrage : la période commence maintenant
+            open(self.lock_path, "a").close()
+            return time.time() + self.rotate_seconds
+
+    def _replaced(self) -> bool:
+        """Journal renommé ou recréé par un autre processus depuis son ouverture"""
+        if self.stream is None:
+            return False
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        opened = os.fstat(self.stream.fileno())
+        return (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino)
+
+    def _reopen(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = self._open()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self._replaced():
+            self._reopen()
+        if self.next_rotation is not None and time.time() >= self.next_rotation:
+            # Échéance relue : un autre processus a peut-être déjà tourné le journal
+            self.next_rotation = self._next_rotation()
+            if time.time() >= self.next_rotation:
+                return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        with open(self.lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self._replaced():
+                    # Rotation faite par un autre processus pendant l'attente du verrou
+                    self._reopen()
+                else:
+                    super().doRollover()
+                    os.utime(self.lock_path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        self.next_rotation = self._next_rotation()
+
+
+def setup_structured_logging(log_path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                             rotate_seconds: float = 24 * 3600, queue_size: int = 10_000,
+                             high_watermark: Optional[int] = None, level: int = logging.INFO,
+                             console: bool = True) -> DroppingQueueHandler:
+    """Installe le pipeline file → thread d'écriture sur le logger racine (une seule fois)"""
+    global _listener
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, DroppingQueueHandler):
+            return handler
+
+    directory = os.path.dirname(log_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    file_handler = SizeAndTimeRotatingFileHandler(log_path, max_bytes, backup_count, rotate_seconds)
+    file_handler.setFormatter(JsonLineFormatter())
+    handlers = [file_handler]
+    if console:
+        # stderr : stdout est réservé au JSON renvoyé aux routes Next.js
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(console_handler)
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(
+        log_queue, high_watermark if high_watermark is not None else int(queue_size * 0.8)
+    )
+    queue_handler.addFilter(RequestIdFilter())
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = LogWriterListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_structured_logging)
+    return queue_handler
+
+
+def stop_structured_logging():
+    """Vide la file et arrête le thread d'écriture"""
+    global _listener
+    if _listener is not None:
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, DroppingQueueHandler):
+                root.removeHandler(handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
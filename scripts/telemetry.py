@@ -0,0 +1,291 @@
+"""
+Agent Morphius - Télémétrie des Appels LLM
+Nümtema AGENCY - Framework Exclusif
+
+Latences (histogrammes), tokens, échecs de parsing, fallbacks, passages
+en mode démo, refus de quota et attente dans les limiteurs, par provider /
+modèle / méthode. Exposé en snapshot Python
+et au format texte Prometheus.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from json_extract import JSONExtractionError
+from prompt_templates import estimate_tokens
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+OUTCOMES = ("success", "error", "parse_failure", "cancelled")
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+EVENTS = ("cache_hit", "demo", "fallback", "escalation", "throttled", "retry")
+
+LOGGER = logging.getLogger("agent_morphius.llm")
+
+
+def usage_tokens(response: Any) -> Optional[Tuple[int, int]]:
+    """(tokens prompt, tokens réponse) rapportés par le SDK, si disponibles"""
+    usage = getattr(response, "usage_metadata", None)  # Gemini
+    if usage is not None and getattr(usage, "prompt_token_count", None) is not None:
+        return usage.prompt_token_count, getattr(usage, "candidates_token_count", 0) or 0
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        if getattr(usage, "prompt_tokens", None) is not None:  # OpenAI
+            return usage.prompt_tokens, usage.completion_tokens or 0
+        if getattr(usage, "input_tokens", None) is not None:  # Anthropic
+            return usage.input_tokens, usage.output_tokens or 0
+    return None
+
+
+class CallTracker:
+    """Mesure un appel LLM ; l'issue est déduite de l'exception éventuelle"""
+
+    def __init__(self, telemetry: "Telemetry", labels: Tuple[str, str, str]):
+        self.telemetry = telemetry
+        self.labels = labels
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.started_at = 0.0
+
+    def set_usage(self, response: Any = None, prompt: str = "", text: Optional[str] = None):
+        """Tokens du SDK, ou estimation locale depuis le prompt et le texte"""
+        usage = usage_tokens(response) if response is not None else None
+        if usage is not None:
+            self.prompt_tokens, self.response_tokens = usage
+        else:
+            self.prompt_tokens = estimate_tokens(prompt)
+            self.response_tokens = estimate_tokens(text if text is not None else getattr(response, "text", ""))
+
+    def __enter__(self) -> "CallTracker":
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            outcome = "success"
+        elif issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            outcome = "cancelled"
+        elif issubclass(exc_type, JSONExtractionError):
+            outcome = "parse_failure"
+        else:
+            outcome = "error"
+        latency = time.perf_counter() - self.started_at
+        self.telemetry.record_call(
+            *self.labels,
+            latency=latency,
+            outcome=outcome,
+            prompt_tokens=self.prompt_tokens,
+            response_tokens=self.response_tokens,
+        )
+        provider, model, method = self.labels
+        LOGGER.log(
+            logging.INFO if outcome == "success" else logging.WARNING,
+            "Appel LLM %s %s/%s : %s en %.0f ms", method, provider, model, outcome, latency * 1000,
+            extra={
+                "method": method,
+                "provider": provider,
+                "model": model,
+                "latency": round(latency, 4),
+                "prompt_tokens": self.prompt_tokens,
+                "response_tokens": self.response_tokens,
+                "outcome": outcome,
+            },
+        )
+        return False
+
+
+class Telemetry:
+    """Registre de métriques en mémoire, partagé par les agents"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS, wait_buckets: Tuple[float, ...] = WAIT_BUCKETS):
+        self.buckets = buckets
+        self.wait_buckets = wait_buckets
+        self._lock = threading.Lock()
+        self._calls: Dict[Tuple[str, str, str], Dict] = {}
+        self._events: Counter = Counter()
+        self._waits: Dict[Tuple[str, str, str], Dict] = {}
+
+    def track(self, provider: str, model: str, method: str) -> CallTracker:
+        """with telemetry.track(...) as call: ... autour d'un appel LLM"""
+        return CallTracker(self, (provider, model, method))
+
+    def record_call(self, provider: str, model: str, method: str, latency: float, outcome: str,
+                    prompt_tokens: int = 0, response_tokens: int = 0):
+        with self._lock:
+            series = self._calls.get((provider, model, method))
+            if series is None:
+                series = self._calls[(provider, model, method)] = {
+                    "count": 0,
+                    "latency_sum": 0.0,
+                    "buckets": [0] * (len(self.buckets) + 1),
+                    "prompt_tokens": 0,
+                    "response_tokens": 0,
+                    "outcomes": Counter(),
+                }
+            series["count"] += 1
+            series["latency_sum"] += latency
+            series["buckets"][self._bucket_index(latency, self.buckets)] += 1
+            series["prompt_tokens"] += prompt_tokens
+            series["response_tokens"] += response_tokens
+            series["outcomes"][outcome] += 1
+
+    def record_event(self, event: str, provider: str, model: str, method: str):
+        """Événement hors appel : cache_hit, demo, fallback, escalation, throttled, retry"""
+        with self._lock:
+            self._events[(event, provider, model, method)] += 1
+
+    def record_wait(self, provider: str, model: str, method: str, seconds: float):
+        """Temps passé en file d'attente d'un limiteur avant l'appel"""
+        with self._lock:
+            series = self._waits.get((provider, model, method))
+            if series is None:
+                series = self._waits[(provider, model, method)] = {
+                    "count": 0,
+                    "wait_sum": 0.0,
+                    "wait_max": 0.0,
+                    "buckets": [0] * (len(self.wait_buckets) + 1),
+                }
+            series["count"] += 1
+            series["wait_sum"] += seconds
+            series["wait_max"] = max(series["wait_max"], seconds)
+            series["buckets"][self._bucket_index(seconds, self.wait_buckets)] += 1
+
+    def snapshot(self) -> Dict:
+        """Vue agrégée : latences (moyenne, p50/p95 estimés), tokens, taux"""
+        with self._lock:
+            calls = []
+            for (provider, model, method), series in self._calls.items():
+                count = series["count"]
+                calls.append({
+                    "provider": provider,
+                    "model": model,
+                    "method": method,
+                    "count": count,
+                    "latency_avg": series["latency_sum"] / count,
+                    "latency_p50": self._quantile(series["buckets"], count, 0.50),
+                    "latency_p95": self._quantile(series["buckets"], count, 0.95),
+                    "prompt_tokens": series["prompt_tokens"],
+                    "response_tokens": series["response_tokens"],
+                    "outcomes": dict(series["outcomes"]),
+                    "error_rate": (count - series["outcomes"]["success"]) / count,
+                    "parse_failure_rate": series["outcomes"]["parse_failure"] / count,
+                })
+
+            events = [
+                {"event": event, "provider": provider, "model": model, "method": method, "count": count}
+                for (event, provider, model, method), count in self._events.items()
+            ]
+            totals = Counter()
+            for (event, _, _, method), count in self._events.items():
+                totals[(event, method)] += count
+            requests = Counter()
+            for (_, _, method), series in self._calls.items():
+                requests[method] += series["count"]
+            for (event, method), count in totals.items():
+                requests[method] += count if event in ("cache_hit", "demo") else 0
+
+            waits = [
+                {
+                    "provider": provider,
+                    "model": model,
+                    "method": method,
+                    "count": series["count"],
+                    "wait_avg": series["wait_sum"] / series["count"],
+                    "wait_p95": self._quantile(series["buckets"], series["count"], 0.95, self.wait_buckets),
+                    "wait_max": series["wait_max"],
+                }
+                for (provider, model, method), series in self._waits.items()
+            ]
+
+            rates = {
+                method: {
+                    event: totals[(event, method)] / total
+                    for event in EVENTS
+                }
+                for method, total in requests.items() if total
+            }
+        return {"calls": calls, "events": events, "rates": rates, "queue_waits": waits}
+
+    def prometheus(self) -> str:
+        """Export au format texte Prometheus"""
+        lines = [
+            "# HELP morphius_llm_latency_seconds Latence des appels LLM",
+            "# TYPE morphius_llm_latency_seconds histogram",
+        ]
+        with self._lock:
+            calls = {labels: dict(series, outcomes=Counter(series["outcomes"])) for labels, series in self._calls.items()}
+            events = dict(self._events)
+            waits = {labels: dict(series) for labels, series in self._waits.items()}
+
+        for (provider, model, method), series in calls.items():
+            labels = f'provider="{provider}",model="{model}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["buckets"]):
+                cumulative += count
+                lines.append(f'morphius_llm_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'morphius_llm_latency_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f"morphius_llm_latency_seconds_sum{{{labels}}} {series['latency_sum']:.6f}")
+            lines.append(f"morphius_llm_latency_seconds_count{{{labels}}} {series['count']}")
+
+        lines += ["# HELP morphius_llm_tokens_total Tokens échangés", "# TYPE morphius_llm_tokens_total counter"]
+        for (provider, model, method), series in calls.items():
+            labels = f'provider="{provider}",model="{model}",method="{method}"'
+            lines.append(f'morphius_llm_tokens_total{{{labels},kind="prompt"}} {series["prompt_tokens"]}')
+            lines.append(f'morphius_llm_tokens_total{{{labels},kind="response"}} {series["response_tokens"]}')
+
+        lines += ["# HELP morphius_llm_calls_total Appels LLM par issue", "# TYPE morphius_llm_calls_total counter"]
+        for (provider, model, method), series in calls.items():
+            labels = f'provider="{provider}",model="{model}",method="{method}"'
+            for outcome in OUTCOMES:
+                lines.append(f'morphius_llm_calls_total{{{labels},outcome="{outcome}"}} {series["outcomes"][outcome]}')
+
+        lines += ["# HELP morphius_llm_events_total Cache, fallbacks et mode démo", "# TYPE morphius_llm_events_total counter"]
+        for (event, provider, model, method), count in events.items():
+            lines.append(
+                f'morphius_llm_events_total{{event="{event}",provider="{provider}",model="{model}",method="{method}"}} {count}'
+            )
+
+        lines += [
+            "# HELP morphius_llm_queue_wait_seconds Attente dans les limiteurs avant l'appel",
+            "# TYPE morphius_llm_queue_wait_seconds histogram",
+        ]
+        for (provider, model, method), series in waits.items():
+            labels = f'provider="{provider}",model="{model}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(self.wait_buckets, series["buckets"]):
+                cumulative += count
+                lines.append(f'morphius_llm_queue_wait_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'morphius_llm_queue_wait_seconds_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f"morphius_llm_queue_wait_seconds_sum{{{labels}}} {series['wait_sum']:.6f}")
+            lines.append(f"morphius_llm_queue_wait_seconds_count{{{labels}}} {series['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+            self._events.clear()
+            self._waits.clear()
+
+    def _bucket_index(self, value: float, bounds: Tuple[float, ...]) -> int:
+        for index, bound in enumerate(bounds):
+            if value <= bound:
+                return index
+        return len(bounds)
+
+    def _quantile(self, buckets, count: int, q: float, bounds: Optional[Tuple[float, ...]] = None) -> float:
+        """Borne supérieure du bucket contenant le quantile q"""
+        bounds = bounds or self.buckets
+        target = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(buckets):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bounds[index] if index < len(bounds) else float("inf")
+        return float("inf")
+
+
+# Registre partagé par AgentMorphius et AgentMorphiusWithSettings
+METRICS = Telemetry()
@@ -0,0 +1,80 @@
+"""
+Agent Morphius - Persistance Différée (write-behind) de la Mémoire
+Nümtema AGENCY - Framework Exclusif
+
+Le chemin de requête ne fait qu'empiler l'entrée en mémoire vive. Un thread
+dédié écrit les lots dans SQLite (une transaction par lot) quand le délai
+est écoulé ou que le nombre d'entrées en attente dépasse le seuil. close()
+vide la file avant l'arrêt du processus.
+"""
+
+import copy
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindPersister:
+    """Regroupe les ajouts de mémoire et les écrit hors du chemin de requête"""
+
+    def __init__(self, store, flush_interval: float = 2.0, max_pending: int = 50):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending: List[Tuple[str, Dict]] = []
+        self.stats = {"submitted": 0, "flushed": 0, "batches": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="morphius-write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, entry: Dict):
+        """Empile une copie de l'entrée (aucun accès disque)"""
+        # Copie au moment de l'appel : l'appelant peut encore modifier l'entrée
+        # (analyse renvoyée au client, mise en cache) avant l'écriture par lot
+        snapshot = copy.deepcopy(entry)
+        with self._lock:
+            self.pending.append((kind, snapshot))
+            self.stats["submitted"] += 1
+            full = len(self.pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Écrit les entrées en attente en une transaction ; en cas d'échec elles sont conservées"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+            try:
+                self.store.append_batch(batch)
+            except Exception as e:
+                with self._lock:
+                    self.pending[:0] = batch
+                    self.stats["errors"] += 1
+                logger.error(f"Erreur écriture différée de la mémoire: {e}")
+                return 0
+            self.stats["flushed"] += len(batch)
+            self.stats["batches"] += 1
+            return len(batch)
+
+    def close(self):
+        """Arrête le thread puis écrit ce qui reste"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            # Délai écoulé ou seuil atteint (submit réveille le thread)
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()